@@ -0,0 +1,60 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import { IERC20 } from "../../interfaces/IERC20.sol";
+import { SafeERC20 } from "../library/SafeERC20.sol";
+import { SafeMath } from "../library/SafeMath.sol";
+import { IBalancerVault, IAsset } from "../../interfaces/BalancerV2.sol";
+
+// Balancer Vault stand-in that settles a GIVEN_IN batchSwap end to end at a fixed rate
+// between the first asset in and the last asset out. Output is paid from the contract
+// balance, so it has to be funded with the output token.
+contract MockBalancerVault {
+	using SafeMath for uint256;
+	using SafeERC20 for IERC20;
+
+	// tokenIn => tokenOut => amount out for 1e18 units in
+	mapping(address => mapping(address => uint256)) public rates;
+
+	function setRate(
+		address _tokenIn,
+		address _tokenOut,
+		uint256 _rate
+	) external {
+		rates[_tokenIn][_tokenOut] = _rate;
+	}
+
+	function batchSwap(
+		IBalancerVault.SwapKind _kind,
+		IBalancerVault.BatchSwapStep[] memory _swaps,
+		IAsset[] memory _assets,
+		IBalancerVault.FundManagement memory _funds,
+		int256[] memory _limits,
+		uint256 _deadline
+	) external payable returns (int256[] memory _deltas) {
+		require(block.timestamp <= _deadline, "BAL#508"); // SWAP_DEADLINE
+		require(_kind == IBalancerVault.SwapKind.GIVEN_IN, "!kind");
+
+		uint256 indexIn = _swaps[0].assetInIndex;
+		uint256 indexOut = _swaps[_swaps.length - 1].assetOutIndex;
+		address tokenIn = address(_assets[indexIn]);
+		address tokenOut = address(_assets[indexOut]);
+		uint256 rate = rates[tokenIn][tokenOut];
+		require(rate > 0, "!route");
+
+		uint256 amountIn = _swaps[0].amount;
+		uint256 amountOut = amountIn.mul(rate).div(1e18);
+
+		_deltas = new int256[](_assets.length);
+		_deltas[indexIn] = int256(amountIn);
+		_deltas[indexOut] = -int256(amountOut);
+		for (uint256 i = 0; i < _assets.length; i++) {
+			require(_deltas[i] <= _limits[i], "BAL#507"); // SWAP_LIMIT
+		}
+
+		IERC20(tokenIn).safeTransferFrom(_funds.sender, address(this), amountIn);
+		IERC20(tokenOut).safeTransfer(_funds.recipient, amountOut);
+	}
+}
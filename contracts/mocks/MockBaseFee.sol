@@ -0,0 +1,12 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+// Settable replacement for the yearn base fee oracle read by harvestTrigger
+contract MockBaseFee {
+	uint256 public basefee_global;
+
+	function setBaseFee(uint256 _baseFee) external {
+		basefee_global = _baseFee;
+	}
+}
@@ -0,0 +1,98 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+import { SafeMath } from "../library/SafeMath.sol";
+
+// Mintable ERC20 used by the mock protocol backend.
+// There is no constructor: state is set through `initialize` so the runtime code can be
+// etched at a hardcoded mainnet address (STG, S*USDT) and configured afterwards.
+contract MockERC20 {
+	using SafeMath for uint256;
+
+	string public name;
+	string public symbol;
+	uint8 public decimals;
+	uint256 public totalSupply;
+
+	mapping(address => uint256) public balanceOf;
+	mapping(address => mapping(address => uint256)) public allowance;
+
+	bool internal initialized;
+
+	event Transfer(address indexed from, address indexed to, uint256 value);
+	event Approval(address indexed owner, address indexed spender, uint256 value);
+
+	function initialize(
+		string memory _name,
+		string memory _symbol,
+		uint8 _decimals
+	) public {
+		require(!initialized, "Initialized");
+		initialized = true;
+		name = _name;
+		symbol = _symbol;
+		decimals = _decimals;
+	}
+
+	function transfer(address _to, uint256 _amount) external returns (bool) {
+		_transfer(msg.sender, _to, _amount);
+		return true;
+	}
+
+	function transferFrom(
+		address _from,
+		address _to,
+		uint256 _amount
+	) external returns (bool) {
+		if (allowance[_from][msg.sender] != uint256(-1)) {
+			allowance[_from][msg.sender] = allowance[_from][msg.sender].sub(
+				_amount,
+				"ERC20: transfer amount exceeds allowance"
+			);
+		}
+		_transfer(_from, _to, _amount);
+		return true;
+	}
+
+	function approve(address _spender, uint256 _amount) external returns (bool) {
+		allowance[msg.sender][_spender] = _amount;
+		emit Approval(msg.sender, _spender, _amount);
+		return true;
+	}
+
+	function mint(address _to, uint256 _amount) external {
+		_mint(_to, _amount);
+	}
+
+	// WETH-style wrapping so the same mock can stand in for wETH
+	function deposit() public payable {
+		_mint(msg.sender, msg.value);
+	}
+
+	receive() external payable {
+		deposit();
+	}
+
+	function _transfer(
+		address _from,
+		address _to,
+		uint256 _amount
+	) internal {
+		balanceOf[_from] = balanceOf[_from].sub(_amount, "ERC20: transfer amount exceeds balance");
+		balanceOf[_to] = balanceOf[_to].add(_amount);
+		emit Transfer(_from, _to, _amount);
+	}
+
+	function _mint(address _to, uint256 _amount) internal {
+		totalSupply = totalSupply.add(_amount);
+		balanceOf[_to] = balanceOf[_to].add(_amount);
+		emit Transfer(address(0), _to, _amount);
+	}
+
+	function _burn(address _from, uint256 _amount) internal {
+		balanceOf[_from] = balanceOf[_from].sub(_amount, "ERC20: burn amount exceeds balance");
+		totalSupply = totalSupply.sub(_amount);
+		emit Transfer(_from, address(0), _amount);
+	}
+}
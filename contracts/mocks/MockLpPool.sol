@@ -0,0 +1,79 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+import { IERC20 } from "../../interfaces/IERC20.sol";
+import { SafeERC20 } from "../library/SafeERC20.sol";
+import { MockERC20 } from "./MockERC20.sol";
+
+// Stargate Pool (ILpPool) stand-in. LP tokens are minted and redeemed by the router
+// against `totalLiquidity`, in local decimals. Instant redeems are capped by `deltaCredit`
+// like the real pool, which only grows with local deposits here.
+contract MockLpPool is MockERC20 {
+	using SafeERC20 for IERC20;
+
+	uint256 public poolId;
+	address public router;
+	address public token;
+	uint256 public totalLiquidity;
+	uint256 public deltaCredit;
+	uint256 public constant convertRate = 1;
+	uint256 public constant mintFeeBP = 0;
+
+	modifier onlyRouter() {
+		require(msg.sender == router, "Stargate: only the router can call this method");
+		_;
+	}
+
+	function initializePool(
+		uint256 _poolId,
+		address _router,
+		address _token
+	) external {
+		require(router == address(0), "Initialized");
+		poolId = _poolId;
+		router = _router;
+		token = _token;
+	}
+
+	function amountLPtoLD(uint256 _amountLP) public view returns (uint256) {
+		require(totalSupply > 0, "Stargate: cant convert LPtoSD when totalSupply == 0");
+		return _amountLP.mul(totalLiquidity).div(totalSupply);
+	}
+
+	function mintLiquidity(address _to, uint256 _amountLD)
+		external
+		onlyRouter
+		returns (uint256 _amountLP)
+	{
+		_amountLP = totalSupply == 0
+			? _amountLD
+			: _amountLD.mul(totalSupply).div(totalLiquidity);
+		totalLiquidity = totalLiquidity.add(_amountLD);
+		deltaCredit = deltaCredit.add(_amountLD);
+		_mint(_to, _amountLP);
+	}
+
+	function redeemLiquidity(
+		address _from,
+		uint256 _amountLP,
+		address _to
+	) external onlyRouter returns (uint256 _amountLD) {
+		uint256 _capAmountLP = deltaCredit.mul(totalSupply).div(totalLiquidity);
+		if (_amountLP > _capAmountLP) _amountLP = _capAmountLP;
+		_amountLD = amountLPtoLD(_amountLP);
+		_burn(_from, _amountLP);
+		totalLiquidity = totalLiquidity.sub(_amountLD);
+		deltaCredit = deltaCredit.sub(_amountLD);
+		IERC20(token).safeTransfer(_to, _amountLD);
+	}
+
+	// Simulates swap fees being credited to LPs. The tokens must already be in the pool.
+	function accrueFees(uint256 _amountLD) external {
+		require(
+			IERC20(token).balanceOf(address(this)) >= totalLiquidity.add(_amountLD),
+			"!balance"
+		);
+		totalLiquidity = totalLiquidity.add(_amountLD);
+	}
+}
@@ -0,0 +1,126 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+import { IERC20 } from "../../interfaces/IERC20.sol";
+import { SafeERC20 } from "../library/SafeERC20.sol";
+import { SafeMath } from "../library/SafeMath.sol";
+import { UserInfo, PoolInfo } from "../../interfaces/IMasterChef.sol";
+
+// Trimmed down Stargate LPStaking: per block STG emissions split by allocPoint.
+// Rewards are paid out of the contract balance, so it has to be funded with STG.
+contract MockMasterChef {
+	using SafeMath for uint256;
+	using SafeERC20 for IERC20;
+
+	IERC20 public stargate;
+	uint256 public stargatePerBlock;
+	uint256 public totalAllocPoint;
+
+	PoolInfo[] public poolInfo;
+	mapping(uint256 => mapping(address => UserInfo)) public userInfo;
+
+	event Deposit(address indexed user, uint256 indexed pid, uint256 amount);
+	event Withdraw(address indexed user, uint256 indexed pid, uint256 amount);
+	event EmergencyWithdraw(address indexed user, uint256 indexed pid, uint256 amount);
+
+	function initialize(address _stargate, uint256 _stargatePerBlock) external {
+		require(address(stargate) == address(0), "Initialized");
+		stargate = IERC20(_stargate);
+		stargatePerBlock = _stargatePerBlock;
+	}
+
+	function add(uint256 _allocPoint, address _lpToken) external {
+		totalAllocPoint = totalAllocPoint.add(_allocPoint);
+		poolInfo.push(PoolInfo(IERC20(_lpToken), _allocPoint, block.number, 0));
+	}
+
+	function setStargatePerBlock(uint256 _stargatePerBlock) external {
+		for (uint256 pid = 0; pid < poolInfo.length; pid++) {
+			updatePool(pid);
+		}
+		stargatePerBlock = _stargatePerBlock;
+	}
+
+	function pendingStargate(uint256 _pid, address _user) external view returns (uint256) {
+		PoolInfo storage pool = poolInfo[_pid];
+		UserInfo storage user = userInfo[_pid][_user];
+		uint256 accStargatePerShare = pool.accStargatePerShare;
+		uint256 lpSupply = pool.lpToken.balanceOf(address(this));
+		if (block.number > pool.lastRewardBlock && lpSupply != 0) {
+			accStargatePerShare = accStargatePerShare.add(
+				_reward(pool).mul(1e12).div(lpSupply)
+			);
+		}
+		return user.amount.mul(accStargatePerShare).div(1e12).sub(user.rewardDebt);
+	}
+
+	function updatePool(uint256 _pid) public {
+		PoolInfo storage pool = poolInfo[_pid];
+		if (block.number <= pool.lastRewardBlock) {
+			return;
+		}
+		uint256 lpSupply = pool.lpToken.balanceOf(address(this));
+		if (lpSupply > 0) {
+			pool.accStargatePerShare = pool.accStargatePerShare.add(
+				_reward(pool).mul(1e12).div(lpSupply)
+			);
+		}
+		pool.lastRewardBlock = block.number;
+	}
+
+	function deposit(uint256 _pid, uint256 _amount) external {
+		PoolInfo storage pool = poolInfo[_pid];
+		UserInfo storage user = userInfo[_pid][msg.sender];
+		updatePool(_pid);
+		_harvest(pool, user);
+		pool.lpToken.safeTransferFrom(msg.sender, address(this), _amount);
+		user.amount = user.amount.add(_amount);
+		user.rewardDebt = user.amount.mul(pool.accStargatePerShare).div(1e12);
+		emit Deposit(msg.sender, _pid, _amount);
+	}
+
+	function withdraw(uint256 _pid, uint256 _amount) external {
+		PoolInfo storage pool = poolInfo[_pid];
+		UserInfo storage user = userInfo[_pid][msg.sender];
+		require(user.amount >= _amount, "withdraw: _amount is too large");
+		updatePool(_pid);
+		_harvest(pool, user);
+		user.amount = user.amount.sub(_amount);
+		user.rewardDebt = user.amount.mul(pool.accStargatePerShare).div(1e12);
+		pool.lpToken.safeTransfer(msg.sender, _amount);
+		emit Withdraw(msg.sender, _pid, _amount);
+	}
+
+	function emergencyWithdraw(uint256 _pid) external {
+		PoolInfo storage pool = poolInfo[_pid];
+		UserInfo storage user = userInfo[_pid][msg.sender];
+		uint256 amount = user.amount;
+		user.amount = 0;
+		user.rewardDebt = 0;
+		pool.lpToken.safeTransfer(msg.sender, amount);
+		emit EmergencyWithdraw(msg.sender, _pid, amount);
+	}
+
+	function _reward(PoolInfo storage _pool) internal view returns (uint256) {
+		if (totalAllocPoint == 0) {
+			return 0;
+		}
+		return
+			block.number.sub(_pool.lastRewardBlock).mul(stargatePerBlock).mul(_pool.allocPoint).div(
+				totalAllocPoint
+			);
+	}
+
+	function _harvest(PoolInfo storage _pool, UserInfo storage _user) internal {
+		if (_user.amount > 0) {
+			uint256 pending = _user.amount.mul(_pool.accStargatePerShare).div(1e12).sub(
+				_user.rewardDebt
+			);
+			if (pending > 0) {
+				stargate.safeTransfer(msg.sender, pending);
+			}
+		}
+	}
+}
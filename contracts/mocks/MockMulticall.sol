@@ -0,0 +1,44 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+pragma experimental ABIEncoderV2;
+
+// Multicall3 `aggregate` and `tryAggregate` for dev chains, etched at the canonical Multicall3 address
+contract MockMulticall {
+	struct Call {
+		address target;
+		bytes callData;
+	}
+
+	struct Result {
+		bool success;
+		bytes returnData;
+	}
+
+	function aggregate(Call[] calldata _calls)
+		external
+		payable
+		returns (uint256 _blockNumber, bytes[] memory _returnData)
+	{
+		_blockNumber = block.number;
+		_returnData = new bytes[](_calls.length);
+		for (uint256 i = 0; i < _calls.length; i++) {
+			(bool success, bytes memory ret) = _calls[i].target.call(_calls[i].callData);
+			require(success, "Multicall3: call failed");
+			_returnData[i] = ret;
+		}
+	}
+
+	function tryAggregate(bool _requireSuccess, Call[] calldata _calls)
+		external
+		payable
+		returns (Result[] memory _returnData)
+	{
+		_returnData = new Result[](_calls.length);
+		for (uint256 i = 0; i < _calls.length; i++) {
+			(bool success, bytes memory ret) = _calls[i].target.call(_calls[i].callData);
+			if (_requireSuccess) require(success, "Multicall3: call failed");
+			_returnData[i] = Result(success, ret);
+		}
+	}
+}
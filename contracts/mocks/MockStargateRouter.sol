@@ -0,0 +1,42 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+import { IERC20 } from "../../interfaces/IERC20.sol";
+import { SafeERC20 } from "../library/SafeERC20.sol";
+import { MockLpPool } from "./MockLpPool.sol";
+
+// Implements the IStargateRouter subset used by Strategy: addLiquidity and instantRedeemLocal
+contract MockStargateRouter {
+	using SafeERC20 for IERC20;
+
+	mapping(uint256 => MockLpPool) public pools;
+
+	function setPool(uint256 _poolId, address _pool) external {
+		pools[_poolId] = MockLpPool(_pool);
+	}
+
+	function addLiquidity(
+		uint256 _poolId,
+		uint256 _amountLD,
+		address _to
+	) external {
+		MockLpPool pool = _getPool(_poolId);
+		IERC20(pool.token()).safeTransferFrom(msg.sender, address(pool), _amountLD);
+		pool.mintLiquidity(_to, _amountLD);
+	}
+
+	function instantRedeemLocal(
+		uint16 _srcPoolId,
+		uint256 _amountLP,
+		address _to
+	) external returns (uint256 _amountSD) {
+		require(_amountLP > 0, "Stargate: not enough lp to redeem");
+		_amountSD = _getPool(_srcPoolId).redeemLiquidity(msg.sender, _amountLP, _to);
+	}
+
+	function _getPool(uint256 _poolId) internal view returns (MockLpPool pool) {
+		pool = pools[_poolId];
+		require(address(pool) != address(0), "Stargate: Pool does not exist");
+	}
+}
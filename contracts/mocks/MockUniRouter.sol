@@ -0,0 +1,34 @@
+// SPDX-License-Identifier: AGPL-3.0
+
+pragma solidity 0.6.12;
+
+import { SafeMath } from "../library/SafeMath.sol";
+
+// Quote-only router: getAmountsOut at fixed per hop rates, no fees or price impact
+contract MockUniRouter {
+	using SafeMath for uint256;
+
+	// tokenIn => tokenOut => amount out for 1e18 units in
+	mapping(address => mapping(address => uint256)) public rates;
+
+	function setRate(
+		address _tokenIn,
+		address _tokenOut,
+		uint256 _rate
+	) external {
+		rates[_tokenIn][_tokenOut] = _rate;
+	}
+
+	function getAmountsOut(uint256 _amountIn, address[] calldata _path)
+		external
+		view
+		returns (uint256[] memory _amounts)
+	{
+		require(_path.length >= 2, "UniswapV2Library: INVALID_PATH");
+		_amounts = new uint256[](_path.length);
+		_amounts[0] = _amountIn;
+		for (uint256 i = 0; i < _path.length - 1; i++) {
+			_amounts[i + 1] = _amounts[i].mul(rates[_path[i]][_path[i + 1]]).div(1e18);
+		}
+	}
+}
@@ -20,6 +20,10 @@ struct PoolInfo {
 interface IMasterChef {
 	function poolInfo(uint256 _pid) external view returns (PoolInfo memory);
 
+	function stargatePerBlock() external view returns (uint256);
+
+	function totalAllocPoint() external view returns (uint256);
+
 	function userInfo(uint256 _pid, address _user) external view returns (uint256, uint256);
 
 	function pendingStargate(uint256 _pid, address _user) external view returns (uint256);
@@ -11,6 +11,12 @@ interface ILpPool {
 
 	function router() external view returns (address); // Router for the pool
 
+	function deltaCredit() external view returns (uint256); // Liquidity available for instant redeems, in shared decimals
+
+	function convertRate() external view returns (uint256); // 10 ** (local decimals - shared decimals)
+
+	function mintFeeBP() external view returns (uint256);
+
 	/**
 	 * @dev Moves `amount` tokens from the caller's account to `recipient`.
 	 *
@@ -0,0 +1,163 @@
+import time
+from collections import namedtuple
+
+import numpy as np
+
+# NumPy model of Strategy.prepareReturn and liquidatePosition. Every argument can be a
+# scalar or an array, so one call evaluates any number of (totalDebt,
+# estimatedTotalAssets, balanceOfWant, debtOutstanding) scenarios. Amounts are in want
+# units and must fit in int64.
+#   brownie run accountingModel main [scenarios]  # throughput and branch counts
+#
+# The pooled part of the position (estimatedTotalAssets - balanceOfWant) is redeemed at
+# its value minus `slippageOut` bps. Reward sales are folded into `harvested`, the want
+# they add before the accounting.
+BASIS_ONE = 10_000
+MAX_SLIPPAGE_OUT = 5  # bps, Strategy default
+WANT_DUST = 10 ** 6
+
+Liquidation = namedtuple(
+    "Liquidation",
+    ["liquidatedAmount", "loss", "balanceOfWant", "estimatedTotalAssets", "slippedOut"],
+)
+Report = namedtuple("Report", ["profit", "loss", "debtPayment", "slippedOut"])
+
+
+def _int(value):
+    return np.asarray(value, dtype=np.int64)
+
+
+def _mulBps(amount, bps):
+    # amount * bps / BASIS_ONE without overflowing int64
+    return amount // BASIS_ONE * bps + amount % BASIS_ONE * bps // BASIS_ONE
+
+
+def _exceedsSlippage(intended, actual, maxSlippageOut):
+    # True where _enforceSlippageOut reverts with "Slipped Out!"
+    slipped = np.maximum(intended - actual, 0)
+    return slipped > _mulBps(intended, maxSlippageOut)
+
+
+def liquidatePosition(
+    amountNeeded,
+    estimatedTotalAssets,
+    balanceOfWant,
+    slippageOut=0,
+    maxSlippageOut=MAX_SLIPPAGE_OUT,
+):
+    amountNeeded, eta, want = np.broadcast_arrays(
+        _int(amountNeeded), _int(estimatedTotalAssets), _int(balanceOfWant)
+    )
+    pooled = eta - want
+
+    # estimatedTotalAssets() < _amountNeeded: liquidateAllPositions
+    allWant = want + _mulBps(pooled, BASIS_ONE - slippageOut)
+    allLoss = np.maximum(amountNeeded - allWant, 0)
+    allSlipped = _exceedsSlippage(eta, allWant, maxSlippageOut)
+
+    # _amountNeeded > looseAmount: redeem the missing part
+    toExit = np.maximum(amountNeeded - want, 0)
+    redeemed = np.minimum(toExit, pooled)
+    partWant = want + _mulBps(redeemed, BASIS_ONE - slippageOut)
+    partLiquidated = np.minimum(partWant, amountNeeded)
+    partSlipped = _exceedsSlippage(toExit, partLiquidated - want, maxSlippageOut)
+    partEta = eta - (redeemed - (partWant - want))
+
+    liquidateAll = eta < amountNeeded
+    partial = ~liquidateAll & (amountNeeded > want)
+    return Liquidation(
+        liquidatedAmount=np.select(
+            [liquidateAll, partial], [allWant, partLiquidated], amountNeeded
+        ),
+        loss=np.select(
+            [liquidateAll, partial], [allLoss, amountNeeded - partLiquidated], 0
+        ),
+        balanceOfWant=np.select([liquidateAll, partial], [allWant, partWant], want),
+        estimatedTotalAssets=np.select(
+            [liquidateAll, partial], [allWant, partEta], eta
+        ),
+        slippedOut=np.select([liquidateAll, partial], [allSlipped, partSlipped], False),
+    )
+
+
+def prepareReturn(
+    totalDebt,
+    estimatedTotalAssets,
+    balanceOfWant,
+    debtOutstanding,
+    harvested=0,
+    collectFeesEnabled=False,
+    slippageOut=0,
+    maxSlippageOut=MAX_SLIPPAGE_OUT,
+    wantDust=WANT_DUST,
+):
+    debt, eta, want, debtOutstanding, harvested = np.broadcast_arrays(
+        _int(totalDebt),
+        _int(estimatedTotalAssets),
+        _int(balanceOfWant),
+        _int(debtOutstanding),
+        _int(harvested),
+    )
+
+    # liquidatePosition(_debtOutstanding), its return values are overwritten below
+    liquidated = liquidatePosition(
+        debtOutstanding, eta, want, slippageOut, maxSlippageOut
+    )
+    liquidate = debtOutstanding > 0
+    eta = np.where(liquidate, liquidated.estimatedTotalAssets, eta)
+    want = np.where(liquidate, liquidated.balanceOfWant, want)
+    slippedOut = liquidate & liquidated.slippedOut
+
+    if collectFeesEnabled:
+        # _collectTradingFees: liquidate the profit once it is above wantDust
+        fees = eta - debt
+        collected = liquidatePosition(fees, eta, want, slippageOut, maxSlippageOut)
+        collect = fees > wantDust
+        eta = np.where(collect, collected.estimatedTotalAssets, eta)
+        want = np.where(collect, collected.balanceOfWant, want)
+        slippedOut |= collect & collected.slippedOut
+
+    eta = eta + harvested
+    want = want + harvested
+
+    inProfit = eta > debt
+    profit = np.where(inProfit, np.minimum(eta - debt, want), 0)
+    debtPayment = np.where(
+        inProfit,
+        np.select(
+            [want < eta - debt, want > eta - debt + debtOutstanding],
+            [0, debtOutstanding],
+            want - profit,
+        ),
+        np.minimum(want, debtOutstanding),
+    )
+    loss = np.where(inProfit, 0, debt - eta)
+    return Report(profit, loss, debtPayment, slippedOut)
+
+
+def randomScenarios(n, seed=0, maxDebt=10 ** 15):
+    # (totalDebt, estimatedTotalAssets, balanceOfWant, debtOutstanding) spread around
+    # the debt
+    rng = np.random.default_rng(seed)
+    debt = rng.integers(0, maxDebt, n)
+    eta = (debt * rng.uniform(0.9, 1.1, n)).astype(np.int64)
+    want = (eta * rng.uniform(0, 0.2, n)).astype(np.int64)
+    debtOutstanding = np.where(
+        rng.random(n) < 0.5, 0, (debt * rng.uniform(0, 1.2, n)).astype(np.int64)
+    )
+    return debt, eta, want, debtOutstanding
+
+
+def main(scenarios=1_000_000):
+    scenarios = int(scenarios)
+    debt, eta, want, debtOutstanding = randomScenarios(scenarios)
+    start = time.perf_counter()
+    report = prepareReturn(debt, eta, want, debtOutstanding, slippageOut=3)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{scenarios} scenarios in {elapsed:.3f}s ({scenarios / elapsed:,.0f} per second)"
+    )
+    print(f"profit: {np.count_nonzero(report.profit)}")
+    print(f"loss: {np.count_nonzero(report.loss)}")
+    print(f"debt payment: {np.count_nonzero(report.debtPayment)}")
+    print(f"Slipped Out! reverts: {np.count_nonzero(report.slippedOut)}")
@@ -0,0 +1,292 @@
+import itertools
+import os
+import sys
+import time
+from dataclasses import dataclass
+
+import numpy as np
+from brownie import Strategy, network
+
+sys.path.append(os.path.dirname(__file__))
+
+from eventIndexer import EventIndex
+from harvestInterval import harvestGas
+
+# Realized profit, loss, pricePerShare and APR per harvest from the event index, and the
+# same history replayed under other keeper and strategy settings. A replay keeps the
+# reward flow and the LP fee growth of every interval and decides at each historical
+# harvest whether the alternative harvests too:
+#   - minProfit / maxReportDelay: harvestTrigger on the unsold rewards and the time since the last harvest
+#   - collectFeesEnabled: the LP surplus is redeemed, capped by the pool deltaCredit
+#   - maxSlippageIn / maxSlippageOut: the harvest reverts when the mint fee or the redeem shortfall exceeds them
+# Reward sales are priced on a QuoteCurve (scripts/sellSimulator.py) when one is given,
+# so bigger, rarer sales pay more price impact; otherwise at the historical price. An
+# alternative can only harvest where the history did, and gains are not compounded in
+# between.
+#   brownie run eventIndexer main <strategy> ...  # first
+#   brownie run aprBacktest main <strategy> [from block] [to block] [gas price gwei] [ETH price]
+SECONDS_PER_YEAR = 365 * 24 * 3600
+# extra gas of _collectTradingFees, used without a harvest_collect_fees snapshot
+COLLECT_GAS = 250_000
+
+
+def _float(values):
+    return np.asarray(values, dtype=float)
+
+
+@dataclass(frozen=True)
+class History:
+    # One entry per harvest, state after the harvest. Amounts in want (raw units).
+    block: np.ndarray
+    timestamp: np.ndarray
+    profit: np.ndarray
+    loss: np.ndarray
+    totalDebt: np.ndarray
+    estimatedTotalAssets: np.ndarray
+    pricePerShare: np.ndarray
+    lpBalance: np.ndarray
+    lpRate: np.ndarray  # want per LP
+    deltaCredit: np.ndarray  # in want
+    mintFeeBP: np.ndarray
+    collectFeesEnabled: np.ndarray
+    decimals: int
+
+    @classmethod
+    def load(cls, index, strategy, fromBlock=0, toBlock=None, decimals=6):
+        harvested = index.events(strategy, "Harvested")
+        snapshots = index.snapshots(strategy)
+        toBlock = np.iinfo(np.int64).max if toBlock is None else toBlock
+        blocks = harvested["block"]
+        keep = (
+            (blocks >= fromBlock)
+            & (blocks <= toBlock)
+            & np.isin(blocks, snapshots["block"])
+        )
+        if not keep.any():
+            raise ValueError(
+                f"No indexed harvests of {strategy} between blocks {fromBlock} and {toBlock}"
+            )
+        at = np.searchsorted(snapshots["block"], blocks[keep])
+        snap = {key: values[at] for key, values in snapshots.items()}
+        return cls(
+            block=blocks[keep],
+            timestamp=_float(snap["timestamp"]),
+            profit=_float(harvested["profit"][keep]),
+            loss=_float(harvested["loss"][keep]),
+            totalDebt=_float(snap["totalDebt"]),
+            estimatedTotalAssets=_float(snap["estimatedTotalAssets"]),
+            pricePerShare=_float(snap["pricePerShare"]),
+            lpBalance=_float(snap["lpBalance"]),
+            lpRate=_float(snap["totalLiquidity"])
+            * _float(snap["convertRate"])
+            / _float(snap["lpTotalSupply"]),
+            deltaCredit=_float(snap["deltaCredit"]) * _float(snap["convertRate"]),
+            mintFeeBP=_float(snap["mintFeeBP"]),
+            collectFeesEnabled=np.asarray(snap["collectFeesEnabled"], dtype=bool),
+            decimals=decimals,
+        )
+
+    def __len__(self):
+        return len(self.block)
+
+    @property
+    def years(self):
+        return (self.timestamp[-1] - self.timestamp[0]) / SECONDS_PER_YEAR
+
+    def realized(self):
+        # Per interval between harvests: APR of the reported result on the debt, and of
+        # the share price
+        elapsed = np.diff(self.timestamp) / SECONDS_PER_YEAR
+        apr = (self.profit[1:] - self.loss[1:]) / self.totalDebt[:-1] / elapsed
+        vaultApr = (self.pricePerShare[1:] / self.pricePerShare[:-1]) ** (
+            1 / elapsed
+        ) - 1
+        return {
+            "block": self.block[1:],
+            "profit": self.profit[1:],
+            "loss": self.loss[1:],
+            "pricePerShare": self.pricePerShare[1:],
+            "apr": apr,
+            "vaultApr": vaultApr,
+        }
+
+    def flows(self, wantDust=10 ** 6):
+        # (reward proceeds, LP fee growth) of every interval, and the surplus collected
+        # at its harvest
+        feeGrowth = self.lpBalance[:-1] * np.diff(self.lpRate)
+        surplus = np.maximum(
+            self.estimatedTotalAssets[:-1] - self.totalDebt[:-1] + feeGrowth, 0
+        )
+        collected = np.where(
+            self.collectFeesEnabled[1:] & (surplus > wantDust), surplus, 0
+        )
+        proceeds = np.maximum(self.profit[1:] - collected, 0)
+        return proceeds, feeGrowth, collected
+
+
+def grid(**axes):
+    # Cartesian product of the parameter axes, one flat array per parameter
+    names = list(axes)
+    rows = list(itertools.product(*(np.atleast_1d(axes[name]) for name in names)))
+    return {name: np.array([row[i] for row in rows]) for i, name in enumerate(names)}
+
+
+def backtest(
+    history,
+    params,
+    curve=None,
+    gas=700_000,
+    collectGas=COLLECT_GAS,
+    gasPrice=20,
+    ethPrice=1_500,
+    wantDust=10 ** 6,
+):
+    # Replays `history` for every parameter set in `params` (see grid). Missing
+    # parameters default to the strategy defaults. Returns one array per result, indexed
+    # like `params`.
+    size = len(next(iter(params.values())))
+    minProfit = _float(params.get("minProfit", np.zeros(size)))
+    maxReportDelay = _float(params.get("maxReportDelay", np.full(size, np.inf)))
+    collectFees = np.asarray(
+        params.get("collectFeesEnabled", np.zeros(size)), dtype=bool
+    )
+    maxSlippageIn = _float(params.get("maxSlippageIn", np.full(size, 5)))
+    maxSlippageOut = _float(params.get("maxSlippageOut", np.full(size, 5)))
+
+    unit = 10 ** history.decimals
+    proceeds, feeGrowth, _ = history.flows(wantDust)
+    if curve is None:
+        rewards = proceeds
+    else:
+        # Historical proceeds back to the STG sold, so a sale of any size can be priced
+        rewards = np.interp(proceeds / unit, curve.outputs, curve.amounts)
+    gasCost = gasPrice * 1e-9 * ethPrice * unit  # want per unit of gas
+
+    def sale(pending):
+        return (
+            pending
+            if curve is None
+            else np.interp(pending, curve.amounts, curve.outputs) * unit
+        )
+
+    pendingRewards = np.zeros(size)
+    surplus = np.zeros(size)
+    pendingLoss = np.zeros(size)
+    lastReport = np.full(size, history.timestamp[0])
+    gain = np.zeros(size)
+    loss = np.zeros(size)
+    harvests = np.zeros(size, dtype=int)
+    reverts = np.zeros(size, dtype=int)
+    spent = np.zeros(size)
+    for i in range(1, len(history)):
+        pendingRewards += rewards[i - 1]
+        surplus += feeGrowth[i - 1]
+        pendingLoss += history.loss[i]
+        value = sale(pendingRewards)
+        trigger = (value > minProfit) | (
+            history.timestamp[i] - lastReport > maxReportDelay
+        )
+
+        collected = np.where(collectFees & (surplus > wantDust), surplus, 0)
+        redeemed = np.minimum(collected, history.deltaCredit[i - 1])
+        slippedOut = collected - redeemed > collected * maxSlippageOut / 10_000
+        slippedIn = history.mintFeeBP[i] > maxSlippageIn
+        reverted = trigger & (slippedOut | slippedIn)
+        done = trigger & ~reverted
+
+        spent += (
+            np.where(trigger, gas + np.where(collected > 0, collectGas, 0), 0) * gasCost
+        )
+        gain += np.where(done, value + redeemed, 0)
+        loss += np.where(done, pendingLoss, 0)
+        surplus = np.where(done, surplus - collected, surplus)
+        pendingRewards = np.where(done, 0, pendingRewards)
+        pendingLoss = np.where(done, 0, pendingLoss)
+        lastReport = np.where(done, history.timestamp[i], lastReport)
+        harvests += done
+        reverts += reverted
+
+    # Time weighted debt over the history
+    debt = np.sum(history.totalDebt[:-1] * np.diff(history.timestamp)) / (
+        history.timestamp[-1] - history.timestamp[0]
+    )
+    years = history.years
+    return {
+        **params,
+        "harvests": harvests,
+        "reverts": reverts,
+        "gain": gain,
+        "loss": loss,
+        "unrealized": sale(pendingRewards) + surplus,
+        "gasCost": spent,
+        "apr": (gain - loss) / debt / years,
+        "netApr": (gain - loss - spent) / debt / years,
+    }
+
+
+def main(
+    strategy,
+    fromBlock=0,
+    toBlock=None,
+    gasPrice=20,
+    ethPrice=1_500,
+    source=None,
+    backend="fork",
+):
+    print(f"You are using the '{network.show_active()}' network")
+    strategy = Strategy.at(strategy)
+    index = EventIndex()
+    history = History.load(
+        index, strategy, int(fromBlock), None if toBlock is None else int(toBlock)
+    )
+    index.close()
+    if len(history) < 2:
+        print("Fewer than two indexed harvests in range, run eventIndexer first")
+        return
+    unit = 10 ** history.decimals
+
+    realized = history.realized()
+    print(
+        f"\n{len(history)} harvests from block {history.block[0]} to {history.block[-1]} ({history.years:.2f} years)"
+    )
+    print(
+        f"{'block':>10} {'profit':>14} {'loss':>12} {'pricePerShare':>14} {'APR':>8} {'vault APR':>10}"
+    )
+    for block, profit, loss, pps, apr, vaultApr in zip(*realized.values()):
+        print(
+            f"{block:>10} {profit / unit:>14,.2f} {loss / unit:>12,.2f} {pps / unit:>14.6f} {apr:>8.2%} {vaultApr:>10.2%}"
+        )
+
+    curve = None
+    if source is not None:
+        from sellSimulator import QuoteCurve
+
+        proceeds, _, _ = history.flows()
+        curve = QuoteCurve.build(source, max(proceeds.sum() / unit, 1) * 10)
+    params = grid(
+        minProfit=np.concatenate([[0], np.geomspace(100, 100_000, 31)]) * unit,
+        maxReportDelay=[7 * 24 * 3600, 30 * 24 * 3600],
+        collectFeesEnabled=[False, True],
+        maxSlippageIn=[5, 10],
+        maxSlippageOut=[5, 10, 30],
+    )
+    gas = harvestGas(backend)
+    collectGas = harvestGas(backend, "harvest_collect_fees", gas + COLLECT_GAS) - gas
+    start = time.perf_counter()
+    results = backtest(
+        history, params, curve, gas, collectGas, float(gasPrice), float(ethPrice)
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"\n{len(params['minProfit'])} parameter sets over {len(history)} harvests in {elapsed:.3f}s"
+    )
+    print(
+        f"{'minProfit':>12} {'delay d':>8} {'fees':>5} {'in':>4} {'out':>4} {'harvests':>9} {'reverts':>8} {'APR':>8} {'net APR':>8}"
+    )
+    for i in np.argsort(-results["netApr"])[:15]:
+        print(
+            f"{results['minProfit'][i] / unit:>12,.0f} {results['maxReportDelay'][i] / 86400:>8.0f} "
+            f"{str(results['collectFeesEnabled'][i]):>5} {results['maxSlippageIn'][i]:>4.0f} "
+            f"{results['maxSlippageOut'][i]:>4.0f} {results['harvests'][i]:>9} {results['reverts'][i]:>8} "
+            f"{results['apr'][i]:>8.2%} {results['netApr'][i]:>8.2%}"
+        )
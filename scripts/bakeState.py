@@ -0,0 +1,140 @@
+import json
+import os
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+from brownie import Strategy, accounts, chain, network, web3
+
+sys.path.append(os.path.dirname(__file__))
+
+import explorerCache
+import funding
+from deployStrategy import deploy, setupStrategy, setupVault
+from mockProtocol import deploy_mock_protocol, deployments, strategy_args
+from vaultProject import vaultContainer
+
+# Builds the state every test starts from (vault, strategy and funded users) once, and
+# dumps the node state so `brownie test --baked-state <sidecar>` can load it in one
+# call. Requires anvil (anvil_dumpState / anvil_loadState):
+#   brownie run bakeState main fork --network <anvil mainnet-fork>
+#   brownie run bakeState main mock --network <anvil development>
+STATE_DIR = Path(__file__).resolve().parent.parent / "build" / "state"
+
+USDT = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+USDT_WHALE = "0x5754284f345afc66a98fbb0a0afe71e0f007b949"
+STG = "0xAf5191B0De278C7286d6C7CC6ab6BB8A73bA2Cd6"
+STG_WHALE = "0x28c6c06298d514db089934071355e5743bf21d60"
+
+# Keep in sync with the accounts and amount fixtures in tests/conftest.py
+USERS = {"user": (0, 100_000), "user2": (9, 10_000), "user3": (7, 100_000)}
+
+
+Setup = namedtuple(
+    "Setup",
+    ["token", "reward", "reward_whale", "vault", "strategy", "amounts", "addresses"],
+)
+
+
+def rpc(method, params=()):
+    response = web3.provider.make_request(method, list(params))
+    if "error" in response:
+        raise ValueError(f"{method} failed: {response['error']}")
+    return response["result"]
+
+
+def setup(backend="fork"):
+    # Same deployment as the vault, strategy and amount fixtures in tests/conftest.py
+    gov = guardian = management = keeper = accounts[0]
+    rewards = accounts[1]
+    strategist = accounts[4]
+
+    addresses = {}
+    deploy_args = {}
+    if backend == "mock":
+        protocol = deploy_mock_protocol(accounts[0], accounts[8])
+        addresses["protocol"] = deployments(protocol)
+        deploy_args = strategy_args(protocol)
+        token, whale = protocol.want, protocol.whale
+        reward, reward_whale = protocol.reward, protocol.whale
+    else:
+        token = explorerCache.from_explorer(USDT)
+        whale = accounts.at(USDT_WHALE, force=True)
+        reward = explorerCache.from_explorer(STG)
+        reward_whale = accounts.at(STG_WHALE, force=True)
+
+    vault = guardian.deploy(vaultContainer())
+    setupVault(vault, token, gov, rewards, guardian, management)
+    strategy = deploy(Strategy, strategist, gov, vault, **deploy_args)
+    setupStrategy(strategy, vault, gov, keeper)
+
+    amounts = {
+        user: amount * 10 ** token.decimals() for user, (_, amount) in USERS.items()
+    }
+    funding.add_balances(
+        token,
+        {accounts[USERS[user][0]]: amount for user, amount in amounts.items()},
+        whale=whale,
+    )
+    chain.sleep(1)
+    chain.mine(1)
+
+    addresses.update(vault=vault.address, strategy=strategy.address)
+    return Setup(token, reward, reward_whale, vault, strategy, amounts, addresses)
+
+
+def bake(backend="fork", name=None):
+    deployment = setup(backend)
+
+    name = name or f"{backend}-{chain.id}"
+    STATE_DIR.mkdir(parents=True, exist_ok=True)
+    state_file = STATE_DIR / f"{name}.state"
+    state_file.write_text(rpc("anvil_dumpState"))
+    sidecar = {
+        "backend": backend,
+        "chain_id": chain.id,
+        "block": chain.height,
+        "state": state_file.name,
+        "addresses": deployment.addresses,
+        "amounts": deployment.amounts,
+    }
+    sidecar_file = STATE_DIR / f"{name}.json"
+    sidecar_file.write_text(json.dumps(sidecar, indent=2))
+    return sidecar_file
+
+
+def load(sidecar_file):
+    # Loads a baked state into the connected node and returns the sidecar
+    sidecar_file = Path(sidecar_file)
+    sidecar = json.loads(sidecar_file.read_text())
+    if sidecar["chain_id"] != chain.id:
+        raise ValueError(
+            f"State was baked on chain {sidecar['chain_id']}, connected to {chain.id}"
+        )
+    rpc("anvil_loadState", [(sidecar_file.parent / sidecar["state"]).read_text()])
+    return sidecar
+
+
+def restore(sidecar):
+    # The Setup of a state loaded with `load`
+    addresses = sidecar["addresses"]
+    if sidecar["backend"] == "mock":
+        from mockProtocol import load_mock_protocol
+
+        protocol = load_mock_protocol(addresses["protocol"], accounts[8])
+        token, reward, reward_whale = protocol.want, protocol.reward, protocol.whale
+    else:
+        token = explorerCache.from_explorer(USDT)
+        reward = explorerCache.from_explorer(STG)
+        reward_whale = accounts.at(STG_WHALE, force=True)
+    vault = vaultContainer().at(addresses["vault"])
+    strategy = Strategy.at(addresses["strategy"])
+    return Setup(
+        token, reward, reward_whale, vault, strategy, sidecar["amounts"], addresses
+    )
+
+
+def main(backend="fork", name=None):
+    print(f"You are using the '{network.show_active()}' network")
+    sidecar_file = bake(backend, name)
+    print(f"Baked state: {sidecar_file}")
@@ -0,0 +1,438 @@
+import os
+import sys
+from dataclasses import dataclass
+from decimal import Decimal, localcontext
+
+import numpy as np
+from brownie import network
+from brownie.network.contract import ContractCall
+
+sys.path.append(os.path.dirname(__file__))
+
+from mockProtocol import BALANCER_VAULT, STG
+from strategyState import aggregate
+
+# Offline quotes for the route _exitPoolExactBpt sells rewards through:
+#   STG -(pool1, weighted)-> bb-a-USD -(pool2, boosted stable)-> bb-a-USDT -(pool3, linear)-> USDT
+# Pool balances, weights, amplification, rates and fees come from one snapshot pinned to
+# a block; quotes follow the pools' fixed point math so they can stand in for
+# queryBatchSwap.
+#   brownie run balancerQuoter main [max STG] [points]
+# 50STG-50bb-a-USD
+POOL1_ID = "0x4ce0bd7debf13434d3ae127430e9bd4291bfb61f00020000000000000000038b"
+# bb-a-USD
+POOL2_ID = "0xa13a9247ea42d743238089903570127dda72fe4400000000000000000000035d"
+# bb-a-USDT
+POOL3_ID = "0x2f4eb100552ef93840d5adc30560e5513dfffacb000000000000000000000334"
+USDT = "0xdAC17F958D2ee523a2206206994597C13D831ec7"
+
+ONE = 10 ** 18
+AMP_PRECISION = 10 ** 3
+MAX_POW_RELATIVE_ERROR = 10_000  # 1e-14, LogExpMath tolerance
+MAX_IN_RATIO = 3 * 10 ** 17  # weighted pools take at most 30% of the balance in
+
+_uint256 = {"name": "", "type": "uint256"}
+BALANCER_ABI = {
+    "getPoolTokens": {
+        "inputs": [{"name": "poolId", "type": "bytes32"}],
+        "outputs": [
+            {"name": "tokens", "type": "address[]"},
+            {"name": "balances", "type": "uint256[]"},
+            {"name": "lastChangeBlock", "type": "uint256"},
+        ],
+    },
+    "getNormalizedWeights": {
+        "inputs": [],
+        "outputs": [{"name": "", "type": "uint256[]"}],
+    },
+    "getSwapFeePercentage": {"inputs": [], "outputs": [_uint256]},
+    "getAmplificationParameter": {
+        "inputs": [],
+        "outputs": [
+            {"name": "value", "type": "uint256"},
+            {"name": "isUpdating", "type": "bool"},
+            {"name": "precision", "type": "uint256"},
+        ],
+    },
+    "getTokenRate": {
+        "inputs": [{"name": "token", "type": "address"}],
+        "outputs": [_uint256],
+    },
+    "getWrappedTokenRate": {"inputs": [], "outputs": [_uint256]},
+    "getTargets": {
+        "inputs": [],
+        "outputs": [
+            {"name": "lowerTarget", "type": "uint256"},
+            {"name": "upperTarget", "type": "uint256"},
+        ],
+    },
+    "totalSupply": {"inputs": [], "outputs": [_uint256]},
+    "decimals": {"inputs": [], "outputs": [{"name": "", "type": "uint8"}]},
+    "queryBatchSwap": {
+        "inputs": [
+            {"name": "kind", "type": "uint8"},
+            {
+                "name": "swaps",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "poolId", "type": "bytes32"},
+                    {"name": "assetInIndex", "type": "uint256"},
+                    {"name": "assetOutIndex", "type": "uint256"},
+                    {"name": "amount", "type": "uint256"},
+                    {"name": "userData", "type": "bytes"},
+                ],
+            },
+            {"name": "assets", "type": "address[]"},
+            {
+                "name": "funds",
+                "type": "tuple",
+                "components": [
+                    {"name": "sender", "type": "address"},
+                    {"name": "fromInternalBalance", "type": "bool"},
+                    {"name": "recipient", "type": "address"},
+                    {"name": "toInternalBalance", "type": "bool"},
+                ],
+            },
+        ],
+        "outputs": [{"name": "", "type": "int256[]"}],
+    },
+}
+
+
+def _call(address, name):
+    abi = {
+        "name": name,
+        "type": "function",
+        "stateMutability": "view",
+        **BALANCER_ABI[name],
+    }
+    return ContractCall(address, abi, name, None)
+
+
+def queryBatchSwap(amount, sender, block=None):
+    # USDT out of the batchSwap _exitPoolExactBpt sends, asked from the Balancer vault
+    pools = (POOL1_ID, POOL2_ID, POOL3_ID)
+    swaps = [
+        (pool, i, i + 1, amount if i == 0 else 0, "0x") for i, pool in enumerate(pools)
+    ]
+    assets = [STG, POOL2_ID[:42], POOL3_ID[:42], USDT]
+    funds = (sender, False, sender, False)
+    _, (deltas,) = aggregate(
+        [(_call(BALANCER_VAULT, "queryBatchSwap"), (0, swaps, assets, funds))], block
+    )
+    return -deltas[-1]
+
+
+# FixedPoint
+
+
+def mulDown(a, b):
+    return a * b // ONE
+
+
+def mulUp(a, b):
+    product = a * b
+    return 0 if product == 0 else (product - 1) // ONE + 1
+
+
+def divDown(a, b):
+    return a * ONE // b
+
+
+def divUp(a, b):
+    return 0 if a == 0 else (a * ONE - 1) // b + 1
+
+
+def complement(x):
+    return ONE - x if x < ONE else 0
+
+
+def powUp(x, y):
+    # LogExpMath.pow is accurate to ~1e-18, well inside the error FixedPoint adds on top
+    with localcontext() as context:
+        context.prec = 50
+        raw = int((Decimal(x) / ONE) ** (Decimal(y) / ONE) * ONE)
+    return raw + mulUp(raw, MAX_POW_RELATIVE_ERROR) + 1
+
+
+def _divRounding(a, b, roundUp):
+    return (0 if a == 0 else (a - 1) // b + 1) if roundUp else a // b
+
+
+# WeightedMath
+
+
+def weightedOutGivenIn(balanceIn, weightIn, balanceOut, weightOut, amountIn):
+    if amountIn > mulDown(balanceIn, MAX_IN_RATIO):
+        raise ValueError("BAL#304")  # MAX_IN_RATIO
+    base = divUp(balanceIn, balanceIn + amountIn)
+    power = powUp(base, divDown(weightIn, weightOut))
+    return mulDown(balanceOut, complement(power))
+
+
+# StableMath
+
+
+def stableInvariant(amp, balances, roundUp=True):
+    total = sum(balances)
+    if total == 0:
+        return 0
+    n = len(balances)
+    invariant = total
+    ampTimesTotal = amp * n
+    for _ in range(255):
+        P_D = balances[0] * n
+        for balance in balances[1:]:
+            P_D = _divRounding(P_D * balance * n, invariant, roundUp)
+        previous = invariant
+        invariant = _divRounding(
+            n * invariant * invariant
+            + _divRounding(ampTimesTotal * total * P_D, AMP_PRECISION, roundUp),
+            (n + 1) * invariant
+            + _divRounding(
+                (ampTimesTotal - AMP_PRECISION) * P_D, AMP_PRECISION, not roundUp
+            ),
+            roundUp,
+        )
+        if abs(invariant - previous) <= 1:
+            return invariant
+    raise ValueError("BAL#321")  # STABLE_INVARIANT_DIDNT_CONVERGE
+
+
+def stableBalanceGivenInvariant(amp, balances, invariant, tokenIndex):
+    n = len(balances)
+    ampTimesTotal = amp * n
+    total = balances[0]
+    P_D = balances[0] * n
+    for balance in balances[1:]:
+        P_D = P_D * balance * n // invariant
+        total += balance
+    total -= balances[tokenIndex]
+    inv2 = invariant * invariant
+    c = (
+        _divRounding(inv2, ampTimesTotal * P_D, True)
+        * AMP_PRECISION
+        * balances[tokenIndex]
+    )
+    b = total + invariant // ampTimesTotal * AMP_PRECISION
+    tokenBalance = _divRounding(inv2 + c, invariant + b, True)
+    for _ in range(255):
+        previous = tokenBalance
+        tokenBalance = _divRounding(
+            tokenBalance * tokenBalance + c, tokenBalance * 2 + b - invariant, True
+        )
+        if abs(tokenBalance - previous) <= 1:
+            return tokenBalance
+    raise ValueError("BAL#322")  # STABLE_GET_BALANCE_DIDNT_CONVERGE
+
+
+def stableTokenOutGivenBptIn(
+    amp, balances, tokenIndex, bptIn, bptSupply, fee, invariant=None
+):
+    invariant = stableInvariant(amp, balances) if invariant is None else invariant
+    newInvariant = mulUp(divUp(bptSupply - bptIn, bptSupply), invariant)
+    newBalance = stableBalanceGivenInvariant(amp, balances, newInvariant, tokenIndex)
+    amountOutWithoutFee = balances[tokenIndex] - newBalance
+    # Only the part of the exit that is not proportional pays the fee
+    taxablePercentage = complement(divDown(balances[tokenIndex], sum(balances)))
+    taxableAmount = mulUp(amountOutWithoutFee, taxablePercentage)
+    return amountOutWithoutFee - taxableAmount + mulDown(taxableAmount, complement(fee))
+
+
+# LinearMath
+
+
+def _toNominal(real, fee, lowerTarget, upperTarget):
+    if real < lowerTarget:
+        return real - mulDown(lowerTarget - real, fee)
+    if real <= upperTarget:
+        return real
+    return real - mulDown(real - upperTarget, fee)
+
+
+def _fromNominal(nominal, fee, lowerTarget, upperTarget):
+    if nominal < lowerTarget:
+        return divDown(nominal + mulDown(fee, lowerTarget), ONE + fee)
+    if nominal <= upperTarget:
+        return nominal
+    return divDown(nominal - mulDown(fee, upperTarget), ONE - fee)
+
+
+def linearMainOutGivenBptIn(
+    bptIn, mainBalance, wrappedBalance, bptSupply, fee, lowerTarget, upperTarget
+):
+    previousNominalMain = _toNominal(mainBalance, fee, lowerTarget, upperTarget)
+    invariant = previousNominalMain + wrappedBalance
+    deltaNominalMain = divDown(mulDown(invariant, bptIn), bptSupply)
+    newMainBalance = _fromNominal(
+        previousNominalMain - deltaNominalMain, fee, lowerTarget, upperTarget
+    )
+    return mainBalance - newMainBalance
+
+
+@dataclass(frozen=True)
+class RouteSnapshot:
+    block: int
+    # pool1, weighted STG / bb-a-USD
+    stgBalance: int
+    bbaUsdBalance: int
+    stgWeight: int
+    bbaUsdWeight: int
+    pool1Fee: int
+    # pool2, bb-a-USD, balances upscaled with the cached token rates, BPT excluded
+    pool2Balances: tuple
+    pool2TokenIndex: int  # bb-a-USDT
+    pool2Amp: int
+    pool2Fee: int
+    pool2VirtualSupply: int
+    pool2ScalingOut: int
+    # pool3, bb-a-USDT, upscaled
+    mainBalance: int
+    wrappedBalance: int
+    pool3VirtualSupply: int
+    pool3Fee: int
+    lowerTarget: int
+    upperTarget: int
+    mainScaling: int
+
+    @classmethod
+    def read(cls, block=None):
+        pool2, pool3 = POOL2_ID[:42], POOL3_ID[:42]
+        getPoolTokens = _call(BALANCER_VAULT, "getPoolTokens")
+        block, tokens = aggregate(
+            [(getPoolTokens, (poolId,)) for poolId in (POOL1_ID, POOL2_ID, POOL3_ID)],
+            block,
+        )
+        (
+            (tokens1, balances1, _),
+            (tokens2, balances2, _),
+            (tokens3, balances3, _),
+        ) = tokens
+        tokens1, tokens2, tokens3 = (
+            [str(token).lower() for token in t] for t in (tokens1, tokens2, tokens3)
+        )
+        stable = [token for token in tokens2 if token != pool2]
+        wrapped = next(token for token in tokens3 if token not in (pool3, USDT.lower()))
+
+        _, values = aggregate(
+            [
+                (_call(POOL1_ID[:42], "getNormalizedWeights"), ()),
+                (_call(POOL1_ID[:42], "getSwapFeePercentage"), ()),
+                (_call(pool2, "getAmplificationParameter"), ()),
+                (_call(pool2, "getSwapFeePercentage"), ()),
+                (_call(pool2, "totalSupply"), ()),
+                *((_call(pool2, "getTokenRate"), (token,)) for token in stable),
+                (_call(pool3, "getSwapFeePercentage"), ()),
+                (_call(pool3, "getTargets"), ()),
+                (_call(pool3, "getWrappedTokenRate"), ()),
+                (_call(pool3, "totalSupply"), ()),
+                (_call(USDT, "decimals"), ()),
+                (_call(wrapped, "decimals"), ()),
+            ],
+            block,
+        )
+        weights, fee1, amp, fee2, supply2 = values[:5]
+        rates = values[5 : 5 + len(stable)]
+        (
+            fee3,
+            (lowerTarget, upperTarget),
+            wrappedRate,
+            supply3,
+            mainDecimals,
+            wrappedDecimals,
+        ) = values[5 + len(stable) :]
+
+        stgIndex = tokens1.index(STG.lower())
+        # Linear pool BPTs have 18 decimals, so their scaling factor is their rate
+        pool2Balances = tuple(
+            mulDown(balances2[tokens2.index(token)], rate)
+            for token, rate in zip(stable, rates)
+        )
+        tokenIndex = stable.index(pool3)
+        mainScaling = ONE * 10 ** (18 - mainDecimals)
+        wrappedScaling = mulDown(ONE * 10 ** (18 - wrappedDecimals), wrappedRate)
+        return cls(
+            block=block,
+            stgBalance=balances1[stgIndex],
+            bbaUsdBalance=balances1[1 - stgIndex],
+            stgWeight=weights[stgIndex],
+            bbaUsdWeight=weights[1 - stgIndex],
+            pool1Fee=fee1,
+            pool2Balances=pool2Balances,
+            pool2TokenIndex=tokenIndex,
+            pool2Amp=amp[0],
+            pool2Fee=fee2,
+            pool2VirtualSupply=supply2 - balances2[tokens2.index(pool2)],
+            pool2ScalingOut=rates[tokenIndex],
+            mainBalance=mulDown(balances3[tokens3.index(USDT.lower())], mainScaling),
+            wrappedBalance=mulDown(balances3[tokens3.index(wrapped)], wrappedScaling),
+            pool3VirtualSupply=supply3 - balances3[tokens3.index(pool3)],
+            pool3Fee=fee3,
+            lowerTarget=lowerTarget,
+            upperTarget=upperTarget,
+            mainScaling=mainScaling,
+        )
+
+    def quote(self, amounts):
+        # USDT out for each STG amount in, 0 where a pool would revert
+        invariant = stableInvariant(self.pool2Amp, list(self.pool2Balances))
+        out = []
+        for amount in amounts:
+            amount = int(amount)
+            try:
+                bbaUsd = weightedOutGivenIn(
+                    self.stgBalance,
+                    self.stgWeight,
+                    self.bbaUsdBalance,
+                    self.bbaUsdWeight,
+                    amount - mulUp(amount, self.pool1Fee),
+                )
+                bbaUsdt = stableTokenOutGivenBptIn(
+                    self.pool2Amp,
+                    list(self.pool2Balances),
+                    self.pool2TokenIndex,
+                    bbaUsd,
+                    self.pool2VirtualSupply,
+                    self.pool2Fee,
+                    invariant,
+                )
+                bbaUsdt = divDown(bbaUsdt, self.pool2ScalingOut)
+                usdt = linearMainOutGivenBptIn(
+                    bbaUsdt,
+                    self.mainBalance,
+                    self.wrappedBalance,
+                    self.pool3VirtualSupply,
+                    self.pool3Fee,
+                    self.lowerTarget,
+                    self.upperTarget,
+                )
+                out.append(divDown(usdt, self.mainScaling))
+            except ValueError:
+                out.append(0)
+        return np.array(out, dtype=object)
+
+    def priceImpact(self, amounts, reference=ONE):
+        # 1 - execution price / price of selling `reference` STG
+        spot = Decimal(int(self.quote([reference])[0])) / reference
+        return np.array(
+            [
+                1 - float(Decimal(int(out)) / int(amount) / spot) if amount else 0.0
+                for amount, out in zip(amounts, self.quote(amounts))
+            ]
+        )
+
+
+def main(maxAmount=100_000, points=10):
+    print(f"You are using the '{network.show_active()}' network")
+    snapshot = RouteSnapshot.read()
+    amounts = [
+        int(maxAmount) * ONE * i // int(points) for i in range(1, int(points) + 1)
+    ]
+    print(f"\n====STG -> USDT route==== (block {snapshot.block})")
+    print(f"{'STG in':>14} {'USDT out':>16} {'USDT/STG':>10} {'impact':>8}")
+    for amount, out, impact in zip(
+        amounts, snapshot.quote(amounts), snapshot.priceImpact(amounts)
+    ):
+        print(
+            f"{amount / ONE:>14,.0f} {out / 1e6:>16,.2f} {out / 1e6 / (amount / ONE):>10,.4f} {impact:>8.2%}"
+        )
@@ -1,13 +1,17 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+import os
+import sys
 
-from brownie import Strategy, accounts, config, network, project, web3
+from brownie import ZERO_ADDRESS, Strategy, accounts, network, web3
+from brownie.network.contract import ContractTx
 from eth_utils import is_checksum_address
 import click
+import yaml
 
-API_VERSION = config["dependencies"][0].split("@")[-1]
-Vault = project.load(
-    Path.home() / ".brownie" / "packages" / config["dependencies"][0]
-).Vault
+sys.path.append(os.path.dirname(__file__))
+
+from vaultProject import API_VERSION, vaultContainer
 
 
 def get_address(msg: str, default: str = None) -> str:
@@ -35,7 +39,7 @@ def main():
     print(f"You are using: 'dev' [{dev.address}]")
 
     if input("Is there a Vault for this strategy already? y/[N]: ").lower() == "y":
-        vault = Vault.at(get_address("Deployed Vault: "))
+        vault = vaultContainer().at(get_address("Deployed Vault: "))
         assert vault.apiVersion() == API_VERSION
     else:
         print("You should deploy one vault using scripts from Vault project")
@@ -73,4 +77,144 @@ def main():
 def addHealthCheck(strategy, deployer):
     healthCheck = "0x72f8ac48eb2a90876b3fa20016d6531319ec7b03"
     strategy.setHealthCheck(healthCheck,{"from":deployer})
-    return healthCheck
\ No newline at end of file
+    return healthCheck
+
+
+# Fixed gas limits for the configuration calls, so one the deployer is not allowed to
+# make is still sent and reported as FAILED instead of aborting the batch on estimation
+CONFIG_GAS_LIMIT = 150_000
+ADD_STRATEGY_GAS_LIMIT = 400_000
+
+
+def strategyCall(address, name, *args):
+    # Calldata for a Strategy method
+    abi = next(
+        item
+        for item in Strategy.abi
+        if item.get("name") == name and item["type"] == "function"
+    )
+    return ContractTx(address, abi, name, None).encode_input(*args)
+
+
+def configCalls(entry, vault, strategy):
+    # [(label, to, data, gas limit)] configuring `strategy` as the manifest entry says
+    calls = []
+    if "keeper" in entry:
+        data = strategyCall(strategy, "setKeeper", entry["keeper"])
+        calls.append(("setKeeper", strategy, data, CONFIG_GAS_LIMIT))
+    if "healthCheck" in entry:
+        data = strategyCall(strategy, "setHealthCheck", entry["healthCheck"])
+        calls.append(("setHealthCheck", strategy, data, CONFIG_GAS_LIMIT))
+    # setDust and setParams are onlyVaultManagers, addStrategy is onlyGovernance
+    if "dust" in entry:
+        dust = entry["dust"]
+        data = strategyCall(
+            strategy, "setDust", int(dust["rewards"]), int(dust["want"])
+        )
+        calls.append(("setDust", strategy, data, CONFIG_GAS_LIMIT))
+    if "params" in entry:
+        params = entry["params"]
+        data = strategyCall(
+            strategy, "setParams", params["maxSlippageIn"], params["maxSlippageOut"]
+        )
+        calls.append(("setParams", strategy, data, CONFIG_GAS_LIMIT))
+    if "addStrategy" in entry:
+        add = entry["addStrategy"]
+        data = vault.addStrategy.encode_input(
+            strategy,
+            add["debtRatio"],
+            add.get("minDebtPerHarvest", 0),
+            int(add.get("maxDebtPerHarvest", 2 ** 256 - 1)),
+            add.get("performanceFee", 0),
+        )
+        calls.append(("addStrategy", vault, data, ADD_STRATEGY_GAS_LIMIT))
+    return calls
+
+
+def wait(sent, confirmations):
+    # Waits for every pending transaction of [(label, tx or None)] concurrently
+    pending = [tx for _, tx in sent if tx is not None]
+    if not pending:
+        return
+    print(
+        f"\nSent {len(pending)} transactions, "
+        f"waiting for {confirmations} confirmation(s)"
+    )
+    with ThreadPoolExecutor(max_workers=len(pending)) as executor:
+        list(executor.map(lambda tx: tx.wait(confirmations), pending))
+
+
+def batch(manifest_path):
+    """
+    Non-interactive deployment of every strategy listed in a YAML manifest, e.g.
+    deployments/mainnet.example.yml:
+
+        brownie run deploy batch deployments/mainnet.yml --network mainnet
+
+    The deploys are all sent up front with locally assigned nonces and awaited
+    concurrently, then the configuration calls of the strategies that deployed are sent
+    and awaited the same way. The calls of a strategy whose deploy failed are not sent
+    and are reported as FAILED.
+    """
+    manifest = yaml.safe_load(Path(manifest_path).read_text())
+    entries = manifest.get("strategies") or []
+    if not entries:
+        print(f"No strategies in {manifest_path}")
+        return
+    print(f"You are using the '{network.show_active()}' network")
+    password = os.getenv(manifest.get("password_env", "DEPLOYER_PASSWORD"))
+    dev = accounts.load(manifest["account"], password=password)
+    print(f"You are using: 'dev' [{dev.address}]")
+    confirmations = manifest.get("confirmations", 1)
+
+    nonce = dev.nonce
+    deploys = []
+    for entry in entries:
+        vault = vaultContainer().at(entry["vault"])
+        assert vault.apiVersion() == API_VERSION
+        deployArgs = [
+            vault,
+            entry["masterChef"],
+            entry["masterChefPoolId"],
+            entry["stargateRouter"],
+            entry["liquidityPoolId"],
+        ]
+        tx = Strategy.deploy(
+            *deployArgs, {"from": dev, "nonce": nonce, "required_confs": 0}
+        )
+        deploys.append((entry, vault, tx))
+        nonce += 1
+    sent = [(f"deploy {vault.symbol()} strategy", tx) for _, vault, tx in deploys]
+    wait(sent, confirmations)
+
+    configs = []
+    deployed = []
+    for entry, vault, tx in deploys:
+        if tx.status != 1:
+            # Nothing to configure, the calls would only hit an address without code
+            calls = configCalls(entry, vault, ZERO_ADDRESS)
+            configs += [(label, None) for label, *_ in calls]
+            continue
+        strategy = tx.contract_address
+        deployed.append((vault, strategy))
+        for label, to, data, gas_limit in configCalls(entry, vault, strategy):
+            call = dev.transfer(
+                to, 0, data=data, gas_limit=gas_limit, nonce=nonce, required_confs=0
+            )
+            configs.append((label, call))
+            nonce += 1
+    wait(configs, confirmations)
+    sent += configs
+
+    failed = [label for label, tx in sent if tx is None or tx.status != 1]
+    for label, tx in sent:
+        status = "ok" if tx is not None and tx.status == 1 else "FAILED"
+        txid = tx.txid if tx is not None else "not sent, the deploy failed"
+        print(f"{status:<7} {label:<30} {txid}")
+    for vault, strategy in deployed:
+        print(f"Strategy for {vault.symbol()} [{vault}]: {strategy}")
+    if failed:
+        raise RuntimeError(f"{len(failed)} transaction(s) failed")
+    if manifest.get("publish_source"):
+        for _, strategy in deployed:
+            Strategy.publish_source(Strategy.at(strategy))
@@ -1,16 +1,13 @@
-from pathlib import Path
 import sys
 import os
 
-from brownie import Strategy, accounts, config, network, project, web3
+from brownie import Strategy, accounts, network, web3
 from eth_utils import is_checksum_address
 import click
 
+sys.path.append(os.path.dirname(__file__))
 
-API_VERSION = config["dependencies"][0].split("@")[-1]
-Vault = project.load(
-    Path.home() / ".brownie" / "packages" / config["dependencies"][0]
-).Vault
+from vaultProject import API_VERSION, vaultContainer
 
 
 def get_address(msg: str, default: str = None) -> str:
@@ -35,7 +32,7 @@ def get_address(msg: str, default: str = None) -> str:
 def main():
     print(f"You are using the '{network.show_active()}' network")
 
-    vault = Vault.at("0x0000000000000000000000000000000000000000")
+    vault = vaultContainer().at("0x0000000000000000000000000000000000000000")
     strategy = Strategy.at("0x19d48C96d1A69A1ecf923B52383A67Bc59B2Fcd7")
 
     print(
@@ -78,15 +75,24 @@ def addHealthCheck(strategy, gov, deployer):
     strategy.setHealthCheck(healthCheck,{"from":deployer})
     return healthCheck
 
-def deploy(Strategy, deployer, gov ,vault):
+def deploy(
+    Strategy,
+    deployer,
+    gov,
+    vault,
+    masterChef="0xB0D502E938ed5f4df2E681fE6E419ff29631d62b",
+    masterChefPoolId=1,
+    stargateRouter="0x8731d54E9D02c286767d56ac03e8037C07e01e98",
+    liquidityPoolId=2,
+):
     print(f"""vault: {vault}""")
 
     deployArgs= [
         vault, 
-        "0xB0D502E938ed5f4df2E681fE6E419ff29631d62b",# _masterChef
-        1, # _masterChefPoolId
-        "0x8731d54E9D02c286767d56ac03e8037C07e01e98", # _stargateRouter
-        2, # _liquidityPoolId
+        masterChef, # _masterChef
+        masterChefPoolId, # _masterChefPoolId
+        stargateRouter, # _stargateRouter
+        liquidityPoolId, # _liquidityPoolId
     ] 	
 	
 
@@ -95,3 +101,20 @@ def deploy(Strategy, deployer, gov ,vault):
     
     return strategy
     
+
+
+def setupVault(vault, token, gov, rewards, guardian, management):
+    # Test configuration: no deposit limit and no fees
+    vault.initialize(token, gov, rewards, "", "", guardian, management, {"from": guardian})
+    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
+    vault.setManagement(management, {"from": gov})
+    vault.setPerformanceFee(0,  {"from": gov})
+    vault.setManagementFee(0,  {"from": gov})
+    return vault
+
+
+def setupStrategy(strategy, vault, gov, keeper):
+    strategy.setKeeper(keeper, {"from": gov})
+    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
+    strategy.setDust(1e18, 1e6, {"from": gov})
+    return strategy
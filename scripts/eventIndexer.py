@@ -0,0 +1,360 @@
+import json
+import os
+import sqlite3
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+import numpy as np
+import requests
+from brownie import Strategy, chain, interface, network, web3
+from hexbytes import HexBytes
+from web3.exceptions import BlockNotFound
+
+sys.path.append(os.path.dirname(__file__))
+
+from mockProtocol import LP_TOKEN
+from strategyState import aggregate
+from vaultProject import vaultContainer
+
+# Incremental index of the strategy and vault events in a local SQLite file. Logs are
+# fetched with eth_getLogs in block ranges that halve when the node rejects a request
+# and double while responses stay small. Only blocks `confirmations` deep are indexed;
+# the cursor keeps the hash of its block, and if a resumed run finds another hash there
+# the last REWIND blocks are dropped and indexed again, for every strategy indexed on
+# that vault. Every block with a report also gets a snapshot of the vault
+# (pricePerShare, totalAssets, totalSupply), the strategy position and the Stargate pool
+# read at that block.
+#   brownie run eventIndexer main <strategy> [confirmations] [start block] --network mainnet
+INDEX_DB = Path(
+    os.getenv(
+        "EVENT_INDEX_DB",
+        Path(__file__).resolve().parent.parent / "build" / "events.sqlite",
+    )
+)
+CONFIRMATIONS = 12
+REWIND = 256
+INITIAL_CHUNK = 2_000
+MAX_CHUNK = 500_000
+TARGET_LOGS = 1_000  # stop growing the range above this many logs per response
+
+STRATEGY_EVENTS = ("Harvested", "EmergencyExitEnabled")
+# Deposit and Withdraw only exist in some vault versions; share mints and burns are
+# always Transfer events from and to the zero address
+VAULT_EVENTS = ("StrategyReported", "Deposit", "Withdraw", "Transfer")
+REPORT_EVENTS = ("Harvested", "StrategyReported")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    chainId INTEGER, block INTEGER, logIndex INTEGER, address TEXT, event TEXT, txHash TEXT, args TEXT,
+    PRIMARY KEY (chainId, block, logIndex)
+);
+CREATE INDEX IF NOT EXISTS events_by_name ON events (chainId, address, event, block);
+CREATE TABLE IF NOT EXISTS snapshots (
+    chainId INTEGER, strategy TEXT, block INTEGER, timestamp INTEGER, state TEXT,
+    PRIMARY KEY (chainId, strategy, block)
+);
+CREATE TABLE IF NOT EXISTS cursors (
+    chainId INTEGER, strategy TEXT, block INTEGER, hash TEXT, vault TEXT,
+    PRIMARY KEY (chainId, strategy)
+);
+"""
+
+Sync = namedtuple(
+    "Sync", ["fromBlock", "toBlock", "requests", "logs", "snapshots", "rewound"]
+)
+
+
+def _decoders(contract, names):
+    # (address, topic0) -> web3 event used to decode the log
+    events = web3.eth.contract(address=contract.address, abi=contract.abi).events
+    return {
+        (contract.address.lower(), HexBytes(topic)): getattr(events, name)()
+        for name, topic in contract.topics.items()
+        if name in names
+    }
+
+
+def _blockHash(block):
+    try:
+        return web3.toHex(web3.eth.get_block(block).hash)
+    except BlockNotFound:
+        return None
+
+
+def _column(values):
+    # int64 when every value fits, Python ints otherwise
+    try:
+        return np.array(values, dtype=np.int64)
+    except OverflowError:
+        return np.array(values, dtype=object)
+    except (TypeError, ValueError):
+        return np.array(values)
+
+
+class EventIndex:
+    def __init__(self, path=INDEX_DB):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def cursor(self, strategy):
+        # (block, hash) of the last indexed block, None before the first sync
+        return self.db.execute(
+            "SELECT block, hash FROM cursors WHERE chainId = ? AND strategy = ?",
+            (chain.id, str(strategy)),
+        ).fetchone()
+
+    def _rewind(self, strategy, vault, block):
+        # Drops everything above `block`, the next sync indexes it again. The vault
+        # events are shared by every strategy of the vault, so their cursors move back
+        # to `block` as well.
+        shared = self.db.execute(
+            "SELECT strategy FROM cursors WHERE chainId = ? AND vault = ? AND strategy != ? AND block > ?",
+            (chain.id, str(vault), str(strategy), block),
+        ).fetchall()
+        strategies = [str(strategy)] + [row[0] for row in shared]
+        marks = ", ".join("?" * len(strategies))
+        with self.db:
+            self.db.execute(
+                f"DELETE FROM events WHERE chainId = ? AND block > ? AND address IN (?, {marks})",
+                (chain.id, block, str(vault), *strategies),
+            )
+            self.db.execute(
+                f"DELETE FROM snapshots WHERE chainId = ? AND block > ? AND strategy IN ({marks})",
+                (chain.id, block, *strategies),
+            )
+            self.db.execute(
+                "DELETE FROM cursors WHERE chainId = ? AND strategy = ?",
+                (chain.id, str(strategy)),
+            )
+            for other in strategies[1:]:
+                if block < 0:
+                    self.db.execute(
+                        "DELETE FROM cursors WHERE chainId = ? AND strategy = ?",
+                        (chain.id, other),
+                    )
+                else:
+                    self.db.execute(
+                        "UPDATE cursors SET block = ?, hash = ? WHERE chainId = ? AND strategy = ?",
+                        (block, _blockHash(block), chain.id, other),
+                    )
+
+    def _snapshot(self, strategy, vault, block):
+        lpToken = interface.ILpPool(LP_TOKEN)
+        block, values = aggregate(
+            [
+                (vault.pricePerShare, ()),
+                (vault.totalAssets, ()),
+                (vault.totalSupply, ()),
+                (vault.strategies, (strategy,)),
+                (strategy.estimatedTotalAssets, ()),
+                (strategy.balanceOfWant, ()),
+                (strategy.balanceOfLpTokens, ()),
+                (strategy.balanceOfLPInMasterChef, ()),
+                (strategy.collectFeesEnabled, ()),
+                (lpToken.totalLiquidity, ()),
+                (lpToken.totalSupply, ()),
+                (lpToken.deltaCredit, ()),
+                (lpToken.convertRate, ()),
+                (lpToken.mintFeeBP, ()),
+            ],
+            block,
+        )
+        (
+            pps,
+            totalAssets,
+            totalSupply,
+            params,
+            eta,
+            want,
+            lp,
+            lpInMasterChef,
+            collectFees,
+            *pool,
+        ) = values
+        state = {
+            "pricePerShare": pps,
+            "totalAssets": totalAssets,
+            "totalSupply": totalSupply,
+            "totalDebt": params.dict()["totalDebt"],
+            "estimatedTotalAssets": eta,
+            "balanceOfWant": want,
+            "lpBalance": lp + lpInMasterChef,
+            "collectFeesEnabled": int(collectFees),
+            **dict(
+                zip(
+                    (
+                        "totalLiquidity",
+                        "lpTotalSupply",
+                        "deltaCredit",
+                        "convertRate",
+                        "mintFeeBP",
+                    ),
+                    pool,
+                )
+            ),
+        }
+        return (
+            chain.id,
+            str(strategy),
+            block,
+            web3.eth.get_block(block).timestamp,
+            json.dumps(state),
+        )
+
+    def sync(
+        self, strategy, vault, confirmations=CONFIRMATIONS, start=0, chunk=INITIAL_CHUNK
+    ):
+        # Indexes from the cursor (or `start`) up to `confirmations` blocks below the
+        # head
+        decoders = {
+            **_decoders(strategy, STRATEGY_EVENTS),
+            **_decoders(vault, VAULT_EVENTS),
+        }
+        topics = sorted({web3.toHex(topic) for _, topic in decoders})
+
+        rewound = False
+        cursor = self.cursor(strategy)
+        if cursor is not None and _blockHash(cursor[0]) != cursor[1]:
+            rewound = True
+            self._rewind(strategy, vault, max(cursor[0] - REWIND, start - 1))
+            start = max(cursor[0] - REWIND + 1, start)
+        elif cursor is not None:
+            start = cursor[0] + 1
+
+        target = web3.eth.block_number - confirmations
+        fromBlock, calls, logCount, snapshotCount = start, 0, 0, 0
+        while start <= target:
+            end = min(start + chunk - 1, target)
+            calls += 1
+            try:
+                logs = web3.eth.get_logs(
+                    {
+                        "address": [strategy.address, vault.address],
+                        "topics": [topics],
+                        "fromBlock": start,
+                        "toBlock": end,
+                    }
+                )
+            except (ValueError, requests.exceptions.RequestException):
+                # Range too large, too many results or a timeout
+                if chunk == 1:
+                    raise
+                chunk = max(chunk // 2, 1)
+                continue
+
+            rows, reportBlocks = [], set()
+            for log in logs:
+                decoder = decoders.get(
+                    (log["address"].lower(), HexBytes(log["topics"][0]))
+                )
+                if decoder is None:
+                    continue
+                event = decoder.processLog(log)
+                if (
+                    event.event == "StrategyReported"
+                    and event.args.strategy != strategy.address
+                ):
+                    continue
+                if event.event in REPORT_EVENTS:
+                    reportBlocks.add(event.blockNumber)
+                rows.append(
+                    (
+                        chain.id,
+                        event.blockNumber,
+                        event.logIndex,
+                        str(log["address"]),
+                        event.event,
+                        web3.toHex(event.transactionHash),
+                        json.dumps(dict(event.args)),
+                    )
+                )
+            snapshots = [
+                self._snapshot(strategy, vault, block) for block in sorted(reportBlocks)
+            ]
+
+            # Events, snapshots and the cursor of a range are committed together
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO events VALUES (?, ?, ?, ?, ?, ?, ?)", rows
+                )
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?, ?)", snapshots
+                )
+                self.db.execute(
+                    "INSERT OR REPLACE INTO cursors (chainId, strategy, block, hash, vault) VALUES (?, ?, ?, ?, ?)",
+                    (chain.id, str(strategy), end, _blockHash(end), str(vault)),
+                )
+            logCount += len(rows)
+            snapshotCount += len(snapshots)
+            if len(logs) < TARGET_LOGS:
+                chunk = min(chunk * 2, MAX_CHUNK)
+            start = end + 1
+        return Sync(fromBlock, target, calls, logCount, snapshotCount, rewound)
+
+    # Readers, one array per column in block order
+
+    def events(self, address, name, **where):
+        # Columns of event `name` emitted by `address`, filtered on the argument values
+        # in `where`
+        rows = self.db.execute(
+            "SELECT block, logIndex, txHash, args FROM events "
+            "WHERE chainId = ? AND address = ? AND event = ? ORDER BY block, logIndex",
+            (chain.id, str(address), name),
+        ).fetchall()
+        records = [
+            (block, logIndex, txHash, json.loads(args))
+            for block, logIndex, txHash, args in rows
+        ]
+        records = [
+            record
+            for record in records
+            if all(record[3].get(k) == v for k, v in where.items())
+        ]
+        columns = {
+            "block": _column([record[0] for record in records]),
+            "logIndex": _column([record[1] for record in records]),
+            "txHash": np.array([record[2] for record in records], dtype=object),
+        }
+        names = records[0][3].keys() if records else ()
+        for key in names:
+            columns[key] = _column([record[3][key] for record in records])
+        return columns
+
+    def snapshots(self, strategy):
+        rows = self.db.execute(
+            "SELECT block, timestamp, state FROM snapshots WHERE chainId = ? AND strategy = ? ORDER BY block",
+            (chain.id, str(strategy)),
+        ).fetchall()
+        states = [json.loads(state) for _, _, state in rows]
+        columns = {
+            "block": _column([row[0] for row in rows]),
+            "timestamp": _column([row[1] for row in rows]),
+        }
+        for key in states[0] if states else ():
+            columns[key] = _column([state[key] for state in states])
+        return columns
+
+
+def main(strategy, confirmations=CONFIRMATIONS, start=0):
+    print(f"You are using the '{network.show_active()}' network")
+    strategy = Strategy.at(strategy)
+    vault = vaultContainer().at(strategy.vault())
+    index = EventIndex()
+    result = index.sync(strategy, vault, int(confirmations), int(start))
+    if result.rewound:
+        print(f"Cursor block was reorganised, re-indexed from block {result.fromBlock}")
+    print(
+        f"Indexed blocks {result.fromBlock} to {result.toBlock} in {result.requests} eth_getLogs requests: "
+        f"{result.logs} events, {result.snapshots} snapshots -> {index.path}"
+    )
+    for name in STRATEGY_EVENTS:
+        print(f"{name}: {len(index.events(strategy, name)['block'])}")
+    for name in VAULT_EVENTS:
+        print(f"{name}: {len(index.events(vault, name)['block'])}")
+    index.close()
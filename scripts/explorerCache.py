@@ -0,0 +1,88 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from brownie import Contract, chain
+
+# Content addressed store for verified ABIs and sources.
+#   manifest.json      "<chain id>:<address>" -> {"name", "abi", "sources"} (blob digests)
+#   objects/<sha256>   the blobs themselves, shared between entries with the same content
+CACHE_DIR = Path(
+    os.getenv(
+        "EXPLORER_CACHE_DIR",
+        Path(__file__).resolve().parent.parent / "build" / "explorer_cache",
+    )
+)
+MANIFEST = CACHE_DIR / "manifest.json"
+
+
+def _write_atomic(path, data):
+    # xdist workers may write the same file, a rename keeps readers from seeing half a
+    # file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(data)
+    os.replace(tmp, path)
+
+
+def _put_blob(obj):
+    data = json.dumps(obj, sort_keys=True, separators=(",", ":"))
+    digest = hashlib.sha256(data.encode()).hexdigest()
+    path = CACHE_DIR / "objects" / digest
+    if not path.exists():
+        _write_atomic(path, data)
+    return digest
+
+
+def _get_blob(digest):
+    return json.loads((CACHE_DIR / "objects" / digest).read_text())
+
+
+def load_manifest():
+    if not MANIFEST.exists():
+        return {}
+    return json.loads(MANIFEST.read_text())
+
+
+def _key(address):
+    return f"{chain.id}:{address.lower()}"
+
+
+def fetch(address):
+    # Always hits the explorer and records the result
+    contract = Contract.from_explorer(address)
+    entry = {"name": contract._name, "abi": _put_blob(contract.abi), "sources": None}
+    if contract._sources:
+        entry["sources"] = _put_blob(contract._sources)
+
+    manifest = load_manifest()
+    manifest[_key(address)] = entry
+    _write_atomic(MANIFEST, json.dumps(manifest, indent=2, sort_keys=True))
+    return contract
+
+
+def from_explorer(address, refresh=False):
+    # Drop-in for Contract.from_explorer that only goes to the network on a cache miss
+    entry = load_manifest().get(_key(address))
+    if entry is None or refresh:
+        return fetch(address)
+    return Contract.from_abi(entry["name"], address, _get_blob(entry["abi"]))
+
+
+def sources(address):
+    entry = load_manifest().get(_key(address))
+    if entry is None or entry["sources"] is None:
+        return None
+    return _get_blob(entry["sources"])
+
+
+def main():
+    # brownie run explorerCache: refresh every entry for the active chain
+    prefix = f"{chain.id}:"
+    addresses = [
+        key[len(prefix) :] for key in load_manifest() if key.startswith(prefix)
+    ]
+    for address in addresses:
+        contract = fetch(address)
+        print(f"Refreshed {contract._name} [{address}]")
@@ -0,0 +1,58 @@
+import time
+
+from brownie import chain, web3
+from brownie.network import rpc
+
+# Mines many blocks in one request so block based emissions (MasterChef pendingStargate)
+# accrue for real instead of through airdrops. Blocks are spaced `seconds / blocks`
+# apart. Each dev node has its own method; nodes with none of them fall back to
+# chain.mine, one request per block.
+#   fastForward.mine(7200)             # a day of mainnet blocks, 12s apart
+#   fastForward.mine(300, seconds=60)  # 300 blocks within a minute
+BLOCK_TIME = 12
+
+_mine_method = None
+
+
+def _request(method, blocks, interval):
+    if method == "evm_mine":
+        # Ganache 7 mines the blocks in one call but at one timestamp, so the time moves
+        # first
+        web3.provider.make_request("evm_increaseTime", [blocks * interval])
+        return web3.provider.make_request("evm_mine", [{"blocks": blocks}])
+    return web3.provider.make_request(method, [hex(blocks), hex(interval)])
+
+
+def mine(blocks, seconds=None):
+    # Returns the new height
+    global _mine_method
+    blocks = int(blocks)
+    if blocks <= 0:
+        return web3.eth.block_number
+    interval = BLOCK_TIME if seconds is None else max(int(seconds) // blocks, 1)
+    latest = web3.eth.get_block("latest")
+    target = latest.number + blocks
+
+    methods = (
+        [_mine_method] if _mine_method else ["hardhat_mine", "anvil_mine", "evm_mine"]
+    )
+    for method in methods:
+        response = _request(method, blocks, interval)
+        # Older ganache accepts evm_mine with options but mines a single block
+        if "error" not in response and web3.eth.block_number >= target:
+            _mine_method = method
+            break
+    else:
+        _mine_method = None
+        chain.mine(
+            target - web3.eth.block_number,
+            timestamp=latest.timestamp + blocks * interval,
+        )
+
+    # Keep brownie's clock (chain.time, chain.sleep) on the node's
+    chain._time_offset = web3.eth.get_block("latest").timestamp - int(time.time())
+    if _mine_method:
+        # As chain.mine does, so chain.undo() stops at the fast-forwarded blocks
+        chain._redo_buffer.clear()
+        chain._current_id = rpc.Rpc().snapshot()
+    return web3.eth.block_number
@@ -0,0 +1,225 @@
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+from brownie import accounts, chain, interface, network, web3
+
+sys.path.append(os.path.dirname(__file__))
+
+import funding
+from harvestInterval import HOURS_PER_YEAR, baseFeeSamples
+from strategyState import MULTICALL3, aggregate
+
+# Whether collectFeesEnabled pays. With it set, every harvest redeems the LP value grown
+# over totalDebt (_collectTradingFees), reports it as profit and reinvests it. That
+# costs the extra gas of the MasterChef withdraw, instantRedeemLocal and re-deposit,
+# plus what the redeem and the reinvestment lose. A surplus that is not collected stays
+# in the pool, earning the same, until it is collected or the strategy exits. So
+# collecting pays when the fees of an interval are worth more than collecting them
+# costs, and a harvest reverts when they exceed the pool's deltaCredit by more than
+# maxSlippageOut. The costs are measured on the connected node and the fee rate is the
+# growth of the LP value over `lookback` blocks.
+#   brownie run feeCollection main [fork|mock] [surplus] [lookback blocks] [ETH price] [fee APR]
+BASIS_ONE = 10_000
+CADENCES = np.array([6, 12, 24, 48, 24 * 7, 24 * 14, 24 * 30])  # hours between harvests
+TVLS = np.geomspace(10_000, 100_000_000, 9)
+
+
+@dataclass(frozen=True)
+class CollectionCost:
+    block: int
+    # extra harvest gas of collectFeesEnabled without a surplus over wantDust
+    idleGas: int
+    collectGas: int  # extra harvest gas of collecting a surplus
+    # share of the collected surplus lost to the redeem and the reinvestment
+    roundTripBps: float
+    deltaCredit: float  # want, the most instantRedeemLocal pays out
+    maxSlippageOut: int
+    wantDust: float  # want
+    decimals: int
+
+    @classmethod
+    def measure(cls, deployment, amount=None, surplus=1_000):
+        # Harvests with and without collectFeesEnabled from the same state, undoing
+        # both, first without and then with a `surplus` (in want) tended into the pool
+        # over the debt
+        gov = accounts[0]
+        token, vault, strategy = deployment.token, deployment.vault, deployment.strategy
+        unit = 10 ** token.decimals()
+        amount = amount or deployment.amounts["user"]
+        token.approve(vault, amount, {"from": gov})
+        vault.deposit(amount, {"from": gov})
+        chain.sleep(1)
+        strategy.harvest({"from": gov})
+
+        def harvest(enabled):
+            strategy.setCollectFeesEnabled(enabled, {"from": gov})
+            tx = strategy.harvest({"from": gov})
+            result = (
+                tx.gas_used,
+                tx.events["Harvested"]["profit"],
+                strategy.estimatedTotalAssets(),
+            )
+            chain.undo(2)
+            return result
+
+        idle = harvest(True)[0] - harvest(False)[0]
+        funding.add_balances(token, {strategy: int(surplus * unit)})
+        strategy.tend({"from": gov})
+        chain.sleep(1)
+        (gasOn, profitOn, etaOn), (gasOff, profitOff, etaOff) = harvest(True), harvest(
+            False
+        )
+        collected = profitOn - profitOff
+
+        pool = interface.ILpPool(strategy.lpToken())
+        block, (deltaCredit, convertRate, maxSlippageOut, wantDust) = aggregate(
+            [
+                (pool.deltaCredit, ()),
+                (pool.convertRate, ()),
+                (strategy.maxSlippageOut, ()),
+                (strategy.wantDust, ()),
+            ]
+        )
+        return cls(
+            block=block,
+            idleGas=max(idle, 0),
+            collectGas=gasOn - gasOff,
+            roundTripBps=(etaOff - etaOn) / collected * BASIS_ONE
+            if collected > 0
+            else 0.0,
+            deltaCredit=deltaCredit * convertRate / unit,
+            maxSlippageOut=maxSlippageOut,
+            wantDust=wantDust / unit,
+            decimals=token.decimals(),
+        )
+
+
+def _deployedAt(addresses, block):
+    # First block up to `block` at which every address has code
+    low = 0
+    while low < block:
+        middle = (low + block) // 2
+        if all(web3.eth.get_code(address, middle) for address in addresses):
+            block = middle
+        else:
+            low = middle + 1
+    return block
+
+
+def feeApr(strategy, lookback=50_400, block=None):
+    # Annualised growth of the want value of the strategy's LP token over the last
+    # `lookback` blocks, or since the pool (or Multicall3) was deployed when that is
+    # more recent
+    pool = interface.ILpPool(strategy.lpToken())
+    block = chain.height if block is None else block
+    start = max(block - lookback, 0)
+    contracts = (pool.address, MULTICALL3)
+    if not all(web3.eth.get_code(address, start) for address in contracts):
+        start = _deployedAt(contracts, block)
+    rates, times = [], []
+    for at in (start, block):
+        _, (liquidity, supply) = aggregate(
+            [(pool.totalLiquidity, ()), (pool.totalSupply, ())], at
+        )
+        if supply == 0:
+            return 0.0  # nothing was deposited yet, no history to measure
+        rates.append(liquidity / supply)
+        times.append(web3.eth.get_block(at).timestamp)
+    years = (times[1] - times[0]) / (HOURS_PER_YEAR * 3600)
+    if years <= 0:
+        return 0.0
+    return (rates[1] / rates[0]) ** (1 / years) - 1
+
+
+def simulate(cost, apr, tvls, cadences, baseFees, ethPrice, priorityFee=1e9):
+    # Net result of collecting at every harvest, per TVL (rows, want) and cadence
+    # (columns, hours)
+    tvls = np.asarray(tvls, dtype=float)[:, None]
+    hours = np.asarray(cadences, dtype=float)[None, :]
+    # want per unit of gas
+    gasPrice = (np.mean(baseFees) + priorityFee) / 1e18 * ethPrice
+
+    fees = tvls * apr * hours / HOURS_PER_YEAR  # surplus grown between two harvests
+    active = fees > cost.wantDust
+    gasCost = np.where(active, cost.collectGas, cost.idleGas) * gasPrice
+    lost = np.where(active, fees * cost.roundTripBps / BASIS_ONE, 0)
+    shortfall = fees - np.minimum(fees, cost.deltaCredit)
+    reverts = active & (shortfall > fees * cost.maxSlippageOut / BASIS_ONE)
+    net = np.where(active, fees, 0) - lost - gasCost
+    return {
+        "tvl": tvls[:, 0],
+        "cadence": hours[0],
+        "fees": fees,
+        "gasCost": gasCost,
+        "net": net,
+        "netApr": net * HOURS_PER_YEAR / hours / tvls,
+        "reverts": reverts,
+        "profitable": (net > 0) & ~reverts,
+    }
+
+
+def breakEven(cost, apr, cadences, baseFees, ethPrice, priorityFee=1e9):
+    # Smallest TVL (want) at which collecting every `cadence` hours pays for itself, as
+    # simulate counts it: the fees of an interval have to be over wantDust to be
+    # collected at all, and there is none (inf) when the harvest already reverts on
+    # deltaCredit there. idleGas is paid with or without collecting, so it cancels out.
+    gasPrice = (np.mean(baseFees) + priorityFee) / 1e18 * ethPrice
+    perTvl = apr * np.asarray(cadences, dtype=float) / HOURS_PER_YEAR
+    netPerTvl = perTvl * (1 - cost.roundTripBps / BASIS_ONE)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tvl = np.where(
+            netPerTvl > 0,
+            np.maximum(cost.collectGas * gasPrice / netPerTvl, cost.wantDust / perTvl),
+            np.inf,
+        )
+        fees = tvl * perTvl
+        shortfall = fees - np.minimum(fees, cost.deltaCredit)
+        reverts = shortfall > fees * cost.maxSlippageOut / BASIS_ONE
+    return np.where(reverts, np.inf, tvl)
+
+
+def main(backend="fork", surplus=1_000, lookback=50_400, ethPrice=1_500, apr=None):
+    print(f"You are using the '{network.show_active()}' network")
+    from bakeState import setup
+
+    deployment = setup(backend)
+    cost = CollectionCost.measure(deployment, surplus=float(surplus))
+    apr = feeApr(deployment.strategy, int(lookback)) if apr is None else float(apr)
+    baseFees = baseFeeSamples()
+    print(f"\nMeasured at block {cost.block}:")
+    print(
+        f"  extra harvest gas: {cost.collectGas:,} collecting, {cost.idleGas:,} with nothing to collect"
+    )
+    print(f"  round trip loss: {cost.roundTripBps:.3f} bps of the collected surplus")
+    print(
+        f"  deltaCredit: {cost.deltaCredit:,.0f}, maxSlippageOut: {cost.maxSlippageOut} bps"
+    )
+    print(
+        f"  LP fee APR: {apr:.3%} over {int(lookback)} blocks, mean base fee {np.mean(baseFees) / 1e9:.1f} gwei"
+    )
+    if apr <= 0:
+        print("\nThe LP value did not grow, there is nothing to collect")
+        return
+
+    result = simulate(cost, apr, TVLS, CADENCES, baseFees, float(ethPrice))
+    print(
+        "\nNet APR of collecting at every harvest (bps, R: the harvest reverts on deltaCredit)"
+    )
+    print(f"{'TVL':>14} " + " ".join(f"{f'{hours:.0f}h':>9}" for hours in CADENCES))
+    for i, tvl in enumerate(result["tvl"]):
+        cells = [
+            "R" if revert else f"{netApr * BASIS_ONE:.2f}"
+            for netApr, revert in zip(result["netApr"][i], result["reverts"][i])
+        ]
+        print(f"{tvl:>14,.0f} " + " ".join(f"{cell:>9}" for cell in cells))
+
+    print(f"\n{'cadence':>8} {'break-even TVL':>16}")
+    for hours, tvl in zip(
+        CADENCES, breakEven(cost, apr, CADENCES, baseFees, float(ethPrice))
+    ):
+        print(f"{hours:>7.0f}h {tvl:>16,.0f}")
+    print(
+        "\nEnable collectFeesEnabled when the strategy TVL is above the break-even of its harvest cadence"
+    )
@@ -0,0 +1,263 @@
+import os
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+
+import pandas as pd
+import requests
+from brownie import network, project
+from brownie._config import CONFIG
+
+sys.path.append(os.path.dirname(__file__))
+
+# Runs scenario functions in parallel, each worker process driving its own local node on
+# its own port. Fork nodes all fork the same pinned block. With `cache` they fork
+# through a scripts/rpcCache.py proxy instead of the upstream, so they share the
+# upstream state: the URL of a running proxy, or True to start one for the run. Every
+# worker deploys (or loads a baked state, anvil only) once, snapshots, and reverts to
+# the snapshot after each scenario, so scenarios are independent. A node is relaunched
+# every `recycle` scenarios to bound its memory. Scenarios are module level functions
+# `scenario(deployment, **params)`, deployment being a bakeState.Setup, returning a dict
+# (or a value) that becomes a row of the DataFrame:
+#   results = forkPool.run([(withdrawSlippage, {"share": 0.5}), ...], nodes=8)
+#   brownie run forkPool main [nodes] [network] [backend] [state] [cache URL or True]
+PROJECT_ROOT = Path(__file__).resolve().parent.parent
+POOL_DIR = PROJECT_ROOT / "build" / "fork_pool"
+BASE_PORT = 8600
+
+# State of a worker process
+_worker = None
+
+
+def _upstream(name):
+    # URL of the node a development network forks
+    fork = CONFIG.networks[name]["cmd_settings"]["fork"]
+    if fork in CONFIG.networks:
+        fork = CONFIG.networks[fork]["host"]
+    return os.path.expandvars(fork)
+
+
+def _serveCache(upstream, port):
+    # Starts an rpcCache proxy of `upstream` in a thread, returns the server and its URL
+    import rpcCache
+
+    server = rpcCache.serve(rpcCache.CachingProxy(upstream, rpcCache.RpcCache()), port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{port}"
+
+
+def forkHeight(name):
+    response = requests.post(
+        _upstream(name),
+        json={"jsonrpc": "2.0", "id": 0, "method": "eth_blockNumber", "params": []},
+        timeout=30,
+    )
+    response.raise_for_status()
+    return int(response.json()["result"], 16)
+
+
+class _Node:
+    def __init__(self, name, port, forkBlock, backend, state, cache=None):
+        self.name = name
+        self.port = port
+        self.forkBlock = forkBlock
+        self.cache = cache
+        self.backend = backend
+        self.state = state
+        self.runs = 0
+        self.deployment = None
+
+    def start(self):
+        settings = CONFIG.networks[self.name]["cmd_settings"]
+        settings["port"] = self.port
+        if "fork" in settings and (
+            self.forkBlock is not None or self.cache is not None
+        ):
+            fork = self.cache or _upstream(self.name).split("@")[0]
+            if "anvil" in CONFIG.networks[self.name]["cmd"]:
+                settings["fork"] = fork
+                if self.forkBlock is not None:
+                    settings["fork_block"] = self.forkBlock
+            else:
+                # Ganache takes the block after the URL
+                if settings["fork"] in CONFIG.networks:
+                    settings.setdefault(
+                        "chain_id", int(CONFIG.networks[settings["fork"]]["chainid"])
+                    )
+                settings["fork"] = (
+                    fork if self.forkBlock is None else f"{fork}@{self.forkBlock}"
+                )
+        network.connect(self.name)
+
+        import bakeState
+
+        if self.state is None:
+            self.deployment = bakeState.setup(self.backend)
+        else:
+            self.deployment = bakeState.restore(bakeState.load(self.state))
+
+        from brownie import chain
+
+        chain.snapshot()
+
+    def run(self, scenario, params):
+        from brownie import chain
+
+        if not network.is_connected():
+            self.start()
+        try:
+            result = scenario(self.deployment, **params)
+        finally:
+            # Reverts to the deployment and snapshots it again
+            chain.revert()
+            self.runs += 1
+        return result
+
+    def recycle(self, every):
+        if every and self.runs >= every:
+            # Disconnecting kills the node brownie launched
+            network.disconnect()
+            self.runs = 0
+
+
+class _Connected(_Node):
+    # The node this process is connected to, around an existing deployment
+    def __init__(self, deployment):
+        from brownie import chain
+
+        super().__init__(network.show_active(), None, None, None, None)
+        self.deployment = deployment
+        chain.snapshot()
+
+
+def _init(ports, name, forkBlock, backend, state, recycle, cache):
+    global _worker
+    sys.path[:0] = [str(PROJECT_ROOT), os.path.dirname(__file__)]
+    project.load(PROJECT_ROOT, raise_if_loaded=False)
+    _worker = (_Node(name, ports.get(), forkBlock, backend, state, cache), recycle)
+
+
+def _record(node, scenario, params):
+    row = {"scenario": scenario.__name__, **params}
+    start = time.perf_counter()
+    try:
+        result = node.run(scenario, params)
+        row.update(result if isinstance(result, dict) else {"result": result})
+        row["error"] = None
+    except Exception:
+        row["error"] = traceback.format_exc(limit=3)
+    row.update(seconds=time.perf_counter() - start, port=node.port, pid=os.getpid())
+    return row
+
+
+def _task(scenario, params):
+    node, recycle = _worker
+    row = _record(node, scenario, params)
+    node.recycle(recycle)
+    return row
+
+
+def run(
+    scenarios,
+    nodes=os.cpu_count(),
+    recycle=50,
+    name="mainnet-fork",
+    forkBlock=None,
+    basePort=BASE_PORT,
+    backend="fork",
+    state=None,
+    cache=None,
+):
+    # `scenarios`: (function, params dict) pairs. Returns one row per scenario, in
+    # order.
+    server = None
+    if "fork" in CONFIG.networks[name].get("cmd_settings", {}):
+        if forkBlock is None:
+            forkBlock = forkHeight(name)
+        if cache is True:
+            # On the port below the nodes'
+            server, cache = _serveCache(_upstream(name).split("@")[0], basePort - 1)
+    else:
+        cache = None
+    # brownie's state does not survive a fork of the process
+    context = get_context("spawn")
+    manager = context.Manager()
+    ports = manager.Queue()
+    for port in range(basePort, basePort + nodes):
+        ports.put(port)
+
+    rows = [None] * len(scenarios)
+    with ProcessPoolExecutor(
+        nodes,
+        mp_context=context,
+        initializer=_init,
+        initargs=(ports, name, forkBlock, backend, state, recycle, cache),
+    ) as pool:
+        futures = {
+            pool.submit(_task, scenario, params): i
+            for i, (scenario, params) in enumerate(scenarios)
+        }
+        for future in as_completed(futures):
+            rows[futures[future]] = future.result()
+    manager.shutdown()
+    if server is not None:
+        server.shutdown()
+    return pd.DataFrame(rows)
+
+
+def serial(scenarios, deployment):
+    # Same as run, one scenario after the other on the connected node
+    node = _Connected(deployment)
+    return pd.DataFrame(
+        [_record(node, scenario, params) for scenario, params in scenarios]
+    )
+
+
+def withdrawSlippage(deployment, share):
+    # Loss of withdrawing `share` of the vault right after the first harvest
+    from brownie import accounts
+
+    token, vault, strategy = deployment.token, deployment.vault, deployment.strategy
+    user = accounts[0]
+    amount = deployment.amounts["user"]
+    token.approve(vault, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    strategy.harvest({"from": user})
+
+    shares = int(vault.balanceOf(user) * share)
+    before = token.balanceOf(user)
+    tx = vault.withdraw(shares, user, 10_000, {"from": user})
+    received = token.balanceOf(user) - before
+    expected = amount * share
+    return {
+        "received": received,
+        "lossBps": (expected - received) / expected * 10_000,
+        "gas": tx.gas_used,
+    }
+
+
+def main(
+    nodes=os.cpu_count(), name="mainnet-fork", backend="fork", state=None, cache=None
+):
+    print(f"Running on {int(nodes)} '{name}' nodes")
+    scenarios = [(withdrawSlippage, {"share": share / 20}) for share in range(1, 21)]
+    cache = True if cache in (True, "True", "true") else cache
+    start = time.perf_counter()
+    results = run(
+        scenarios,
+        int(nodes),
+        name=name,
+        backend=backend,
+        state=state or None,
+        cache=cache,
+    )
+    print(f"{len(results)} scenarios in {time.perf_counter() - start:.1f}s")
+    print(results.to_string())
+    POOL_DIR.mkdir(parents=True, exist_ok=True)
+    path = POOL_DIR / f"withdrawSlippage-{name}.csv"
+    results.to_csv(path, index=False)
+    print(f"Saved to {path}")
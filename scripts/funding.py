@@ -0,0 +1,213 @@
+import json
+import os
+from functools import partial
+from pathlib import Path
+
+import requests
+from brownie import chain, web3
+from eth_utils import keccak
+
+# Funds accounts by writing ERC20 balances straight into storage instead of sending
+# whale transfers. The balance mapping slot is found once per token by probing and
+# cached on disk.
+SLOT_CACHE = Path(__file__).resolve().parent.parent / "build" / "balance_slots.json"
+MAX_PROBED_SLOT = 20
+SENTINEL = 0x1337_0000_0000_0000_0000_1337
+
+_slots = {}
+_set_storage_method = None
+_set_balance_method = None
+
+
+def _rpc(method, params):
+    response = web3.provider.make_request(method, params)
+    if "error" in response:
+        raise ValueError(f"{method} failed: {response['error']}")
+    return response["result"]
+
+
+def post_batch(uri, calls):
+    # Responses to [(method, params)] sent to `uri` as one JSON-RPC batch, in order
+    payload = [
+        {"jsonrpc": "2.0", "id": i, "method": method, "params": params}
+        for i, (method, params) in enumerate(calls)
+    ]
+    responses = requests.post(uri, json=payload).json()
+    if not isinstance(responses, list):
+        raise ValueError(f"Batch request failed: {responses.get('error')}")
+    return sorted(responses, key=lambda r: r["id"])
+
+
+def batch(calls):
+    # One JSON-RPC batch request through the provider's make_batch_request, which
+    # rpcProfile wraps, or straight to its endpoint when it has none. One request per
+    # call when the provider is not HTTP.
+    send = getattr(web3.provider, "make_batch_request", None)
+    if send is None:
+        uri = getattr(web3.provider, "endpoint_uri", None)
+        if uri is None:
+            return [_rpc(method, params) for method, params in calls]
+        send = partial(post_batch, uri)
+    responses = send(calls)
+    errors = [r["error"] for r in responses if "error" in r]
+    if errors:
+        raise ValueError(f"Batch request failed: {errors[0]}")
+    return [r["result"] for r in responses]
+
+
+def _word(value):
+    return "0x" + value.to_bytes(32, "big").hex()
+
+
+def _storage_key(slot, account, vyper):
+    # Solidity: keccak256(key . slot), Vyper: keccak256(slot . key)
+    account = bytes.fromhex(str(account)[2:].rjust(64, "0"))
+    slot = slot.to_bytes(32, "big")
+    return "0x" + keccak(slot + account if vyper else account + slot).hex()
+
+
+def _set_storage(token, key, value):
+    global _set_storage_method
+    methods = (
+        [_set_storage_method]
+        if _set_storage_method
+        else [
+            "hardhat_setStorageAt",
+            "anvil_setStorageAt",
+            "evm_setAccountStorageAt",
+        ]
+    )
+    for method in methods:
+        response = web3.provider.make_request(method, [token, key, _word(value)])
+        if "error" not in response:
+            _set_storage_method = method
+            return
+    raise ValueError(f"Node does not support setting storage: {response['error']}")
+
+
+def _storage_method(address):
+    # Resolves which setStorageAt flavour the node speaks with a no-op write
+    if _set_storage_method is None:
+        _set_storage(
+            address,
+            _word(0),
+            int(_rpc("eth_getStorageAt", [address, _word(0), "latest"]), 16),
+        )
+    return _set_storage_method
+
+
+def _load_slots():
+    if not _slots and SLOT_CACHE.exists():
+        _slots.update(json.loads(SLOT_CACHE.read_text()))
+    return _slots
+
+
+def _save_slots():
+    SLOT_CACHE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = SLOT_CACHE.with_name(f"{SLOT_CACHE.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(_slots, indent=2, sort_keys=True))
+    os.replace(tmp, SLOT_CACHE)
+
+
+def balance_slot(token):
+    # Returns (slot, vyper) for the balance mapping of `token`
+    cache_key = f"{chain.id}:{token.address.lower()}"
+    slots = _load_slots()
+    if cache_key in slots:
+        return tuple(slots[cache_key])
+
+    probe = "0x000000000000000000000000000000000000dEaD"
+    for slot in range(MAX_PROBED_SLOT):
+        for vyper in (False, True):
+            key = _storage_key(slot, probe, vyper)
+            original = int(_rpc("eth_getStorageAt", [token.address, key, "latest"]), 16)
+            _set_storage(token.address, key, SENTINEL)
+            found = token.balanceOf(probe) == SENTINEL
+            _set_storage(token.address, key, original)
+            if found:
+                slots[cache_key] = [slot, vyper]
+                _save_slots()
+                return slot, vyper
+    raise ValueError(f"Balance slot not found for {token.address}")
+
+
+def set_balances(token, balances):
+    # balances: {account: amount}. Writes every balance in a single batch request.
+    slot, vyper = balance_slot(token)
+    method = _storage_method(token.address)
+    batch(
+        [
+            (
+                method,
+                [
+                    token.address,
+                    _storage_key(slot, str(account), vyper),
+                    _word(int(amount)),
+                ],
+            )
+            for account, amount in balances.items()
+        ]
+    )
+
+
+def add_balances(token, amounts, whale=None):
+    # Credits `amounts` on top of the current balances. Falls back to transfers from
+    # `whale` on nodes that cannot write storage.
+    try:
+        current = batch(
+            [
+                (
+                    "eth_call",
+                    [
+                        {
+                            "to": token.address,
+                            "data": token.balanceOf.encode_input(account),
+                        },
+                        "latest",
+                    ],
+                )
+                for account in amounts
+            ]
+        )
+        set_balances(
+            token,
+            {
+                account: int(balance, 16) + int(amount)
+                for (account, amount), balance in zip(amounts.items(), current)
+            },
+        )
+    except ValueError:
+        if whale is None:
+            raise
+        for account, amount in amounts.items():
+            token.transfer(account, amount, {"from": whale})
+
+
+def set_eth_balances(accounts, amount):
+    # Gives every account `amount` wei of ether, in a single batch request
+    global _set_balance_method
+    methods = (
+        [_set_balance_method]
+        if _set_balance_method
+        else [
+            "hardhat_setBalance",
+            "anvil_setBalance",
+            "evm_setAccountBalance",
+        ]
+    )
+    accounts = [str(account) for account in accounts]
+    for method in methods:
+        # Resolves the flavour on the first account, then sends the rest
+        response = web3.provider.make_request(method, [accounts[0], hex(int(amount))])
+        if "error" not in response:
+            _set_balance_method = method
+            break
+    else:
+        raise ValueError(f"Node does not support setting balances: {response['error']}")
+    if len(accounts) > 1:
+        batch(
+            [
+                (_set_balance_method, [account, hex(int(amount))])
+                for account in accounts[1:]
+            ]
+        )
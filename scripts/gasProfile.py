@@ -0,0 +1,175 @@
+import json
+import os
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+from brownie import accounts, chain, network
+
+sys.path.append(os.path.dirname(__file__))
+
+import funding
+from bakeState import setup
+
+# Attributes the gas of a transaction to the internal functions and external contracts
+# it went through, from the debug_traceTransaction steps brownie exposes in `tx.trace`.
+#   brownie run gasProfile main <tx hash>
+#   brownie run gasProfile main harvest_rewards [fork|mock]
+PROFILE_DIR = Path(__file__).resolve().parent.parent / "build" / "gas_profiles"
+
+
+def _step_costs(trace):
+    # Gas spent by each step itself. A CALL's gasCost includes the gas forwarded to the
+    # callee, so call steps are charged the gas consumed across the call minus what the
+    # callee's own steps used.
+    costs = [0] * len(trace)
+    open_calls = []  # indexes of the call steps we are inside of
+    for i, step in enumerate(trace):
+        following = trace[i + 1] if i + 1 < len(trace) else None
+        if following is None:
+            costs[i] = step["gasCost"]
+        elif following["depth"] > step["depth"]:
+            open_calls.append(i)
+        elif following["depth"] == step["depth"]:
+            costs[i] = step["gas"] - following["gas"]
+        else:
+            costs[i] = step["gasCost"]
+        if following is not None and following["depth"] < step["depth"]:
+            call_index = open_calls.pop()
+            callee = sum(costs[call_index + 1 : i + 1])
+            costs[call_index] = trace[call_index]["gas"] - following["gas"] - callee
+    return costs
+
+
+def _label(step):
+    fn = step.get("fn") or "?"
+    name = step.get("contractName") or step["address"]
+    return fn if fn.startswith(f"{name}.") else f"{name}.{fn}"
+
+
+def profile(tx):
+    trace = tx.trace
+    costs = _step_costs(trace)
+
+    stacks = defaultdict(int)  # "a;b;c" -> self gas, folded flame graph format
+    functions = defaultdict(lambda: {"self": 0, "inclusive": 0})
+    targets = defaultdict(lambda: {"name": None, "gas": 0})
+    frames = []  # [(depth, jumpDepth, label)]
+    for step, cost in zip(trace, costs):
+        key = (step["depth"], step.get("jumpDepth", 0))
+        label = _label(step)
+        while frames and frames[-1][:2] > key:
+            frames.pop()
+        if frames and frames[-1][:2] == key:
+            frames[-1] = (*key, label)
+        else:
+            frames.append((*key, label))
+
+        path = [frame[2] for frame in frames]
+        stacks[";".join(path)] += cost
+        functions[label]["self"] += cost
+        for fn in set(path):
+            functions[fn]["inclusive"] += cost
+        targets[step["address"]]["name"] = step.get("contractName")
+        targets[step["address"]]["gas"] += cost
+
+    return {
+        "tx": tx.txid,
+        "gas_used": tx.gas_used,
+        "intrinsic": tx.gas_used - sum(costs),
+        "functions": dict(functions),
+        "targets": dict(targets),
+        "stacks": dict(stacks),
+    }
+
+
+def report(result, width=40):
+    total = result["gas_used"]
+    print(
+        f"\nTransaction {result['tx']}: {total} gas ({result['intrinsic']} intrinsic and refunds)"
+    )
+    print("\nFunctions (inclusive / self)")
+    ranked = sorted(result["functions"].items(), key=lambda item: -item[1]["inclusive"])
+    for fn, gas in ranked:
+        bar = "#" * max(1, round(width * gas["inclusive"] / total))
+        print(f"{fn:<50} {gas['inclusive']:>9} {gas['self']:>9}  {bar}")
+    print("\nExternal targets")
+    for address, target in sorted(
+        result["targets"].items(), key=lambda item: -item[1]["gas"]
+    ):
+        print(f"{target['name'] or '?':<30} {address}  {target['gas']:>9}")
+
+
+def export(result, path=None):
+    path = Path(path) if path else PROFILE_DIR / f"{result['tx']}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(result, indent=2))
+    # Folded stacks, for flamegraph.pl or speedscope
+    path.with_suffix(".folded").write_text(
+        "\n".join(
+            f"{stack} {gas}" for stack, gas in result["stacks"].items() if gas > 0
+        )
+        + "\n"
+    )
+    return path
+
+
+def _invest(deployment, user):
+    amount = deployment.amounts["user"]
+    deployment.token.approve(deployment.vault, amount, {"from": user})
+    deployment.vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    return deployment.strategy.harvest({"from": user})
+
+
+def _harvest_rewards(deployment, user):
+    _invest(deployment, user)
+    funding.add_balances(
+        deployment.reward,
+        {deployment.strategy: 1000 * 10 ** 18},
+        whale=deployment.reward_whale,
+    )
+    chain.mine(1)
+    return deployment.strategy.harvest({"from": user})
+
+
+def _collect_fees(deployment, user):
+    _invest(deployment, user)
+    deployment.strategy.setCollectFeesEnabled(True, {"from": user})
+    chain.sleep(3600)
+    chain.mine(1)
+    return deployment.strategy.harvest({"from": user})
+
+
+def _withdraw(deployment, user):
+    _invest(deployment, user)
+    return deployment.vault.withdraw(
+        deployment.vault.balanceOf(user) // 2, user, 20, {"from": user}
+    )
+
+
+def _withdraw_all(deployment, user):
+    _invest(deployment, user)
+    return deployment.vault.withdraw(
+        deployment.vault.balanceOf(user), user, 20, {"from": user}
+    )
+
+
+SCENARIOS = {
+    "harvest": _invest,
+    "harvest_rewards": _harvest_rewards,
+    "collect_fees": _collect_fees,
+    "withdraw": _withdraw,
+    "withdraw_all": _withdraw_all,
+}
+
+
+def main(target="harvest_rewards", backend="fork"):
+    print(f"You are using the '{network.show_active()}' network")
+    if target in SCENARIOS:
+        tx = SCENARIOS[target](setup(backend), accounts[0])
+    else:
+        tx = chain.get_transaction(target)
+    result = profile(tx)
+    report(result)
+    print(f"\nExported to {export(result)}")
@@ -0,0 +1,55 @@
+import json
+from pathlib import Path
+
+import pytest
+
+# Committed record of gas used per benchmark scenario, one section per test backend.
+# Regenerate with `brownie test tests/test_gas.py --update-gas-snapshot`.
+SNAPSHOT_FILE = Path(__file__).resolve().parent.parent / "tests" / "gas_snapshot.json"
+
+
+class GasSnapshot:
+    def __init__(self, backend, tolerance, update=False, path=SNAPSHOT_FILE):
+        self.path = Path(path)
+        self.backend = backend
+        self.tolerance = tolerance
+        self.update = update
+        self.snapshot = json.loads(self.path.read_text()) if self.path.exists() else {}
+        self.expected = self.snapshot.get(backend, {})
+        self.results = {}
+
+    def check(self, name, gas_used):
+        # Fails when `gas_used` is more than `tolerance` above the recorded value. A
+        # scenario with nothing recorded for the backend is skipped, naming the command
+        # that records it.
+        self.results[name] = gas_used
+        if self.update:
+            return
+        expected = self.expected.get(name)
+        if expected is None:
+            pytest.skip(
+                f"{name}: no {self.backend} entry in {self.path.name}, record it with "
+                f"`brownie test tests/test_gas.py --backend {self.backend} "
+                "--update-gas-snapshot`"
+            )
+        limit = expected * (1 + self.tolerance)
+        assert gas_used <= limit, (
+            f"{name}: {gas_used} gas is {gas_used / expected - 1:.2%} over the snapshot "
+            f"({expected}, tolerance {self.tolerance:.2%})"
+        )
+
+    def report(self):
+        lines = []
+        for name, gas_used in sorted(self.results.items()):
+            expected = self.expected.get(name)
+            change = (
+                f"{gas_used - expected:+d} ({gas_used / expected - 1:+.2%})"
+                if expected
+                else "new"
+            )
+            lines.append(f"{name:<28} {gas_used:>10}  {change}")
+        return "\n".join(lines)
+
+    def save(self):
+        self.snapshot[self.backend] = {**self.expected, **self.results}
+        self.path.write_text(json.dumps(self.snapshot, indent=2, sort_keys=True) + "\n")
@@ -0,0 +1,177 @@
+import json
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+from brownie import Strategy, interface, network, web3
+
+sys.path.append(os.path.dirname(__file__))
+
+from gasSnapshot import SNAPSHOT_FILE
+from mockProtocol import LP_TOKEN
+from strategyState import aggregate, masterChefPoolId
+from vaultProject import vaultContainer
+
+# Compounding-optimal harvest interval and the matching keeper settings, over a grid of
+# TVLs. Harvesting every T hours compounds the rewards earned in T (profit P = R(V) * T,
+# sold for want) at a gas cost G, so a year grows the position by (1 + (P - G) / V) **
+# (8760 / T). The interval maximising that growth gives minProfit = P, the profit
+# harvestTrigger waits for. maxAcceptableBaseFee is the base fee at which a harvest
+# costs the gain of compounding P one interval earlier, V * (r * T) ** 2; it only gates
+# forced harvests.
+#   brownie run harvestInterval main <strategy> [STG price in want]
+BLOCKS_PER_HOUR = 300
+HOURS_PER_YEAR = 24 * 365
+# used when tests/gas_snapshot.json has no harvest_sell_rewards entry
+HARVEST_GAS = 700_000
+INTERVALS = np.geomspace(1, 24 * 60, 400)  # hours
+
+
+@dataclass(frozen=True)
+class Emissions:
+    block: int
+    rewardsPerHour: float  # STG emitted to the MasterChef pool
+    poolTvl: float  # want staked in the pool besides the strategy
+    strategyTvl: float
+    decimals: int
+
+    @classmethod
+    def read(cls, strategy, vault, poolId=None, block=None):
+        poolId = masterChefPoolId(strategy, block) if poolId is None else poolId
+        masterChef = interface.IMasterChef(strategy.masterChef())
+        lpToken = interface.ILpPool(LP_TOKEN)
+        block, values = aggregate(
+            [
+                (masterChef.stargatePerBlock, ()),
+                (masterChef.totalAllocPoint, ()),
+                (masterChef.poolInfo, (poolId,)),
+                (lpToken.balanceOf, (masterChef,)),
+                (lpToken.totalLiquidity, ()),
+                (lpToken.totalSupply, ()),
+                (lpToken.convertRate, ()),
+                (strategy.balanceOfLPInMasterChef, ()),
+                (strategy.estimatedTotalAssets, ()),
+                (vault.decimals, ()),
+            ],
+            block,
+        )
+        (
+            perBlock,
+            totalAlloc,
+            poolInfo,
+            staked,
+            liquidity,
+            supply,
+            convertRate,
+            strategyLp,
+            eta,
+            decimals,
+        ) = values
+        unit = 10 ** decimals
+        lpToWant = liquidity * convertRate / supply / unit
+        return cls(
+            block=block,
+            rewardsPerHour=perBlock * poolInfo[1] / totalAlloc * BLOCKS_PER_HOUR / 1e18,
+            poolTvl=(staked - strategyLp) * lpToWant,
+            strategyTvl=eta / unit,
+            decimals=decimals,
+        )
+
+
+def baseFeeSamples(blocks=1024):
+    # Base fees (wei) of the last `blocks` blocks from eth_feeHistory
+    response = web3.provider.make_request("eth_feeHistory", [hex(blocks), "latest", []])
+    if "error" in response:
+        raise ValueError(f"eth_feeHistory failed: {response['error']}")
+    return np.array(
+        [int(fee, 16) for fee in response["result"]["baseFeePerGas"]], dtype=float
+    )
+
+
+def harvestGas(backend="fork", scenario="harvest_sell_rewards", default=HARVEST_GAS):
+    # Gas of `scenario` in tests/gas_snapshot.json, or `default` with a warning
+    snapshot = json.loads(SNAPSHOT_FILE.read_text()) if SNAPSHOT_FILE.exists() else {}
+    gas = snapshot.get(backend, {}).get(scenario)
+    if gas is None:
+        print(
+            f"WARNING: no {backend} {scenario} entry in {SNAPSHOT_FILE.name}, assuming "
+            f"{default:,} gas. Record it with `brownie test tests/test_gas.py "
+            f"--backend {backend} --update-gas-snapshot`"
+        )
+        return default
+    return gas
+
+
+def optimise(tvls, emissions, rewardPrice, gas, baseFees, ethPrice, priorityFee=1e9):
+    # Per TVL: best interval (hours), net APY, minProfit and maxAcceptableBaseFee (want
+    # and wei)
+    tvls = np.asarray(tvls, dtype=float)[:, None]
+    hours = INTERVALS[None, :]
+    # The strategy's share of the pool emissions, sold for want
+    rewardsPerHour = (
+        emissions.rewardsPerHour * tvls / (emissions.poolTvl + tvls) * rewardPrice
+    )
+    gasCost = gas * (np.mean(baseFees) + priorityFee) / 1e18 * ethPrice
+    growth = 1 + (rewardsPerHour * hours - gasCost) / tvls
+    logGrowth = np.where(
+        growth > 0, np.log(np.maximum(growth, 1e-300)) * HOURS_PER_YEAR / hours, -np.inf
+    )
+
+    best = np.argmax(logGrowth, axis=1)
+    rows = np.arange(len(best))
+    interval = INTERVALS[best]
+    minProfit = rewardsPerHour[rows, 0] * interval
+    maxFee = minProfit ** 2 / tvls[:, 0] / gas / ethPrice * 1e18 - priorityFee
+    return {
+        "tvl": tvls[:, 0],
+        "interval": interval,
+        "apy": np.expm1(logGrowth[rows, best]),
+        "minProfit": minProfit,
+        "maxAcceptableBaseFee": np.maximum(maxFee, 0),
+    }
+
+
+def main(strategy, rewardPrice=None, ethPrice=1_500, backend="fork"):
+    print(f"You are using the '{network.show_active()}' network")
+    strategy = Strategy.at(strategy)
+    vault = vaultContainer().at(strategy.vault())
+    emissions = Emissions.read(strategy, vault)
+    if rewardPrice is None:
+        from balancerQuoter import ONE, RouteSnapshot
+
+        rewardPrice = RouteSnapshot.read().quote([ONE])[0] / 10 ** emissions.decimals
+    rewardPrice, ethPrice = float(rewardPrice), float(ethPrice)
+    baseFees = baseFeeSamples()
+    gas = harvestGas(backend)
+    print(
+        f"\nblock {emissions.block}: {emissions.rewardsPerHour:,.2f} STG/h to the pool, "
+        f"{emissions.poolTvl:,.0f} staked, STG at {rewardPrice:.4f}"
+    )
+    print(
+        f"harvest gas {gas}, base fee mean {np.mean(baseFees) / 1e9:.1f} gwei over {len(baseFees)} blocks"
+    )
+
+    tvls = np.unique(
+        np.concatenate(
+            [np.geomspace(10_000, 100_000_000, 13), [max(emissions.strategyTvl, 1)]]
+        )
+    )
+    result = optimise(tvls, emissions, rewardPrice, gas, baseFees, ethPrice)
+    print(
+        f"\n{'TVL':>16} {'interval h':>10} {'APY':>8} {'minProfit':>12} {'max base fee':>13}"
+    )
+    for tvl, interval, apy, minProfit, maxFee in zip(*result.values()):
+        print(
+            f"{tvl:>16,.0f} {interval:>10.1f} {apy:>8.2%} {minProfit:>12,.2f} {maxFee / 1e9:>9.1f} gwei"
+        )
+
+    current = int(np.searchsorted(tvls, max(emissions.strategyTvl, 1)))
+    unit = 10 ** emissions.decimals
+    print(f"\nFor the current TVL of {emissions.strategyTvl:,.0f}:")
+    print(
+        f"strategy.setMinProfit({int(result['minProfit'][current] * unit)}, {{'from': keeper}})"
+    )
+    print(
+        f"strategy.setMaxAcceptableBaseFee({int(result['maxAcceptableBaseFee'][current])}, {{'from': keeper}})"
+    )
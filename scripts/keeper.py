@@ -0,0 +1,162 @@
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+from brownie import Strategy, accounts, chain, network
+from brownie.network.contract import ContractCall
+
+sys.path.append(os.path.dirname(__file__))
+
+from strategyState import multicall
+
+# Keeper for many strategies at once. harvestTrigger / tendTrigger are read for every
+# strategy through Multicall3 tryAggregate calls pinned to one block, then the harvests
+# are sent with locally assigned nonces and a bound on unconfirmed transactions.
+#   brownie run keeper main strategies.txt --network mainnet
+#   brownie run keeper main 0xabc...,0xdef... 600 --network mainnet  # every 10 minutes
+# On live networks KEEPER_ACCOUNT and KEEPER_PASSWORD select the brownie account.
+BATCH_SIZE = 100  # strategies per tryAggregate call
+MAX_PENDING = 8  # unconfirmed keeper transactions at any time
+
+
+def _view(name):
+    abi = next(
+        item
+        for item in Strategy.abi
+        if item.get("name") == name and item["type"] == "function"
+    )
+    return ContractCall(None, abi, name, None)
+
+
+async def _run(fn, *args):
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+class Keeper:
+    def __init__(
+        self,
+        account,
+        strategies,
+        callCost=0,
+        tend=False,
+        batchSize=BATCH_SIZE,
+        maxPending=MAX_PENDING,
+        confirmations=1,
+    ):
+        self.account = account
+        self.strategies = [str(strategy) for strategy in strategies]
+        self.callCost = callCost
+        self.tend = tend
+        self.batchSize = batchSize
+        self.maxPending = maxPending
+        self.confirmations = confirmations
+        self._harvestTrigger = _view("harvestTrigger")
+        self._tendTrigger = _view("tendTrigger")
+        self._nonce = None
+
+    def _read(self, strategies, block):
+        harvest = self._harvestTrigger.encode_input(self.callCost)
+        tend = self._tendTrigger.encode_input(self.callCost)
+        payload = [
+            (strategy, data) for strategy in strategies for data in (harvest, tend)
+        ]
+        results = multicall().tryAggregate.call(False, payload, block_identifier=block)
+        decoders = (self._harvestTrigger, self._tendTrigger) * len(strategies)
+        decoded = [
+            decoder.decode_output(data) if success and data else None
+            for decoder, (success, data) in zip(decoders, results)
+        ]
+        return list(zip(decoded[::2], decoded[1::2]))
+
+    async def triggers(self, block):
+        # {strategy: (harvestTrigger, tendTrigger)}, None where the call reverted
+        batches = [
+            self.strategies[i : i + self.batchSize]
+            for i in range(0, len(self.strategies), self.batchSize)
+        ]
+        results = await asyncio.gather(
+            *(_run(self._read, batch, block) for batch in batches)
+        )
+        return dict(
+            zip(self.strategies, (result for batch in results for result in batch))
+        )
+
+    def _send(self, strategy, method, nonce):
+        return getattr(Strategy.at(strategy), method)(
+            {"from": self.account, "nonce": nonce, "required_confs": 0}
+        )
+
+    async def _dispatch(self, strategy, method, pending, lock):
+        async with pending:
+            # Nonces are handed out one send at a time so a failed send leaves no gap
+            async with lock:
+                tx = await _run(self._send, strategy, method, self._nonce)
+                self._nonce += 1
+            await _run(tx.wait, self.confirmations)
+            return tx
+
+    async def run_once(self, block=None):
+        # Returns [(strategy, method, tx or exception)] for every strategy that
+        # triggered
+        block = chain.height if block is None else block
+        triggers = await self.triggers(block)
+        actions = []
+        for strategy, (harvest, tend) in triggers.items():
+            if harvest is None or tend is None:
+                print(f"{strategy}: trigger reverted at block {block}")
+            elif harvest:
+                actions.append((strategy, "harvest"))
+            elif self.tend and tend:
+                actions.append((strategy, "tend"))
+
+        self._nonce = self.account.nonce
+        pending = asyncio.Semaphore(self.maxPending)
+        lock = asyncio.Lock()
+        results = await asyncio.gather(
+            *(
+                self._dispatch(strategy, method, pending, lock)
+                for strategy, method in actions
+            ),
+            return_exceptions=True,
+        )
+        return [
+            (strategy, method, result)
+            for (strategy, method), result in zip(actions, results)
+        ]
+
+
+def loadStrategies(strategies):
+    # A file with one address per line, or a comma separated list of addresses
+    path = Path(strategies)
+    if path.exists():
+        return [
+            line.strip()
+            for line in path.read_text().splitlines()
+            if line.strip() and not line.startswith("#")
+        ]
+    return [address.strip() for address in strategies.split(",")]
+
+
+def main(strategies, interval=0, tend="false"):
+    print(f"You are using the '{network.show_active()}' network")
+    if network.show_active() == "development" or "fork" in network.show_active():
+        keeper = accounts[0]
+    else:
+        keeper = accounts.load(
+            os.environ["KEEPER_ACCOUNT"], password=os.getenv("KEEPER_PASSWORD")
+        )
+    print(f"You are using: 'keeper' [{keeper.address}]")
+
+    bot = Keeper(keeper, loadStrategies(strategies), tend=str(tend).lower() == "true")
+    while True:
+        started = time.time()
+        for strategy, method, result in asyncio.run(bot.run_once()):
+            if isinstance(result, Exception):
+                print(f"{strategy}: {method} failed: {result}")
+            else:
+                print(f"{strategy}: {method} {result.txid} status {result.status}")
+        if not int(interval):
+            break
+        time.sleep(max(0, int(interval) - (time.time() - started)))
@@ -0,0 +1,186 @@
+from collections import namedtuple
+
+from brownie import (
+    MockBalancerVault,
+    MockBaseFee,
+    MockERC20,
+    MockLpPool,
+    MockMasterChef,
+    MockMulticall,
+    MockStargateRouter,
+    MockUniRouter,
+    accounts,
+    network,
+    web3,
+)
+
+# Addresses hardcoded as constants in Strategy.sol. The mocks are etched at these
+# addresses so the strategy can be deployed unchanged on a plain development chain.
+STG = "0xAf5191B0De278C7286d6C7CC6ab6BB8A73bA2Cd6"
+LP_TOKEN = "0x38EA452219524Bb87e18dE1C24D3bB59510BD783"
+WETH = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
+BALANCER_VAULT = "0xBA12222222228d8Ba445958a75a0704d566BF2C8"
+SUSHI_ROUTER = "0xd9e1cE17f2641f24aE83637ab66a2cca9C378B9F"
+BASE_FEE_PROVIDER = "0xf8d0Ec04e94296773cE20eFbeeA82e76220cD549"
+# used by scripts/strategyState.py
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+LIQUIDITY_POOL_ID = 2  # USDT
+MASTERCHEF_POOL_ID = 0
+
+# Fixed prices, expressed as amount out for 1e18 units in
+STG_PRICE_IN_WANT = 5 * 10 ** 5  # 0.5 USDT per STG
+STG_PRICE_IN_WETH = 4 * 10 ** 14  # 0.0004 wETH per STG
+WETH_PRICE_IN_WANT = 1250 * 10 ** 6  # 1250 USDT per wETH
+
+STG_PER_BLOCK = 10 ** 18
+SEED_LIQUIDITY = 10_000_000 * 10 ** 6
+WHALE_BALANCE = 100_000_000
+
+MockProtocol = namedtuple(
+    "MockProtocol",
+    [
+        "want",
+        "reward",
+        "dai",
+        "weth",
+        "lpToken",
+        "stargateRouter",
+        "masterChef",
+        "balancerVault",
+        "router",
+        "baseFee",
+        "multicall",
+        "whale",
+    ],
+)
+
+
+def set_code(address, code):
+    # Each dev node exposes its own method to replace the code at an address
+    for method in ("hardhat_setCode", "anvil_setCode", "evm_setAccountCode"):
+        response = web3.provider.make_request(method, [address, code])
+        if "error" not in response:
+            return
+    raise ValueError(f"Could not set code at {address}: {response['error']}")
+
+
+def etch(Container, address, deployer):
+    # Deploys a template and copies its runtime code to `address`. Storage is not
+    # copied, that is why none of the mocks have a constructor.
+    template = Container.deploy({"from": deployer})
+    set_code(address, "0x" + bytes(web3.eth.get_code(template.address)).hex())
+    return Container.at(address)
+
+
+def deploy_token(name, symbol, decimals, deployer, address=None):
+    token = (
+        etch(MockERC20, address, deployer)
+        if address
+        else MockERC20.deploy({"from": deployer})
+    )
+    token.initialize(name, symbol, decimals, {"from": deployer})
+    return token
+
+
+def deploy_mock_protocol(deployer, whale):
+    want = deploy_token("Tether USD", "USDT", 6, deployer)
+    dai = deploy_token("Dai Stablecoin", "DAI", 18, deployer)
+    weth = deploy_token("Wrapped Ether", "WETH", 18, deployer, WETH)
+    reward = deploy_token("StargateToken", "STG", 18, deployer, STG)
+
+    stargateRouter = MockStargateRouter.deploy({"from": deployer})
+    lpToken = etch(MockLpPool, LP_TOKEN, deployer)
+    lpToken.initialize("USDT-LP", "S*USDT", 6, {"from": deployer})
+    lpToken.initializePool(LIQUIDITY_POOL_ID, stargateRouter, want, {"from": deployer})
+    stargateRouter.setPool(LIQUIDITY_POOL_ID, lpToken, {"from": deployer})
+
+    masterChef = MockMasterChef.deploy({"from": deployer})
+    masterChef.initialize(reward, STG_PER_BLOCK, {"from": deployer})
+    masterChef.add(1, lpToken, {"from": deployer})
+
+    balancerVault = etch(MockBalancerVault, BALANCER_VAULT, deployer)
+    balancerVault.setRate(reward, want, STG_PRICE_IN_WANT, {"from": deployer})
+
+    router = etch(MockUniRouter, SUSHI_ROUTER, deployer)
+    router.setRate(reward, weth, STG_PRICE_IN_WETH, {"from": deployer})
+    router.setRate(weth, want, WETH_PRICE_IN_WANT, {"from": deployer})
+
+    baseFee = etch(MockBaseFee, BASE_FEE_PROVIDER, deployer)
+    multicall = etch(MockMulticall, MULTICALL3, deployer)
+
+    # Reserves: rewards to emit, want to pay out swaps and balances for the whale
+    reward.mint(masterChef, WHALE_BALANCE * 10 ** 18, {"from": deployer})
+    want.mint(balancerVault, WHALE_BALANCE * 10 ** 6, {"from": deployer})
+    want.mint(whale, WHALE_BALANCE * 10 ** 6, {"from": deployer})
+    reward.mint(whale, WHALE_BALANCE * 10 ** 18, {"from": deployer})
+    dai.mint(whale, WHALE_BALANCE * 10 ** 18, {"from": deployer})
+
+    # Seed the pool so the LP price is not trivially set by the strategy deposit
+    want.mint(deployer, SEED_LIQUIDITY, {"from": deployer})
+    want.approve(stargateRouter, SEED_LIQUIDITY, {"from": deployer})
+    stargateRouter.addLiquidity(
+        LIQUIDITY_POOL_ID, SEED_LIQUIDITY, deployer, {"from": deployer}
+    )
+
+    return MockProtocol(
+        want,
+        reward,
+        dai,
+        weth,
+        lpToken,
+        stargateRouter,
+        masterChef,
+        balancerVault,
+        router,
+        baseFee,
+        multicall,
+        whale,
+    )
+
+
+def strategy_args(protocol):
+    # Keyword arguments for deployStrategy.deploy
+    return {
+        "masterChef": protocol.masterChef,
+        "masterChefPoolId": MASTERCHEF_POOL_ID,
+        "stargateRouter": protocol.stargateRouter,
+        "liquidityPoolId": LIQUIDITY_POOL_ID,
+    }
+
+
+def load_mock_protocol(addresses, whale):
+    # Rebuilds the MockProtocol from the addresses recorded by deployments(), e.g. from
+    # a baked state
+    containers = {
+        "want": MockERC20,
+        "reward": MockERC20,
+        "dai": MockERC20,
+        "weth": MockERC20,
+        "lpToken": MockLpPool,
+        "stargateRouter": MockStargateRouter,
+        "masterChef": MockMasterChef,
+        "balancerVault": MockBalancerVault,
+        "router": MockUniRouter,
+        "baseFee": MockBaseFee,
+        "multicall": MockMulticall,
+    }
+    contracts = {
+        name: Container.at(addresses[name]) for name, Container in containers.items()
+    }
+    return MockProtocol(whale=whale, **contracts)
+
+
+def deployments(protocol):
+    return {
+        name: contract.address
+        for name, contract in protocol._asdict().items()
+        if name != "whale"
+    }
+
+
+def main():
+    print(f"You are using the '{network.show_active()}' network")
+    protocol = deploy_mock_protocol(accounts[0], accounts[8])
+    for name, contract in protocol._asdict().items():
+        print(f"{name}: {contract}")
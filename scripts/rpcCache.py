@@ -0,0 +1,280 @@
+import argparse
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import requests
+
+# JSON-RPC caching proxy between the local fork node and its upstream archive node.
+# Requests whose result is fixed by a block number or hash (the fork node asks for
+# storage, code, balances and nonces at the fork block) are answered from an SQLite file
+# and only misses go upstream. The file is shared by every proxy and xdist worker using
+# it: SQLite serialises the writers, and the least recently used entries are evicted
+# above `maxBytes`. It runs before the fork node, so it is started with python rather
+# than `brownie run`:
+#   python scripts/rpcCache.py $UPSTREAM_RPC --port 8549
+#   brownie networks modify mainnet-fork fork=http://127.0.0.1:8549
+CACHE_FILE = Path(__file__).resolve().parent.parent / "build" / "rpc_cache.sqlite"
+MAX_BYTES = 2 * 1024 ** 3
+EVICT_EVERY = 1_000  # writes between size checks
+# An entry's last use is only rewritten once it is this old, so warm reads stay reads
+TOUCH_AFTER = 60
+
+# Position of the block parameter of the methods that read state at a block
+BLOCK_PARAM = {
+    "eth_getStorageAt": 2,
+    "eth_getCode": 1,
+    "eth_getBalance": 1,
+    "eth_getTransactionCount": 1,
+    "eth_call": 1,
+    "eth_getProof": 2,
+    "eth_getBlockByNumber": 0,
+    "eth_getBlockTransactionCountByNumber": 0,
+}
+# Results that never change once they exist
+IMMUTABLE = {
+    "eth_chainId",
+    "net_version",
+    "eth_getBlockByHash",
+    "eth_getTransactionByHash",
+    "eth_getTransactionReceipt",
+}
+
+
+def _pinned(block):
+    # A block number or hash, not a tag like "latest"
+    if isinstance(block, dict):  # EIP-1898
+        return "blockHash" in block or _pinned(block.get("blockNumber"))
+    return isinstance(block, str) and block.startswith("0x")
+
+
+def cacheKey(namespace, method, params):
+    # None for requests whose result can change
+    params = params or []
+    if method in BLOCK_PARAM:
+        index = BLOCK_PARAM[method]
+        if len(params) <= index or not _pinned(params[index]):
+            return None
+    elif method not in IMMUTABLE:
+        return None
+    payload = json.dumps(
+        [namespace, method, params], sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class RpcCache:
+    def __init__(self, path=CACHE_FILE, maxBytes=MAX_BYTES):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.maxBytes = maxBytes
+        self.local = threading.local()
+        self.writes = 0
+        with self._db() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, result TEXT, size INTEGER, used REAL)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_by_use ON entries (used)")
+
+    def _db(self):
+        # One connection per thread, sqlite3 connections cannot be shared
+        if getattr(self.local, "db", None) is None:
+            self.local.db = sqlite3.connect(self.path, timeout=30)
+        return self.local.db
+
+    def get(self, key):
+        db = self._db()
+        row = db.execute(
+            "SELECT result, used FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        now = time.time()
+        if now - row[1] > TOUCH_AFTER:
+            with db:
+                db.execute("UPDATE entries SET used = ? WHERE key = ?", (now, key))
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        data = json.dumps(result, separators=(",", ":"))
+        db = self._db()
+        with db:
+            db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+        self.writes += 1
+        if self.writes % EVICT_EVERY == 0:
+            self.evict()
+
+    def size(self):
+        return (
+            self._db()
+            .execute("SELECT COALESCE(SUM(size), 0) FROM entries")
+            .fetchone()[0]
+        )
+
+    def evict(self):
+        # Drops the least recently used entries until the file holds at most maxBytes of
+        # results
+        db = self._db()
+        excess = self.size() - self.maxBytes
+        if excess <= 0:
+            return 0
+        rows = db.execute("SELECT key, size FROM entries ORDER BY used").fetchall()
+        victims = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            victims.append((key,))
+            excess -= size
+        with db:
+            db.executemany("DELETE FROM entries WHERE key = ?", victims)
+        return len(victims)
+
+
+class CachingProxy:
+    def __init__(self, upstream, cache, timeout=60):
+        self.upstream = upstream
+        self.cache = cache
+        self.timeout = timeout
+        self.local = threading.local()
+        self.hits = self.misses = self.passed = 0
+        self.lock = threading.Lock()
+        # Entries are keyed on the upstream chain, so one file can serve several
+        # networks
+        self.namespace = self._forward(
+            [{"jsonrpc": "2.0", "id": 0, "method": "eth_chainId", "params": []}]
+        )[0]["result"]
+
+    def _forward(self, batch):
+        # One session per handler thread, requests.Session is not thread safe
+        if getattr(self.local, "session", None) is None:
+            self.local.session = requests.Session()
+        response = self.local.session.post(
+            self.upstream, json=batch, timeout=self.timeout
+        )
+        response.raise_for_status()
+        results = response.json()
+        return results if isinstance(results, list) else [results]
+
+    def handle(self, body):
+        # Answers a JSON-RPC request or batch, sending only the cache misses upstream in
+        # one batch
+        batch = body if isinstance(body, list) else [body]
+        responses = [None] * len(batch)
+        keys = [
+            cacheKey(self.namespace, request.get("method"), request.get("params"))
+            for request in batch
+        ]
+        for i, (request, key) in enumerate(zip(batch, keys)):
+            result = None if key is None else self.cache.get(key)
+            if result is not None:
+                responses[i] = {
+                    "jsonrpc": "2.0",
+                    "id": request.get("id"),
+                    "result": result,
+                }
+
+        missing = [i for i, response in enumerate(responses) if response is None]
+        if missing:
+            forwarded = self._forward([batch[i] for i in missing])
+            byId = {response.get("id"): response for response in forwarded}
+            for i in missing:
+                response = byId.get(batch[i].get("id"))
+                if response is None:
+                    message = "No response from the upstream node"
+                    response = {
+                        "jsonrpc": "2.0",
+                        "id": batch[i].get("id"),
+                        "error": {"code": -32603, "message": message},
+                    }
+                responses[i] = response
+                # Errors and nulls (unknown tx, block not mined yet) are not cached
+                if keys[i] is not None and response.get("result") is not None:
+                    self.cache.put(keys[i], response["result"])
+
+        with self.lock:
+            self.hits += len(batch) - len(missing)
+            self.misses += sum(keys[i] is not None for i in missing)
+            self.passed += sum(keys[i] is None for i in missing)
+        return responses if isinstance(body, list) else responses[0]
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "passed": self.passed,
+            "bytes": self.cache.size(),
+        }
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+
+def serve(proxy, port=8549, host="127.0.0.1"):
+    # Returns the HTTP server, call serve_forever() on it (or run it in a thread)
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            try:
+                self._reply(200, proxy.handle(body))
+            except requests.RequestException as exc:
+                self._reply(
+                    502,
+                    {
+                        "jsonrpc": "2.0",
+                        "id": None,
+                        "error": {"code": -32603, "message": str(exc)},
+                    },
+                )
+
+        def do_GET(self):
+            self._reply(200, proxy.stats())
+
+        def log_message(self, format, *args):
+            pass
+
+    return _Server((host, port), Handler)
+
+
+def cli():
+    parser = argparse.ArgumentParser(
+        description="Caching JSON-RPC proxy for fork nodes"
+    )
+    parser.add_argument("upstream", help="upstream archive node URL")
+    parser.add_argument("--port", type=int, default=8549)
+    parser.add_argument(
+        "--cache", default=CACHE_FILE, help=f"SQLite file (default {CACHE_FILE})"
+    )
+    parser.add_argument("--max-bytes", type=int, default=MAX_BYTES)
+    args = parser.parse_args()
+
+    proxy = CachingProxy(args.upstream, RpcCache(args.cache, args.max_bytes))
+    server = serve(proxy, args.port)
+    print(
+        f"Caching {args.upstream} on http://127.0.0.1:{args.port} into {args.cache}, GET for stats"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(proxy.stats()))
+
+
+if __name__ == "__main__":
+    cli()
@@ -0,0 +1,207 @@
+import importlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from functools import partial
+from pathlib import Path
+
+import pytest
+from brownie import network, web3
+
+sys.path.append(os.path.dirname(__file__))
+
+import funding
+
+# Counts the JSON-RPC requests sent to the node and their latency, attributed to a
+# (scope, phase) pair: the test and the fixture, call or teardown under pytest, the
+# script and the calling function under `brownie run`. The provider's make_request is
+# wrapped, which sees the requests web3 sends as well as the ones brownie and our
+# scripts send directly (evm_snapshot, evm_revert, anvil_*, hardhat_*). Batches sent
+# through funding.batch go through a make_batch_request wrapped the same way, each
+# request of a batch counting a share of its latency.
+#   brownie test --rpc-profile                         # build/rpc_profiles/tests.json
+#   brownie run rpcProfile main <script> [function] [args...]
+PROFILE_DIR = Path(__file__).resolve().parent.parent / "build" / "rpc_profiles"
+SCRIPTS_DIR = Path(__file__).resolve().parent
+
+
+class RpcProfiler:
+    def __init__(self):
+        # (scope, phase, method) -> [requests, seconds]
+        self.stats = defaultdict(lambda: [0, 0.0])
+        self.scope = "-"
+        self.phase = "-"
+        self.resolve = None  # callable giving the phase when no explicit one is set
+        self._provider = None
+
+    def _record(self, method, seconds):
+        phase = (
+            self.phase if self.resolve is None or self.phase != "-" else self.resolve()
+        )
+        entry = self.stats[(self.scope, phase, method)]
+        entry[0] += 1
+        entry[1] += seconds
+
+    def install(self):
+        # Wraps the current provider, again after brownie reconnects with a new one
+        provider = web3.provider
+        if provider is None or provider is self._provider:
+            return
+        make_request = provider.make_request
+        make_batch_request = getattr(provider, "make_batch_request", None)
+        uri = getattr(provider, "endpoint_uri", None)
+        if make_batch_request is None and uri is not None:
+            make_batch_request = partial(funding.post_batch, uri)
+
+        def profiled(method, params):
+            start = time.perf_counter()
+            try:
+                return make_request(method, params)
+            finally:
+                self._record(method, time.perf_counter() - start)
+
+        def profiledBatch(calls):
+            start = time.perf_counter()
+            try:
+                return make_batch_request(calls)
+            finally:
+                share = (time.perf_counter() - start) / max(len(calls), 1)
+                for method, _ in calls:
+                    self._record(method, share)
+
+        provider.make_request = profiled
+        if make_batch_request is not None:
+            provider.make_batch_request = profiledBatch
+        # web3 caches the middleware chain built around the previous make_request
+        provider._request_func_cache = (None, None)
+        self._provider = provider
+
+    def uninstall(self):
+        if self._provider is not None:
+            del self._provider.make_request
+            if "make_batch_request" in vars(self._provider):
+                del self._provider.make_batch_request
+            self._provider._request_func_cache = (None, None)
+            self._provider = None
+
+    @contextmanager
+    def scoped(self, scope=None, phase=None):
+        previous = (self.scope, self.phase)
+        self.install()
+        self.scope = self.scope if scope is None else scope
+        self.phase = self.phase if phase is None else phase
+        try:
+            yield
+        finally:
+            self.scope, self.phase = previous
+
+    def records(self):
+        return [
+            {
+                "scope": scope,
+                "phase": phase,
+                "method": method,
+                "requests": count,
+                "seconds": seconds,
+            }
+            for (scope, phase, method), (count, seconds) in self.stats.items()
+        ]
+
+    def totals(self, *keys):
+        # Requests and seconds summed over every record with the same `keys` values
+        totals = defaultdict(lambda: [0, 0.0])
+        for record in self.records():
+            entry = totals[tuple(record[key] for key in keys)]
+            entry[0] += record["requests"]
+            entry[1] += record["seconds"]
+        return sorted(totals.items(), key=lambda item: -item[1][1])
+
+    def report(self, top=15):
+        requests = sum(count for count, _ in self.stats.values())
+        seconds = sum(elapsed for _, elapsed in self.stats.values())
+        lines = [f"{requests} RPC requests, {seconds:.2f}s"]
+        for title, keys in (
+            ("method", ("method",)),
+            ("phase", ("phase",)),
+            ("scope", ("scope",)),
+        ):
+            lines.append(
+                f"\n{'By ' + title:<60} {'requests':>10} {'seconds':>9} {'ms/req':>7}"
+            )
+            for key, (count, elapsed) in self.totals(*keys)[:top]:
+                lines.append(
+                    f"{' / '.join(key)[:60]:<60} {count:>10} {elapsed:>9.2f} {1e3 * elapsed / count:>7.1f}"
+                )
+        return "\n".join(lines)
+
+    def export(self, name):
+        path = PROFILE_DIR / f"{name}.json"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(
+            json.dumps(
+                sorted(self.records(), key=lambda record: -record["seconds"]), indent=2
+            )
+        )
+        return path
+
+
+class PytestPlugin:
+    # Registered by tests/conftest.py with --rpc-profile. Each xdist worker writes its
+    # own file.
+    def __init__(self, config):
+        self.profiler = RpcProfiler()
+        worker = os.getenv("PYTEST_XDIST_WORKER")
+        self.name = f"tests-{worker}" if worker else "tests"
+        self.config = config
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item):
+        with self.profiler.scoped(item.nodeid, "setup"):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        with self.profiler.scoped(phase=f"fixture:{fixturedef.argname}"):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        with self.profiler.scoped(item.nodeid, "call"):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item):
+        with self.profiler.scoped(item.nodeid, "teardown"):
+            yield
+
+    def pytest_sessionfinish(self, session):
+        path = self.profiler.export(self.name)
+        terminal = self.config.pluginmanager.get_plugin("terminalreporter")
+        if terminal is not None:
+            terminal.write_line(f"\nRPC profile ({path}):\n{self.profiler.report()}")
+
+
+def _caller():
+    # First function up the stack that lives in scripts/, as "module.function"
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = Path(frame.f_code.co_filename)
+        if path.parent == SCRIPTS_DIR and path.stem != "rpcProfile":
+            return f"{path.stem}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "-"
+
+
+def main(script, function="main", *args):
+    print(f"You are using the '{network.show_active()}' network")
+    profiler = RpcProfiler()
+    profiler.resolve = _caller
+    module = importlib.import_module(script)
+    with profiler.scoped(script):
+        getattr(module, function)(*args)
+    profiler.uninstall()
+    print(f"\n{profiler.report()}")
+    print(f"\nExported to {profiler.export(f'{script}.{function}')}")
@@ -0,0 +1,168 @@
+import itertools
+import os
+import sys
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from brownie import accounts, network
+
+sys.path.append(os.path.dirname(__file__))
+
+from balancerQuoter import ONE, RouteSnapshot, queryBatchSwap
+
+# Replays reward sales over a period for a grid of (rewardsDust threshold, harvest
+# interval, tranche) configurations and ranks them by net proceeds. _sellAllRewards
+# sells the whole balance once it is above rewardsDust; a finite tranche is a what-if
+# that sells at most that much per harvest. Each sale is priced on the STG -> USDT route
+# curve, taken from the offline quoter or from queryBatchSwap on a fork, assuming
+# arbitrage restores the pools between harvests.
+#   brownie run sellSimulator main [offline|fork] [STG per day] [days] --network mainnet-fork
+HARVEST_GAS = 450_000  # harvest without a reward sale
+SELL_GAS = 250_000  # extra gas of the batchSwap
+CURVE_POINTS = 256
+
+Result = namedtuple(
+    "Result",
+    [
+        "threshold",
+        "interval",
+        "tranche",
+        "harvests",
+        "sales",
+        "sold",
+        "proceeds",
+        "wantPerReward",
+        "net",
+    ],
+)
+
+
+@dataclass(frozen=True)
+class QuoteCurve:
+    # Want out (in units) for a sale of `amounts` STG (in units), interpolated between
+    # points
+    amounts: np.ndarray
+    outputs: np.ndarray
+
+    @classmethod
+    def build(cls, source, maxAmount, sender=None, points=CURVE_POINTS):
+        amounts = np.geomspace(1, maxAmount, points)
+        raw = [int(amount * ONE) for amount in amounts]
+        if source == "offline":
+            outputs = RouteSnapshot.read().quote(raw)
+        else:
+            outputs = [queryBatchSwap(amount, sender) for amount in raw]
+        return cls(
+            np.concatenate([[0], amounts]),
+            np.concatenate([[0], np.array(outputs, dtype=float) / 1e6]),
+        )
+
+    @property
+    def spot(self):
+        return self.outputs[1] / self.amounts[1]
+
+    def __call__(self, amount):
+        return float(np.interp(amount, self.amounts, self.outputs))
+
+
+def simulate(config, curve, rewardsPerHour, hours, harvestCost, sellCost):
+    threshold, interval, tranche = config
+    harvests = int(hours // interval)
+    accrued = rewardsPerHour * interval
+    balance = sold = proceeds = 0.0
+    sales = 0
+    for _ in range(harvests):
+        balance += accrued
+        if balance > threshold:
+            amount = min(balance, tranche)
+            proceeds += curve(amount)
+            sold += amount
+            balance -= amount
+            sales += 1
+    # Rewards still held at the end are valued as if sold in one go
+    net = proceeds + curve(balance) - harvests * harvestCost - sales * sellCost
+    return Result(
+        threshold,
+        interval,
+        tranche,
+        harvests,
+        sales,
+        sold,
+        proceeds,
+        proceeds / sold if sold else 0.0,
+        net,
+    )
+
+
+def _simulateBatch(args):
+    configs, *rest = args
+    return [simulate(config, *rest) for config in configs]
+
+
+def sweep(
+    curve,
+    thresholds,
+    intervals,
+    tranches,
+    rewardsPerHour,
+    hours,
+    harvestCost,
+    sellCost,
+    workers=None,
+):
+    # Results for every configuration, best net proceeds first
+    configs = list(
+        itertools.product(map(float, thresholds), intervals, map(float, tranches))
+    )
+    workers = workers or os.cpu_count()
+    batches = [configs[i::workers] for i in range(workers)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(
+            _simulateBatch,
+            [
+                (batch, curve, rewardsPerHour, hours, harvestCost, sellCost)
+                for batch in batches
+            ],
+        )
+    return sorted(
+        (result for batch in results for result in batch),
+        key=lambda result: -result.net,
+    )
+
+
+def main(source="offline", rewardsPerDay=1_000, days=90, gasPrice=20, ethPrice=1_500):
+    print(f"You are using the '{network.show_active()}' network")
+    rewardsPerDay, days = float(rewardsPerDay), float(days)
+    gasCost = float(gasPrice) * 1e-9 * float(ethPrice)  # want per unit of gas
+    curve = QuoteCurve.build(
+        source, rewardsPerDay * days, accounts[0] if source == "fork" else None
+    )
+
+    thresholds = np.geomspace(1, rewardsPerDay * 30, 40)
+    intervals = [1, 2, 4, 6, 8, 12, 24, 48, 72, 168, 336, 720]
+    tranches = [float("inf"), *np.geomspace(rewardsPerDay / 4, rewardsPerDay * 30, 8)]
+    results = sweep(
+        curve,
+        thresholds,
+        intervals,
+        tranches,
+        rewardsPerDay / 24,
+        days * 24,
+        HARVEST_GAS * gasCost,
+        SELL_GAS * gasCost,
+    )
+
+    print(f"\n{len(results)} configurations, spot {curve.spot:.4f} want per STG")
+    print(
+        f"{'threshold':>12} {'interval h':>10} {'tranche':>12} {'sales':>6} {'want/STG':>9} {'net':>14}"
+    )
+    for result in results[:15]:
+        print(
+            f"{result.threshold:>12,.0f} {result.interval:>10} {result.tranche:>12,.0f} {result.sales:>6} "
+            f"{result.wantPerReward:>9.4f} {result.net:>14,.2f}"
+        )
+    best = next(result for result in results if result.tranche == float("inf"))
+    print(f"\nBest with the current contract: harvest every {best.interval}h")
+    print(f"strategy.setDust({int(best.threshold * ONE)}, strategy.wantDust())")
@@ -0,0 +1,226 @@
+import math
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from brownie import accounts, chain, network
+
+sys.path.append(os.path.dirname(__file__))
+
+import forkPool
+import funding
+
+# Realized slippage of adjustPosition (addLiquidity) and liquidatePosition
+# (instantRedeemLocal) for deposit and withdraw sizes across orders of magnitude. Every
+# size starts from the same deployment, with maxSlippageIn / maxSlippageOut opened so
+# the slippage is measured even where the configured guards would revert; `guardReverts`
+# says whether they would have. Writes the table (csv) and the curves (png) to
+# build/slippage_curve/, and prints the smallest guards that let every size up to a TVL
+# through, for setParams.
+#   brownie run slippageCurve main [fork|mock] [nodes] [from] [to] [points per decade]
+# With more than one node the sizes are spread over forkPool nodes.
+CURVE_DIR = Path(__file__).resolve().parent.parent / "build" / "slippage_curve"
+BASIS_ONE = 10_000
+
+
+def _open(strategy, gov):
+    # Configured (maxSlippageIn, maxSlippageOut), then lifts both
+    configured = (strategy.maxSlippageIn(), strategy.maxSlippageOut())
+    strategy.setParams(BASIS_ONE, BASIS_ONE, {"from": gov})
+    return configured
+
+
+def _invest(deployment, amount, gov):
+    # Deposits `amount` and harvests it into the pool. Returns the harvest and the want
+    # it invested.
+    token, vault, strategy = deployment.token, deployment.vault, deployment.strategy
+    funding.add_balances(token, {gov: amount})
+    token.approve(vault, amount, {"from": gov})
+    vault.deposit(amount, {"from": gov})
+    chain.sleep(1)
+    wantBefore = strategy.balanceOfWant()
+    debtBefore = vault.strategies(strategy)["totalDebt"]
+    tx = strategy.harvest({"from": gov})
+    credit = vault.strategies(strategy)["totalDebt"] - debtBefore
+    return tx, wantBefore + credit - strategy.balanceOfWant()
+
+
+def deposit(deployment, amount):
+    gov = accounts[0]
+    strategy = deployment.strategy
+    maxSlippageIn, _ = _open(strategy, gov)
+    pooledBefore = strategy.balanceOfPooled()
+    start = time.perf_counter()
+    tx, invested = _invest(deployment, amount, gov)
+    txSeconds = time.perf_counter() - start
+    pooledDelta = strategy.balanceOfPooled() - pooledBefore
+    slipped = invested - pooledDelta  # as _enforceSlippageIn, but signed
+    return {
+        "side": "deposit",
+        "invested": invested,
+        "pooledDelta": pooledDelta,
+        "slippageBps": slipped / invested * BASIS_ONE if invested else np.nan,
+        "guardReverts": max(slipped, 0) > invested * maxSlippageIn // BASIS_ONE,
+        "gas": tx.gas_used,
+        "txSeconds": txSeconds,
+    }
+
+
+def withdraw(deployment, amount, position):
+    # Withdraws `amount` of want from a vault holding `position`, all of it invested
+    gov = accounts[0]
+    token, vault, strategy = deployment.token, deployment.vault, deployment.strategy
+    _, maxSlippageOut = _open(strategy, gov)
+    _invest(deployment, position, gov)
+
+    idle = token.balanceOf(vault)
+    loose = strategy.balanceOfWant()
+    shares = amount * vault.totalSupply() // vault.totalAssets()
+    value = shares * vault.pricePerShare() // 10 ** vault.decimals()
+    toExit = value - idle - loose  # what liquidatePosition redeems from the pool
+    pooledBefore = strategy.balanceOfPooled()
+    before = token.balanceOf(gov)
+    start = time.perf_counter()
+    tx = vault.withdraw(shares, gov, BASIS_ONE, {"from": gov})
+    txSeconds = time.perf_counter() - start
+    redeemed = token.balanceOf(gov) - before - idle - loose
+    slipped = toExit - redeemed  # as _enforceSlippageOut, but signed
+    return {
+        "side": "withdraw",
+        "invested": toExit,
+        "pooledDelta": pooledBefore - strategy.balanceOfPooled(),
+        "slippageBps": slipped / toExit * BASIS_ONE if toExit > 0 else np.nan,
+        "guardReverts": toExit > 0
+        and max(slipped, 0) > toExit * maxSlippageOut // BASIS_ONE,
+        "gas": tx.gas_used,
+        "txSeconds": txSeconds,
+    }
+
+
+def sizes(fromAmount, toAmount, perDecade=3):
+    decades = math.log10(toAmount / fromAmount)
+    return np.unique(
+        np.geomspace(fromAmount, toAmount, int(round(decades * perDecade)) + 1).round(
+            -1
+        )
+    )
+
+
+def scenarios(amounts, unit, position=None):
+    # A deposit of every size, and a withdraw of every size from a position of the
+    # largest one
+    position = int(position or max(amounts)) * unit
+    raw = [int(amount) * unit for amount in amounts]
+    return [(deposit, {"amount": amount}) for amount in raw] + [
+        (withdraw, {"amount": amount, "position": position})
+        for amount in raw
+        if amount < position
+    ]
+
+
+def recommend(table, tvl, margin=1):
+    # Smallest (maxSlippageIn, maxSlippageOut) in bps letting every measured size up to
+    # `tvl` through
+    guards = []
+    for side in ("deposit", "withdraw"):
+        measured = table[(table["side"] == side) & (table["amount"] <= tvl)][
+            "slippageBps"
+        ].dropna()
+        worst = max(measured.max(), 0) if len(measured) else 0
+        guards.append(min(math.ceil(worst) + margin, BASIS_ONE))
+    return tuple(guards)
+
+
+def plot(table, path, configured=None):
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    figure, (slippage, gas) = plt.subplots(2, 1, sharex=True, figsize=(9, 8))
+    for side, rows in table.groupby("side"):
+        line = slippage.plot(
+            rows["amount"], rows["slippageBps"], marker="o", label=side
+        )[0]
+        gas.plot(
+            rows["amount"], rows["gas"], marker="o", label=side, color=line.get_color()
+        )
+        reverts = rows[rows["guardReverts"].astype(bool)]
+        slippage.scatter(
+            reverts["amount"], reverts["slippageBps"], marker="x", s=80, color="red"
+        )
+    if configured is not None:
+        for bps, style in zip(configured, ("--", ":")):
+            slippage.axhline(bps, color="grey", linestyle=style)
+    slippage.set_xscale("log")
+    slippage.set_ylabel("slippage (bps)")
+    slippage.set_title("Realized slippage, x: the configured guard reverts")
+    slippage.legend()
+    gas.set_ylabel("gas")
+    gas.set_xlabel("amount (want)")
+    figure.tight_layout()
+    figure.savefig(path)
+    plt.close(figure)
+    return path
+
+
+def main(
+    backend="fork",
+    nodes=1,
+    fromAmount=100,
+    toAmount=100_000_000,
+    perDecade=3,
+    position=None,
+):
+    name = network.show_active()
+    print(f"You are using the '{name}' network")
+    from bakeState import setup
+
+    deployment = setup(backend)
+    strategy = deployment.strategy
+    configured = (strategy.maxSlippageIn(), strategy.maxSlippageOut())
+    decimals = deployment.token.decimals()
+    unit = 10 ** decimals
+    amounts = sizes(float(fromAmount), float(toAmount), int(perDecade))
+    runs = scenarios(amounts, unit, position)
+
+    start = time.perf_counter()
+    if int(nodes) > 1:
+        table = forkPool.run(runs, int(nodes), name=name, backend=backend)
+    else:
+        table = forkPool.serial(runs, deployment)
+    print(f"{len(runs)} sizes in {time.perf_counter() - start:.1f}s")
+    failed = table[table["error"].notna()]
+    if len(failed):
+        print(f"{len(failed)} failed, first:\n{failed['error'].iloc[0]}")
+    table = table[table["error"].isna()].copy()
+    table["amount"] /= unit
+
+    print(
+        f"\n{'side':<9} {'amount':>16} {'slippage bps':>13} {'gas':>9} {'reverts at':>11}"
+    )
+    for row in table.itertuples():
+        guard = configured[row.side == "withdraw"]
+        flag = f"{guard} bps" if row.guardReverts else ""
+        print(
+            f"{row.side:<9} {row.amount:>16,.0f} {row.slippageBps:>13.3f} {row.gas:>9} {flag:>11}"
+        )
+
+    print(
+        f"\nGuards for every size up to a TVL (configured: in {configured[0]}, out {configured[1]} bps)"
+    )
+    print(f"{'TVL':>16} {'maxSlippageIn':>14} {'maxSlippageOut':>15}")
+    for tvl in 10.0 ** np.arange(
+        math.ceil(math.log10(float(fromAmount))), math.log10(float(toAmount)) + 1
+    ):
+        guardIn, guardOut = recommend(table, tvl)
+        print(f"{tvl:>16,.0f} {guardIn:>14} {guardOut:>15}")
+
+    CURVE_DIR.mkdir(parents=True, exist_ok=True)
+    stem = CURVE_DIR / f"{backend}-{chain.id}-{chain.height}"
+    table.to_csv(stem.with_suffix(".csv"), index=False)
+    print(
+        f"\nSaved {stem.with_suffix('.csv')} and {plot(table, stem.with_suffix('.png'), configured)}"
+    )
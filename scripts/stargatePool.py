@@ -0,0 +1,180 @@
+import os
+import sys
+from dataclasses import dataclass
+
+import numpy as np
+from brownie import Strategy, interface, network
+from brownie.network.contract import ContractCall
+
+sys.path.append(os.path.dirname(__file__))
+
+from mockProtocol import LP_TOKEN
+from strategyState import aggregate
+
+# Model of the Stargate Pool conversions behind wantToLPToken, balanceOfPooled and
+# _removeLiquidity, hydrated with one Multicall3 read of the pool and the strategy
+# position. Queries take scalars or arrays of want amounts; the arrays hold Python ints
+# because amount * totalSupply overflows int64.
+#   brownie run stargatePool main <strategy> [points]  # withdraw sizes up to the whole position
+BP_DENOMINATOR = 10_000
+
+
+def _uint(value):
+    return np.asarray(value, dtype=object)
+
+
+def _view(address, name):
+    abi = next(
+        item
+        for item in interface.ILpPool.abi
+        if item.get("name") == name and item["type"] == "function"
+    )
+    return ContractCall(address, abi, name, None)
+
+
+@dataclass(frozen=True)
+class StargatePool:
+    block: int
+    totalLiquidity: int  # shared decimals
+    totalSupply: int
+    deltaCredit: int  # shared decimals, the instant redeem cap
+    convertRate: int
+    mintFeeBP: int
+    lpBalance: int  # strategy LP, in the wallet and staked in the MasterChef
+    balanceOfWant: int
+    maxSlippageOut: int
+
+    @classmethod
+    def read(cls, strategy, block=None):
+        calls = [
+            (_view(LP_TOKEN, "totalLiquidity"), ()),
+            (_view(LP_TOKEN, "totalSupply"), ()),
+            (_view(LP_TOKEN, "deltaCredit"), ()),
+            (_view(LP_TOKEN, "convertRate"), ()),
+            (_view(LP_TOKEN, "mintFeeBP"), ()),
+            (strategy.balanceOfLpTokens, ()),
+            (strategy.balanceOfLPInMasterChef, ()),
+            (strategy.balanceOfWant, ()),
+            (strategy.maxSlippageOut, ()),
+        ]
+        block, values = aggregate(calls, block)
+        (
+            totalLiquidity,
+            totalSupply,
+            deltaCredit,
+            convertRate,
+            mintFeeBP,
+            lp,
+            lpInMasterChef,
+            want,
+            slippage,
+        ) = values
+        return cls(
+            block=block,
+            totalLiquidity=totalLiquidity,
+            totalSupply=totalSupply,
+            deltaCredit=deltaCredit,
+            convertRate=convertRate,
+            mintFeeBP=mintFeeBP,
+            lpBalance=lp + lpInMasterChef,
+            balanceOfWant=want,
+            maxSlippageOut=slippage,
+        )
+
+    # Pool
+
+    def amountLPtoLD(self, amountLP):
+        return (
+            _uint(amountLP) * self.totalLiquidity // self.totalSupply * self.convertRate
+        )
+
+    def addLiquidity(self, amountLD):
+        # LP minted for a deposit of `amountLD`
+        amountSD = _uint(amountLD) // self.convertRate
+        amountSD = amountSD - amountSD * self.mintFeeBP // BP_DENOMINATOR
+        if self.totalSupply == 0:
+            return amountSD
+        return amountSD * self.totalSupply // self.totalLiquidity
+
+    def instantRedeemLocal(self, amountLP):
+        # Want received for redeeming `amountLP`, capped by deltaCredit
+        capAmountLP = self.deltaCredit * self.totalSupply // self.totalLiquidity
+        amountLP = np.minimum(_uint(amountLP), capAmountLP)
+        return amountLP * self.totalLiquidity // self.totalSupply * self.convertRate
+
+    # Strategy
+
+    def wantToLPToken(self, wantAmount):
+        return _uint(wantAmount) * self.totalSupply // self.totalLiquidity
+
+    def balanceOfPooled(self):
+        return int(self.amountLPtoLD(self.lpBalance))
+
+    def estimatedTotalAssets(self):
+        return self.balanceOfPooled() + self.balanceOfWant
+
+    def _slippedOut(self, intended, actual):
+        return (
+            np.maximum(intended - actual, 0)
+            > intended * self.maxSlippageOut // BP_DENOMINATOR
+        )
+
+    def liquidatePosition(self, amountNeeded):
+        # (liquidatedAmount, loss, slippedOut) for each amount, as liquidatePosition
+        # computes them
+        amountNeeded = _uint(amountNeeded)
+        want = self.balanceOfWant
+        eta = self.estimatedTotalAssets()
+
+        allLiquidated = want + self.instantRedeemLocal(self.lpBalance)
+        allLoss = np.maximum(amountNeeded - allLiquidated, 0)
+
+        toExit = np.maximum(amountNeeded - want, 0)
+        lpToExit = np.minimum(self.wantToLPToken(toExit), self.lpBalance)
+        partLiquidated = np.minimum(
+            want + self.instantRedeemLocal(lpToExit), amountNeeded
+        )
+
+        liquidateAll = eta < amountNeeded
+        partial = ~liquidateAll & (amountNeeded > want)
+        liquidated = np.select(
+            [liquidateAll, partial], [allLiquidated, partLiquidated], amountNeeded
+        )
+        loss = np.select(
+            [liquidateAll, partial], [allLoss, amountNeeded - partLiquidated], 0
+        )
+        slippedOut = np.select(
+            [liquidateAll, partial],
+            [
+                self._slippedOut(eta, allLiquidated),
+                self._slippedOut(toExit, partLiquidated - want),
+            ],
+            False,
+        )
+        return liquidated, loss, slippedOut.astype(bool)
+
+    def report(self, amounts, decimals=6):
+        liquidated, loss, slippedOut = self.liquidatePosition(amounts)
+        unit = 10 ** decimals
+        print(f"\n====Stargate pool==== (block {self.block})")
+        print(f"deltaCredit: {self.deltaCredit * self.convertRate / unit:,.2f}")
+        print(f"Estimated Total Assets: {self.estimatedTotalAssets() / unit:,.2f}")
+        print(f"{'amount':>18} {'liquidated':>18} {'loss':>14}")
+        for amount, out, lost, reverts in zip(amounts, liquidated, loss, slippedOut):
+            flag = "  Slipped Out!" if reverts else ""
+            print(
+                f"{amount / unit:>18,.2f} {out / unit:>18,.2f} {lost / unit:>14,.2f}{flag}"
+            )
+        if slippedOut.any():
+            print(
+                f"\n_enforceSlippageOut reverts from {amounts[int(np.argmax(slippedOut))] / unit:,.2f}"
+            )
+
+
+def main(strategy, points=20, decimals=6):
+    print(f"You are using the '{network.show_active()}' network")
+    strategy = Strategy.at(strategy)
+    pool = StargatePool.read(strategy)
+    eta = pool.estimatedTotalAssets()
+    points = int(points)
+    pool.report([eta * i // points for i in range(1, points + 1)], int(decimals))
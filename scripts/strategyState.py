@@ -0,0 +1,190 @@
+from dataclasses import dataclass, fields
+
+from brownie import Contract, chain, interface
+
+MULTICALL3 = "0xcA11bde05977b3631167028862bE2a173976CA11"
+MAX_POOLS = 16  # MasterChef pools scanned for the strategy's LP token
+MULTICALL3_ABI = [
+    {
+        "name": "aggregate",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            }
+        ],
+        "outputs": [
+            {"name": "blockNumber", "type": "uint256"},
+            {"name": "returnData", "type": "bytes[]"},
+        ],
+    },
+    {
+        "name": "tryAggregate",
+        "type": "function",
+        "stateMutability": "view",
+        "inputs": [
+            {"name": "requireSuccess", "type": "bool"},
+            {
+                "name": "calls",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "target", "type": "address"},
+                    {"name": "callData", "type": "bytes"},
+                ],
+            },
+        ],
+        "outputs": [
+            {
+                "name": "returnData",
+                "type": "tuple[]",
+                "components": [
+                    {"name": "success", "type": "bool"},
+                    {"name": "returnData", "type": "bytes"},
+                ],
+            }
+        ],
+    },
+]
+
+
+def multicall():
+    return Contract.from_abi("Multicall3", MULTICALL3, MULTICALL3_ABI, persist=False)
+
+
+def aggregate(calls, block=None):
+    # calls: [(ContractCall, args)]. Returns (block, decoded outputs) from a single
+    # eth_call.
+    block = chain.height if block is None else block
+    payload = [(call._address, call.encode_input(*args)) for call, args in calls]
+    block_number, return_data = multicall().aggregate.call(
+        payload, block_identifier=block
+    )
+    return block_number, [
+        call.decode_output(data) for (call, _), data in zip(calls, return_data)
+    ]
+
+
+def try_aggregate(calls, block=None):
+    # Like aggregate, but a reverting call yields None instead of failing the whole
+    # batch
+    block = chain.height if block is None else block
+    payload = [(call._address, call.encode_input(*args)) for call, args in calls]
+    results = multicall().tryAggregate.call(False, payload, block_identifier=block)
+    return [
+        call.decode_output(data) if success else None
+        for (call, _), (success, data) in zip(calls, results)
+    ]
+
+
+def masterChefPoolId(strategy, block=None):
+    # The strategy keeps its pool id internal, find the pool staking its LP token
+    masterChef = interface.IMasterChef(strategy.masterChef())
+    lpToken = strategy.lpToken()
+    pools = try_aggregate(
+        [(masterChef.poolInfo, (pid,)) for pid in range(MAX_POOLS)], block
+    )
+    for pid, pool in enumerate(pools):
+        if pool is not None and pool[0] == lpToken:
+            return pid
+    raise ValueError(f"No MasterChef pool among the first {MAX_POOLS} stakes {lpToken}")
+
+
+@dataclass(frozen=True)
+class StrategyState:
+    # Every value is read in one Multicall3 aggregate call pinned to `block`
+    block: int
+    decimals: int
+    balanceOfWant: int
+    balanceOfLpTokens: int
+    balanceOfLPInMasterChef: int
+    balanceOfPooled: int
+    balanceOfReward: int
+    estimatedTotalAssets: int
+    pendingRewards: int
+    totalDebt: int
+    totalGain: int
+    totalLoss: int
+    debtRatio: int
+    lastReport: int
+    vaultTotalAssets: int
+    pricePerShare: int
+
+    @classmethod
+    def read(cls, strategy, vault, token, block=None):
+        calls = [
+            (token.decimals, ()),
+            (strategy.balanceOfWant, ()),
+            (strategy.balanceOfLpTokens, ()),
+            (strategy.balanceOfLPInMasterChef, ()),
+            (strategy.balanceOfPooled, ()),
+            (strategy.balanceOfReward, ()),
+            (strategy.estimatedTotalAssets, ()),
+            (strategy.pendingRewards, ()),
+            (vault.strategies, (strategy,)),
+            (vault.totalAssets, ()),
+            (vault.pricePerShare, ()),
+        ]
+        block, values = aggregate(calls, block)
+        (
+            decimals,
+            want,
+            lp,
+            lpInMasterChef,
+            pooled,
+            reward,
+            eta,
+            pending,
+            params,
+            vaultAssets,
+            pps,
+        ) = values
+        params = params.dict()
+        return cls(
+            block=block,
+            decimals=decimals,
+            balanceOfWant=want,
+            balanceOfLpTokens=lp,
+            balanceOfLPInMasterChef=lpInMasterChef,
+            balanceOfPooled=pooled,
+            balanceOfReward=reward,
+            estimatedTotalAssets=eta,
+            pendingRewards=pending,
+            totalDebt=params["totalDebt"],
+            totalGain=params["totalGain"],
+            totalLoss=params["totalLoss"],
+            debtRatio=params["debtRatio"],
+            lastReport=params["lastReport"],
+            vaultTotalAssets=vaultAssets,
+            pricePerShare=pps,
+        )
+
+    def diff(self, before):
+        # Field by field `self - before`. decimals is carried over so the delta can be
+        # printed.
+        deltas = {
+            f.name: getattr(self, f.name) - getattr(before, f.name)
+            for f in fields(self)
+        }
+        deltas["decimals"] = self.decimals
+        return StrategyState(**deltas)
+
+    def __sub__(self, before):
+        return self.diff(before)
+
+    def report(self, msg):
+        wantDec = 10 ** self.decimals
+        print(f"\n===={msg}==== (block {self.block})")
+        print(f"Balance of want: {self.balanceOfWant / wantDec}")
+        print(
+            f"Balance of LP: {(self.balanceOfLpTokens + self.balanceOfLPInMasterChef) / wantDec}"
+        )
+        print(f"Balance of reward: {self.balanceOfReward / 1e18}")
+        print(f"Pending rewards: {self.pendingRewards / 1e18}")
+        print(f"Estimated Total Assets: {self.estimatedTotalAssets / wantDec}")
+        print(f"Total Debt: {self.totalDebt / wantDec}")
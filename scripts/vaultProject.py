@@ -0,0 +1,38 @@
+import os
+import sys
+import time
+from functools import lru_cache
+from pathlib import Path
+
+from brownie import config, project
+
+sys.path.append(os.path.dirname(__file__))
+
+# Loads the yearn-vaults package on first use instead of at import. Scripts and tests
+# share the loaded project; brownie keeps the compiled artifacts in the package's build/
+# folder, so only the very first load after installing the package compiles anything.
+#   brownie run vaultProject main  # times the import and the load
+API_VERSION = config["dependencies"][0].split("@")[-1]
+PACKAGE_PATH = Path.home() / ".brownie" / "packages" / config["dependencies"][0]
+
+
+@lru_cache(maxsize=None)
+def vaultProject():
+    # raise_if_loaded=False returns the project if brownie already loaded it, e.g.
+    # through `pm`
+    return project.load(PACKAGE_PATH, raise_if_loaded=False)
+
+
+def vaultContainer():
+    return vaultProject().Vault
+
+
+def main():
+    start = time.perf_counter()
+    import deployStrategy  # noqa: F401
+
+    imported = time.perf_counter()
+    vaultContainer()
+    loaded = time.perf_counter()
+    print(f"import deployStrategy: {imported - start:.3f}s")
+    print(f"load {config['dependencies'][0]}: {loaded - imported:.3f}s")
@@ -0,0 +1,273 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from brownie import accounts, chain, network, web3
+from eth_utils import keccak, to_checksum_address
+
+sys.path.append(os.path.dirname(__file__))
+
+import funding
+from strategyState import aggregate
+
+# Load test of liquidatePosition: hundreds of depositors, then waves of withdrawals
+# where every withdraw redeems from the pool and re-stakes what is left. Setup is
+# batched: one request for the ether, one storage write for the want and one JSON-RPC
+# batch of approvals and of deposits from impersonated accounts. A wave is sent as one
+# batch and mined in as few blocks as the gas limit allows (the node must support
+# evm_setAutomine), or one withdraw at a time with `concurrent=False`, which gives the
+# latency of each. Records gas, latency, the loss against the share price before the
+# wave and the revert reason of every withdraw.
+#   brownie run withdrawStorm main [fork|mock] [depositors] [share withdrawing] [waves]
+STORM_DIR = Path(__file__).resolve().parent.parent / "build" / "withdraw_storm"
+APPROVE_GAS = 100_000
+DEPOSIT_GAS = 400_000
+WITHDRAW_GAS = 3_000_000
+# blocks mined without including any pending transaction before giving up
+MAX_EMPTY_BLOCKS = 3
+ETHER = 10 ** 18
+
+
+def depositors(count, seed=0):
+    # Deterministic addresses nobody has a key for, used through impersonation
+    return [
+        to_checksum_address(keccak(text=f"depositor-{seed}-{i}")[-20:])
+        for i in range(count)
+    ]
+
+
+def depositSizes(count, median, sigma=1.5, rng=None):
+    # Lognormal sizes, a few whales and a long tail of small depositors
+    rng = rng or np.random.default_rng(0)
+    return np.maximum(rng.lognormal(np.log(median), sigma, count), 1).astype(int)
+
+
+def storm(addresses, share=0.5, waves=5, decay=0.6, partial=0.3, rng=None):
+    # `share` of the depositors withdraw over `waves`, the first wave the largest (each
+    # wave `decay` times the previous one). A `partial` share of them only withdraws
+    # part of it. Returns [[(address, share of their vault shares)]]
+    rng = rng or np.random.default_rng(0)
+    leaving = rng.permutation(len(addresses))[: int(len(addresses) * share)]
+    weights = decay ** np.arange(waves)
+    bounds = np.round(np.cumsum(weights) / weights.sum() * len(leaving)).astype(int)
+    fractions = np.where(
+        rng.random(len(leaving)) < partial, rng.uniform(0.1, 0.9, len(leaving)), 1.0
+    )
+    return [
+        [
+            (addresses[i], fraction)
+            for i, fraction in zip(leaving[start:end], fractions[start:end])
+        ]
+        for start, end in zip(np.concatenate([[0], bounds[:-1]]), bounds)
+        if end > start
+    ]
+
+
+def _automine(enabled):
+    return "error" not in web3.provider.make_request("evm_setAutomine", [enabled])
+
+
+def _receipts(hashes):
+    return funding.batch([("eth_getTransactionReceipt", [txid]) for txid in hashes])
+
+
+def send(transactions, concurrent=True):
+    # Returns the receipts and the seconds each transaction took to be mined. Concurrent
+    # transactions share the time of their batch.
+    if not concurrent:
+        receipts, latencies = [], []
+        for transaction in transactions:
+            start = time.perf_counter()
+            receipts += _receipts(
+                funding.batch([("eth_sendTransaction", [transaction])])
+            )
+            latencies.append(time.perf_counter() - start)
+        return receipts, latencies
+
+    batched = _automine(False)
+    start = time.perf_counter()
+    try:
+        hashes = funding.batch(
+            [("eth_sendTransaction", [transaction]) for transaction in transactions]
+        )
+        receipts = [None] * len(hashes) if batched else _receipts(hashes)
+        empty = 0
+        while batched and None in receipts:
+            # Blocks fill up to the gas limit, the rest stays pending for the next one
+            pending = receipts.count(None)
+            web3.provider.make_request("evm_mine", [])
+            receipts = _receipts(hashes)
+            empty = empty + 1 if receipts.count(None) == pending else 0
+            if empty >= MAX_EMPTY_BLOCKS:
+                raise RuntimeError(
+                    f"{pending} of {len(hashes)} transactions still pending after {empty} empty blocks"
+                )
+    finally:
+        if batched:
+            _automine(True)
+    return receipts, [time.perf_counter() - start] * len(transactions)
+
+
+def _call(contract, fn, sender, args, gas):
+    return {
+        "from": sender,
+        "to": contract.address,
+        "data": getattr(contract, fn).encode_input(*args),
+        "gas": hex(gas),
+    }
+
+
+def fund(deployment, addresses, amounts, concurrent=True):
+    # Deposits `amounts` from `addresses`, then harvests them into the pool
+    token, vault = deployment.token, deployment.vault
+    for address in addresses:
+        accounts.at(address, force=True)
+    funding.set_eth_balances(addresses, 10 * ETHER)
+    current = aggregate([(token.balanceOf, (address,)) for address in addresses])[1]
+    funding.set_balances(
+        token,
+        {
+            address: balance + int(amount)
+            for address, balance, amount in zip(addresses, current, amounts)
+        },
+    )
+    approvals = [
+        _call(token, "approve", address, (vault.address, int(amount)), APPROVE_GAS)
+        for address, amount in zip(addresses, amounts)
+    ]
+    deposits = [
+        _call(vault, "deposit", address, (int(amount),), DEPOSIT_GAS)
+        for address, amount in zip(addresses, amounts)
+    ]
+    for name, transactions in (("approve", approvals), ("deposit", deposits)):
+        receipts, _ = send(transactions, concurrent)
+        failed = sum(int(receipt["status"], 16) == 0 for receipt in receipts)
+        if failed:
+            raise ValueError(
+                f"{failed} of {len(receipts)} {name} transactions reverted"
+            )
+    chain.sleep(1)
+    return deployment.strategy.harvest({"from": accounts[0]})
+
+
+def _revertMsg(txid):
+    try:
+        return chain.get_transaction(txid).revert_msg
+    except Exception:
+        return None
+
+
+def replay(deployment, waves, maxLoss=1, concurrent=True):
+    # Sends every wave of `storm`, returns one row per withdraw
+    token, vault = deployment.token, deployment.vault
+    unit = 10 ** vault.decimals()
+    rows = []
+    for number, wave in enumerate(waves):
+        addresses = [address for address, _ in wave]
+        calls = [
+            (call, (address,))
+            for address in addresses
+            for call in (vault.balanceOf, token.balanceOf)
+        ]
+        before = aggregate([(vault.pricePerShare, ())] + calls)[1]
+        pricePerShare, balances = before[0], before[1:]
+        shares = [
+            int(balances[2 * i] * fraction) for i, (_, fraction) in enumerate(wave)
+        ]
+        transactions = [
+            _call(vault, "withdraw", address, (amount, address, maxLoss), WITHDRAW_GAS)
+            for address, amount in zip(addresses, shares)
+        ]
+        receipts, latencies = send(transactions, concurrent)
+        after = aggregate([(token.balanceOf, (address,)) for address in addresses])[1]
+
+        for i, (address, receipt) in enumerate(zip(addresses, receipts)):
+            expected = shares[i] * pricePerShare // unit
+            received = after[i] - balances[2 * i + 1]
+            reverted = int(receipt["status"], 16) == 0
+            rows.append(
+                {
+                    "wave": number,
+                    "depositor": address,
+                    "shares": shares[i],
+                    "expected": expected,
+                    "received": received,
+                    "lossBps": np.nan
+                    if reverted or expected == 0
+                    else (expected - received) / expected * 10_000,
+                    "gas": int(receipt["gasUsed"], 16),
+                    "block": int(receipt["blockNumber"], 16),
+                    "seconds": latencies[i],
+                    "reverted": reverted,
+                    "revert": _revertMsg(receipt["transactionHash"])
+                    if reverted
+                    else None,
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def summary(table):
+    done = table[~table["reverted"] & table["expected"].gt(0)]
+    print(
+        f"\n{len(table)} withdraws in {table['wave'].nunique()} waves, {len(table) - len(done)} reverted"
+    )
+    print(f"{'':<14} {'p50':>12} {'p90':>12} {'p99':>12} {'max':>12}")
+    for column, scale in (("gas", 1), ("seconds", 1e3), ("lossBps", 1)):
+        values = done[column] * scale
+        quantiles = values.quantile([0.5, 0.9, 0.99]).tolist() + [values.max()]
+        label = "latency ms" if column == "seconds" else column
+        print(f"{label:<14} " + " ".join(f"{value:>12,.2f}" for value in quantiles))
+    print(
+        f"\n{'wave':>4} {'withdraws':>10} {'blocks':>7} {'gas':>14} {'loss bps':>9} {'reverts':>8}"
+    )
+    for wave, rows in table.groupby("wave"):
+        print(
+            f"{wave:>4} {len(rows):>10} {rows['block'].nunique():>7} {rows['gas'].sum():>14,} "
+            f"{rows['lossBps'].mean():>9.3f} {rows['reverted'].sum():>8}"
+        )
+    reasons = table["revert"].dropna().value_counts()
+    for reason, count in reasons.items():
+        print(f"{count:>6} reverted with {reason!r}")
+
+
+def main(
+    backend="fork",
+    count=300,
+    share=0.6,
+    waves=5,
+    median=10_000,
+    maxLoss=1,
+    concurrent=True,
+    seed=0,
+):
+    print(f"You are using the '{network.show_active()}' network")
+    from bakeState import setup
+
+    deployment = setup(backend)
+    rng = np.random.default_rng(int(seed))
+    unit = 10 ** deployment.token.decimals()
+    addresses = depositors(int(count), int(seed))
+    amounts = depositSizes(len(addresses), float(median), rng=rng) * unit
+    concurrent = concurrent not in (False, "False", "false", "0")
+
+    start = time.perf_counter()
+    fund(deployment, addresses, amounts, concurrent)
+    print(
+        f"{len(addresses)} depositors, {amounts.sum() / unit:,.0f} deposited in {time.perf_counter() - start:.1f}s"
+    )
+
+    table = replay(
+        deployment,
+        storm(addresses, float(share), int(waves), rng=rng),
+        int(maxLoss),
+        concurrent,
+    )
+    summary(table)
+    STORM_DIR.mkdir(parents=True, exist_ok=True)
+    path = STORM_DIR / f"{backend}-{chain.id}-{len(addresses)}.csv"
+    table.to_csv(path, index=False)
+    print(f"\nSaved to {path}")
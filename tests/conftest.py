@@ -8,11 +8,111 @@ script_dir = os.path.dirname( __file__ )
 strategyDeploy_dir = os.path.join( script_dir ,  ".." , "scripts" )
 sys.path.append( strategyDeploy_dir )
 
-from deployStrategy import addHealthCheck, deploy
+from deployStrategy import addHealthCheck, deploy, setupStrategy, setupVault
+import bakeState
+import explorerCache
+import funding
+from gasSnapshot import GasSnapshot
+from vaultProject import vaultContainer
 
 # use this to set what chain we use. 1 for ETH, 250 for fantom
 chain_used = 1
 
+def pytest_addoption(parser):
+    parser.addoption(
+        "--backend",
+        choices=("fork", "mock"),
+        default="fork",
+        help="fork: mainnet-fork contracts. mock: local mock protocol, use with --network development",
+    )
+    parser.addoption(
+        "--refresh-explorer-cache",
+        action="store_true",
+        help="re-fetch cached explorer ABIs instead of loading them from build/explorer_cache",
+    )
+    parser.addoption(
+        "--baked-state",
+        default=None,
+        help="sidecar json written by `brownie run bakeState`, loads vault, strategy and funded users (anvil only)",
+    )
+    parser.addoption(
+        "--update-gas-snapshot",
+        action="store_true",
+        help="record the gas used by tests/test_gas.py into tests/gas_snapshot.json",
+    )
+    parser.addoption(
+        "--gas-tolerance",
+        type=float,
+        default=0.02,
+        help="allowed relative gas increase over tests/gas_snapshot.json (default 0.02)",
+    )
+    parser.addoption(
+        "--rpc-profile",
+        action="store_true",
+        help="count RPC requests and latency per test, fixture and method into build/rpc_profiles/",
+    )
+
+def pytest_configure(config):
+    if config.getoption("--rpc-profile"):
+        from rpcProfile import PytestPlugin
+        config.pluginmanager.register(PytestPlugin(config), "rpc-profile")
+
+@pytest.fixture(scope="session")
+def backend(request):
+    yield request.config.getoption("--backend")
+
+@pytest.fixture(scope="session", autouse=True)
+def baked_state(request):
+    # Autouse session fixtures run before the first module_isolation takes brownie's reset
+    # snapshot, so the loaded state survives the chain.reset() between modules
+    path = request.config.getoption("--baked-state")
+    yield bakeState.load(path) if path else None
+
+@pytest.fixture(scope="session")
+def gas_snapshot(request, backend):
+    snapshot = GasSnapshot(
+        backend,
+        request.config.getoption("--gas-tolerance"),
+        update=request.config.getoption("--update-gas-snapshot"),
+    )
+    yield snapshot
+    print(f"\nGas used ({backend}):\n{snapshot.report()}")
+    if snapshot.update:
+        snapshot.save()
+
+@pytest.fixture(scope="session")
+def from_explorer(request):
+    # Loads verified ABIs from the on-disk cache, the explorer is only hit on a miss
+    refresh = request.config.getoption("--refresh-explorer-cache")
+    refreshed = set()
+
+    def load(address):
+        contract = explorerCache.from_explorer(address, refresh=refresh and address not in refreshed)
+        refreshed.add(address)
+        return contract
+
+    yield load
+
+@pytest.fixture
+def protocol(backend, accounts, baked_state):
+    if backend == "mock" and baked_state is not None:
+        from mockProtocol import load_mock_protocol
+        yield load_mock_protocol(baked_state["addresses"]["protocol"], accounts[8])
+    elif backend == "mock":
+        from mockProtocol import deploy_mock_protocol
+        yield deploy_mock_protocol(accounts[0], accounts[8])
+    else:
+        yield None
+
+@pytest.fixture
+def deploy_args(protocol):
+    # Extra deploy arguments for deployStrategy, empty on the fork (mainnet defaults)
+    if protocol is None:
+        yield {}
+    else:
+        from mockProtocol import strategy_args
+        yield strategy_args(protocol)
+
 @pytest.fixture
 def gov(accounts):
     yield accounts[0]
@@ -60,17 +160,26 @@ def keeper(accounts):
 
 
 @pytest.fixture
-def token():
+def token(protocol, from_explorer):
+    if protocol is not None:
+        yield protocol.want
+        return
     token_address = "0xdAC17F958D2ee523a2206206994597C13D831ec7"  # this should be the address of the ERC-20 used by the strategy/vault (USDT / USDC)
-    yield Contract.from_explorer(token_address)
+    yield from_explorer(token_address)
 
 @pytest.fixture
-def dai():
+def dai(protocol, from_explorer):
+    if protocol is not None:
+        yield protocol.dai
+        return
     token_address = "0x6B175474E89094C44Da98b954EedeAC495271d0F"  # this DAI for sweep testing
-    yield Contract.from_explorer(token_address)
+    yield from_explorer(token_address)
 
 @pytest.fixture
-def userWithDAI(accounts):
+def userWithDAI(accounts, protocol):
+    if protocol is not None:
+        yield protocol.whale
+        return
     yield accounts.at("0xf977814e90da44bfa03b6295a0616a897441acec", force=True)
 
 @pytest.fixture
@@ -78,53 +187,62 @@ def userWithWeth(accounts):
     yield accounts.at("0x57757e3d981446d585af0d9ae4d7df6d64647806", force=True)
     
 @pytest.fixture
-def token_whale(accounts):
+def token_whale(accounts, protocol):
+    if protocol is not None:
+        yield protocol.whale
+        return
     token_address = "0x5754284f345afc66a98fbb0a0afe71e0f007b949"  # this should be the address of the ERC-20 used by the strategy/vault (DAI)
     yield accounts.at(token_address,force=True)
 
 @pytest.fixture
-def reward():
+def reward(protocol, from_explorer):
+    if protocol is not None:
+        yield protocol.reward
+        return
     token_address = "0xAf5191B0De278C7286d6C7CC6ab6BB8A73bA2Cd6"
-    yield Contract.from_explorer(token_address)
+    yield from_explorer(token_address)
 
 @pytest.fixture
-def reward_whale(accounts):
+def reward_whale(accounts, protocol):
+    if protocol is not None:
+        return protocol.whale
     token_address = "0x28c6c06298d514db089934071355e5743bf21d60"
     return accounts.at(token_address, force=True)
 
 
 @pytest.fixture
-def amount(accounts, token, user):
-    amount = 100_000 * 10 ** token.decimals()
-    # In order to get some funds for the token you are about to use,
-    # it impersonate an exchange address to use it's funds.
-    reserve = accounts.at("0x5754284f345afc66a98fbb0a0afe71e0f007b949", force=True)
-    token.transfer(user, amount, {"from": reserve})
-    yield amount
+def user_amounts(token, user, user2, user3, token_whale, baked_state):
+    if baked_state is not None:
+        amounts = baked_state["amounts"]
+        yield {user: amounts["user"], user2: amounts["user2"], user3: amounts["user3"]}
+        return
+    decimals = 10 ** token.decimals()
+    amounts = {user: 100_000 * decimals, user2: 10_000 * decimals, user3: 100_000 * decimals}
+    # Balances are written to storage in one batch, the whale is only used as a fallback
+    # on nodes that cannot set storage
+    funding.add_balances(token, amounts, whale=token_whale)
+    yield amounts
+
+@pytest.fixture
+def amount(user, user_amounts):
+    yield user_amounts[user]
 
 @pytest.fixture
-def amount2(accounts, token, user2):
-    amount = 10_000 * 10 ** token.decimals()
-    # In order to get some funds for the token you are about to use,
-    # it impersonate an exchange address to use it's funds.
-    reserve = accounts.at("0x5754284f345afc66a98fbb0a0afe71e0f007b949", force=True)
-    token.transfer(user2, amount, {"from": reserve})
-    yield amount
+def amount2(user2, user_amounts):
+    yield user_amounts[user2]
 
 @pytest.fixture
-def amount3(accounts, token, user3):
-    amount = 100_000 * 10 ** token.decimals()
-    # In order to get some funds for the token you are about to use,
-    # it impersonate an exchange address to use it's funds.
-    reserve = accounts.at("0x5754284f345afc66a98fbb0a0afe71e0f007b949", force=True)
-    token.transfer(user3, amount, {"from": reserve})
-    yield amount
+def amount3(user3, user_amounts):
+    yield user_amounts[user3]
 
 
 @pytest.fixture
-def weth():
+def weth(protocol, from_explorer):
+    if protocol is not None:
+        yield protocol.weth
+        return
     token_address = "0xC02aaA39b223FE8D0A0e5C4F27eAD9083C756Cc2"
-    yield Contract.from_explorer(token_address)
+    yield from_explorer(token_address)
 
 
 @pytest.fixture
@@ -135,25 +253,25 @@ def weth_amount(user, weth):
 
 
 @pytest.fixture
-def vault(pm, gov, rewards, guardian, management, token):
-    Vault = pm(config["dependencies"][0]).Vault
+def vault(gov, rewards, guardian, management, token, baked_state):
+    Vault = vaultContainer()
+    if baked_state is not None:
+        yield Vault.at(baked_state["addresses"]["vault"])
+        return
     vault = guardian.deploy(Vault)
-    vault.initialize(token, gov, rewards, "", "", guardian, management)
-    vault.setDepositLimit(2 ** 256 - 1, {"from": gov})
-    vault.setManagement(management, {"from": gov})
-    vault.setPerformanceFee(0,  {"from": gov})
-    vault.setManagementFee(0,  {"from": gov})
+    setupVault(vault, token, gov, rewards, guardian, management)
     chain.sleep(1)
     yield vault
 
 
 @pytest.fixture
-def strategy(strategist, keeper, vault, Strategy, gov):
-    strategy = deployStrategy(Strategy, strategist, gov ,vault)
+def strategy(strategist, keeper, vault, Strategy, gov, deploy_args, baked_state):
+    if baked_state is not None:
+        yield Strategy.at(baked_state["addresses"]["strategy"])
+        return
+    strategy = deployStrategy(Strategy, strategist, gov ,vault, **deploy_args)
     # strategy = strategist.deploy(Strategy, vault)
-    strategy.setKeeper(keeper)
-    vault.addStrategy(strategy, 10_000, 0, 2 ** 256 - 1, 0, {"from": gov})
-    strategy.setDust(1e18, 1e6, {"from": gov})
+    setupStrategy(strategy, vault, gov, keeper)
     # addHealthCheck(strategy, gov, gov)
     # strategy.setHealthCheck(healthCheck, {"from": gov})
     # strategy.setDoHealthCheck(True, {"from": gov})
@@ -161,8 +279,8 @@ def strategy(strategist, keeper, vault, Strategy, gov):
     chain.mine(1)
     yield strategy
 
-def deployStrategy(Strategy, strategist, gov, vault):
-    return deploy(Strategy, strategist, gov ,vault)
+def deployStrategy(Strategy, strategist, gov, vault, **deploy_args):
+    return deploy(Strategy, strategist, gov ,vault, **deploy_args)
 
 
 @pytest.fixture(scope="session")
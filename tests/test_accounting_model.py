@@ -0,0 +1,79 @@
+import pytest
+
+import accountingModel
+import funding
+from strategyState import StrategyState
+
+# Differential test: the NumPy model of prepareReturn against the Harvested event of a
+# real harvest
+
+
+@pytest.mark.parametrize(
+    "airdrop,debtRatio", [(10, 10_000), (0, 5_000), (10, 5_000), (0, 0)]
+)
+def test_prepare_return_model(
+    chain,
+    token,
+    vault,
+    strategy,
+    user,
+    amount,
+    gov,
+    airdrop,
+    debtRatio,
+    RELATIVE_APPROX,
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    # Keep rewards out of the accounting, the model takes them as `harvested`
+    strategy.setDust(2 ** 256 - 1, 1e6, {"from": gov})
+
+    if airdrop:
+        funding.add_balances(token, {strategy: amount * airdrop // 100})
+    vault.updateStrategyDebtRatio(strategy, debtRatio, {"from": gov})
+    chain.sleep(1)
+    chain.mine(1)
+
+    state = StrategyState.read(strategy, vault, token)
+    debtOutstanding = vault.debtOutstanding(strategy)
+    report = accountingModel.prepareReturn(
+        state.totalDebt,
+        state.estimatedTotalAssets,
+        state.balanceOfWant,
+        debtOutstanding,
+    )
+
+    harvested = strategy.harvest({"from": gov}).events["Harvested"]
+    assert harvested["debtOutstanding"] == debtOutstanding
+    assert not report.slippedOut
+    assert (
+        pytest.approx(int(report.profit), rel=RELATIVE_APPROX, abs=10)
+        == harvested["profit"]
+    )
+    assert (
+        pytest.approx(int(report.loss), rel=RELATIVE_APPROX, abs=10)
+        == harvested["loss"]
+    )
+    assert (
+        pytest.approx(int(report.debtPayment), rel=RELATIVE_APPROX, abs=10)
+        == harvested["debtPayment"]
+    )
+
+
+def test_prepare_return_model_branches():
+    # (totalDebt, estimatedTotalAssets, balanceOfWant, debtOutstanding) -> (profit,
+    # loss, debtPayment)
+    cases = {
+        (100, 110, 5, 0): (5, 0, 0),  # profit capped by want
+        (100, 110, 50, 20): (10, 0, 20),  # debt paid in full
+        # 5 redeemed for the debt, rest of the want pays it
+        (100, 110, 15, 20): (10, 0, 10),
+        (100, 90, 10, 50): (0, 10, 50),  # loss, liquidated for the debt
+        (100, 90, 10, 200): (0, 10, 90),  # loss, everything liquidated
+    }
+    report = accountingModel.prepareReturn(*zip(*cases))
+    assert list(zip(report.profit, report.loss, report.debtPayment)) == list(
+        cases.values()
+    )
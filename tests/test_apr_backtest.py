@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+import util
+from aprBacktest import History, backtest, grid
+from eventIndexer import EventIndex
+
+DAY = 24 * 3600
+
+
+def synthetic_history(days=365, deltaCredit=1e13):
+    # Daily harvests of 300 want in rewards on 1M of debt, LP fees accruing on the side
+    step = np.arange(days + 1)
+    debt = np.full(days + 1, 1e12)
+    return History(
+        block=step,
+        timestamp=step * float(DAY),
+        profit=np.full(days + 1, 3e8),
+        loss=np.zeros(days + 1),
+        totalDebt=debt,
+        estimatedTotalAssets=debt + step * 1e7,
+        pricePerShare=1e6 * (1 + step * 3e-4),
+        lpBalance=debt,
+        lpRate=1 + step * 1e-5,
+        deltaCredit=np.full(days + 1, deltaCredit),
+        mintFeeBP=np.zeros(days + 1),
+        collectFeesEnabled=np.zeros(days + 1, dtype=bool),
+        decimals=6,
+    )
+
+
+def test_replay_parameters():
+    history = synthetic_history()
+    results = backtest(
+        history, grid(minProfit=[0, 2e9], collectFeesEnabled=[False, True])
+    )
+
+    # The historical settings reproduce the history
+    assert results["harvests"][0] == 365
+    assert results["gain"][0] == pytest.approx(history.profit[1:].sum())
+    assert results["apr"][0] == pytest.approx(history.realized()["apr"].mean())
+    # A higher minProfit harvests less often for less gas, collecting fees adds their
+    # growth
+    assert results["harvests"][2] < results["harvests"][0]
+    assert results["gasCost"][2] < results["gasCost"][0]
+    assert results["gain"][1] == pytest.approx(results["gain"][0] + 365 * 1e7)
+
+
+def test_redeem_cap_reverts():
+    history = synthetic_history(deltaCredit=1e6)
+    results = backtest(
+        history, grid(collectFeesEnabled=True, maxSlippageOut=[5, 10_000])
+    )
+    assert results["harvests"][0] < results["harvests"][1]
+    assert results["reverts"][0] > 0 and results["reverts"][1] == 0
+
+
+def test_load_indexed_history(
+    chain, token, vault, strategy, user, amount, gov, reward, reward_whale, tmp_path
+):
+    start = chain.height + 1
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    txs = []
+    for _ in range(3):
+        chain.sleep(DAY)
+        txs.append(strategy.harvest({"from": gov}))
+        util.airdrop_rewards(strategy, reward, reward_whale)
+
+    index = EventIndex(tmp_path / "events.sqlite")
+    index.sync(strategy, vault, confirmations=0, start=start)
+    history = History.load(index, strategy, decimals=token.decimals())
+    assert list(history.block) == [tx.block_number for tx in txs]
+    assert list(history.profit) == [tx.events["Harvested"]["profit"] for tx in txs]
+    assert history.pricePerShare[-1] == vault.pricePerShare()
+
+    realized = history.realized()
+    assert np.all(realized["apr"] > 0)
+    replay = backtest(history, grid(minProfit=0))
+    assert replay["gain"][0] == pytest.approx(history.profit[1:].sum())
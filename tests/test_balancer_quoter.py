@@ -0,0 +1,33 @@
+import pytest
+
+import balancerQuoter
+from balancerQuoter import ONE, RouteSnapshot, queryBatchSwap
+
+
+def test_quote_matches_query_batch_swap(backend, strategy):
+    if backend == "mock":
+        pytest.skip("the quoter reads the mainnet Balancer pools")
+    snapshot = RouteSnapshot.read()
+    amounts = [ONE, 1_000 * ONE, 100_000 * ONE]
+    for amount, quote in zip(amounts, snapshot.quote(amounts)):
+        assert (
+            pytest.approx(queryBatchSwap(amount, strategy, snapshot.block), rel=1e-6)
+            == quote
+        )
+    impact = snapshot.priceImpact(amounts)
+    assert impact[0] == 0 and impact[2] > impact[1] > 0
+
+
+def test_pool_math():
+    # A 50/50 weighted pool without fee is x * y = k
+    balance, amount = 10 ** 24, 10 ** 21
+    assert pytest.approx(
+        balance * amount // (balance + amount), rel=1e-10
+    ) == balancerQuoter.weightedOutGivenIn(balance, ONE // 2, balance, ONE // 2, amount)
+    # The stable invariant of a balanced pool is the sum of its balances
+    assert balancerQuoter.stableInvariant(200_000, [10 ** 25] * 3) == 3 * 10 ** 25
+    # Within the targets a linear pool redeems BPT at its rate
+    out = balancerQuoter.linearMainOutGivenBptIn(
+        10 ** 21, 10 ** 24, 10 ** 24, 2 * 10 ** 24, 10 ** 14, 0, 2 * 10 ** 24
+    )
+    assert out == 10 ** 21
@@ -0,0 +1,94 @@
+import util
+from conftest import deployStrategy
+from eventIndexer import EventIndex
+
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+
+
+def test_incremental_sync(
+    chain, token, vault, strategy, user, amount, gov, reward, reward_whale, tmp_path
+):
+    index = EventIndex(tmp_path / "events.sqlite")
+    start = chain.height + 1
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    txs = [strategy.harvest({"from": gov})]
+    util.airdrop_rewards(strategy, reward, reward_whale)
+    chain.sleep(3600)
+    txs.append(strategy.harvest({"from": gov}))
+
+    first = index.sync(strategy, vault, confirmations=0, start=start)
+    harvested = index.events(strategy, "Harvested")
+    assert list(harvested["block"]) == [tx.block_number for tx in txs]
+    assert list(harvested["profit"]) == [tx.events["Harvested"]["profit"] for tx in txs]
+    assert (
+        len(index.events(vault, "StrategyReported", strategy=strategy.address)["block"])
+        == 2
+    )
+    assert (
+        list(index.events(vault, "Transfer", sender=ZERO_ADDRESS)["receiver"])[0]
+        == user
+    )
+    snapshots = index.snapshots(strategy)
+    assert list(snapshots["block"]) == [tx.block_number for tx in txs]
+    assert snapshots["pricePerShare"][-1] == vault.pricePerShare()
+
+    # A repeated run only asks for the new blocks
+    second = index.sync(strategy, vault, confirmations=0)
+    assert (second.requests, second.logs) == (0, 0)
+    tx = strategy.harvest({"from": gov})
+    third = index.sync(strategy, vault, confirmations=0)
+    assert third.fromBlock == first.toBlock + 1
+    assert list(index.events(strategy, "Harvested")["block"])[-1] == tx.block_number
+
+    # The last harvest is replaced by another block at the same height
+    chain.undo()
+    chain.sleep(60)
+    vault.withdraw(vault.balanceOf(user) // 2, user, 10_000, {"from": user})
+    fourth = index.sync(strategy, vault, confirmations=0)
+    assert fourth.rewound
+    assert list(index.events(strategy, "Harvested")["block"]) == [
+        tx.block_number for tx in txs
+    ]
+    assert list(index.events(vault, "Transfer", receiver=ZERO_ADDRESS)["sender"]) == [
+        user
+    ]
+
+
+def test_rewind_moves_back_strategies_of_the_vault(
+    chain,
+    token,
+    vault,
+    strategy,
+    Strategy,
+    strategist,
+    gov,
+    user,
+    amount,
+    deploy_args,
+    tmp_path,
+):
+    other = deployStrategy(Strategy, strategist, gov, vault, **deploy_args)
+    vault.addStrategy(other, 0, 0, 2 ** 256 - 1, 0, {"from": gov})
+    index = EventIndex(tmp_path / "events.sqlite")
+    start = chain.height + 1
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount // 2, {"from": user})
+    chain.sleep(1)
+    other.harvest({"from": gov})
+    vault.deposit(amount // 4, {"from": user})
+    index.sync(strategy, vault, confirmations=0, start=start)
+    index.sync(other, vault, confirmations=0, start=start)
+
+    # Reorganising the last block drops the vault events of both strategies
+    chain.undo()
+    vault.deposit(amount // 8, {"from": user})
+    assert index.sync(strategy, vault, confirmations=0).rewound
+    assert index.cursor(other)[0] < chain.height
+    index.sync(other, vault, confirmations=0)
+    assert (
+        len(index.events(vault, "StrategyReported", strategy=other.address)["block"])
+        == 1
+    )
+    assert len(index.events(other, "Harvested")["block"]) == 1
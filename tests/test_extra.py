@@ -356,7 +356,7 @@ def test_singe_harvest_multiple_deposits_withdraw_4(
     chain.sleep(3600 * 7)
     chain.mine()
 
-    util.stateOfStrat('After harvest', strategy, token)
+    util.stateOfStrat('After harvest', strategy, token, vault)
 
     print(f'Vault Total Assets after: {vault.totalAssets() / 10 ** token.decimals()}')
     vaultAssets_after = vault.totalAssets()
@@ -0,0 +1,75 @@
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from bakeState import Setup
+from feeCollection import HOURS_PER_YEAR, CollectionCost, breakEven, feeApr, simulate
+
+
+def test_collection_cost(
+    token, reward, reward_whale, vault, strategy, user, user2, user3, user_amounts
+):
+    # Keyed like bakeState.setup, measure deposits amounts["user"]
+    amounts = {
+        "user": user_amounts[user],
+        "user2": user_amounts[user2],
+        "user3": user_amounts[user3],
+    }
+    deployment = Setup(token, reward, reward_whale, vault, strategy, amounts, {})
+    cost = CollectionCost.measure(deployment, surplus=1_000)
+    # Withdrawing from the MasterChef, redeeming and re-depositing costs more than the
+    # checks alone
+    assert cost.collectGas > cost.idleGas >= 0
+    assert 0 <= cost.roundTripBps < 100
+    assert cost.wantDust == 1
+    assert not strategy.collectFeesEnabled()
+
+
+def test_fee_apr(strategy):
+    # The lookback reaches back before the mock pool and Multicall3 were deployed
+    assert 0 <= feeApr(strategy) < 1
+
+
+def test_collection_profitability():
+    cost = CollectionCost(
+        block=0,
+        idleGas=5_000,
+        collectGas=250_000,
+        roundTripBps=1,
+        deltaCredit=1_000_000,
+        maxSlippageOut=5,
+        wantDust=1,
+        decimals=6,
+    )
+    baseFees = np.full(100, 20e9)
+    result = simulate(
+        cost,
+        0.02,
+        [10_000, 1_000_000, 1e9],
+        [24, 24 * 30],
+        baseFees,
+        1_500,
+        priorityFee=0,
+    )
+
+    # Gas dominates small positions harvested often, not rare harvests of bigger ones
+    assert not result["profitable"][0, 0]
+    assert result["profitable"][1].all()
+    # A month of fees on 1B is more than the pool can redeem instantly
+    assert result["reverts"][2, 1] and not result["reverts"][2, 0]
+
+    tvls = breakEven(cost, 0.02, [24, 24 * 30], baseFees, 1_500, priorityFee=0)
+    assert tvls[0] > tvls[1]
+    atBreakEven = simulate(
+        cost, 0.02, tvls, [24, 24 * 30], baseFees, 1_500, priorityFee=0
+    )
+    assert np.allclose(np.diag(atBreakEven["net"]), 0, atol=1e-6)
+
+    # Fees at or under wantDust are not collected, and a pool that cannot redeem them
+    # instantly never breaks even
+    dusty = replace(cost, wantDust=1_000_000)
+    tvl = breakEven(dusty, 0.02, [24], baseFees, 1_500, priorityFee=0)[0]
+    assert tvl * 0.02 * 24 / HOURS_PER_YEAR == pytest.approx(dusty.wantDust)
+    shallow = replace(cost, deltaCredit=1)
+    assert np.isinf(breakEven(shallow, 0.02, [24], baseFees, 1_500, priorityFee=0)[0])
@@ -0,0 +1,22 @@
+import pytest
+
+import forkPool
+from forkPool import withdrawSlippage
+
+
+def test_pool_runs_scenarios_on_separate_nodes(backend):
+    if backend != "mock":
+        pytest.skip("each worker deploys its own protocol, too slow on forks")
+    shares = [0.25, 0.5, 1.0]
+    results = forkPool.run(
+        [(withdrawSlippage, {"share": share}) for share in shares],
+        nodes=2,
+        recycle=2,
+        name="development",
+        backend="mock",
+    )
+    assert list(results["share"]) == shares
+    assert results["error"].isna().all(), results["error"].dropna().iloc[0]
+    assert results["port"].isin([forkPool.BASE_PORT, forkPool.BASE_PORT + 1]).all()
+    # Each scenario starts from the deployment, not after the previous one
+    assert (results["lossBps"] < 10).all()
@@ -0,0 +1,199 @@
+import os
+
+from brownie import chain, interface
+from brownie.exceptions import VirtualMachineError
+from brownie.test import strategy
+
+import fastForward
+from conftest import deployStrategy
+from strategyState import masterChefPoolId
+
+# Random deposit / harvest / tend / withdraw / emergency exit / fee collection /
+# migration sequences with real MasterChef accrual. brownie's state_machine reverts the
+# chain to a snapshot between sequences, so every sequence starts from the fixtures'
+# state.
+#   FUZZ_EXAMPLES=2000 FUZZ_STEPS=30 brownie test tests/test_fuzz.py
+MAX_BPS = 10_000
+SLIPPAGE_BPS = 10  # maxSlippageIn + maxSlippageOut
+ROUNDING = 10  # want units the Stargate conversions may lose per operation
+EXPECTED_REVERTS = ("Slipped in!", "Slipped Out!")
+
+
+class StrategyStateMachine:
+    share = strategy("decimal", min_value="0.001", max_value="1", places=3)
+    maxLoss = strategy("uint256", max_value=MAX_BPS)
+    depositor = strategy("uint8", max_value=2)
+    blocks = strategy("uint256", min_value=1, max_value=20_000)
+    enabled = strategy("bool")
+
+    def __init__(cls, token, vault, strategy, new_strategy, users, gov):
+        cls.token = token
+        cls.vault = vault
+        cls.initial_strategy = strategy
+        cls.new_strategy = new_strategy
+        cls.users = users
+        cls.gov = gov
+        cls.lpToken = interface.ILpPool(strategy.lpToken())
+        cls.masterChef = interface.IMasterChef(strategy.masterChef())
+        cls.pid = masterChefPoolId(strategy)
+
+    def setup(self):
+        self.strategy = self.initial_strategy
+        self.deposited = 0
+        self.withdrawn = 0
+        self.allowance = 0  # slippage and rounding the current step may lose
+        # allowances since the last report, the debt may exceed the assets by that much
+        self.unreported = 0
+        self.balance = 0  # vault assets + withdrawn - deposited after the previous step
+        self.migrated = False
+        self.exited = False
+        self.exit_harvested = False
+
+    def _allow(self, amount):
+        allowance = amount * SLIPPAGE_BPS // MAX_BPS + ROUNDING
+        self.allowance += allowance
+        self.unreported += allowance
+        return allowance
+
+    def _disallow(self, allowance):
+        # For a step that reverted and so could not lose anything
+        self.allowance -= allowance
+        self.unreported -= allowance
+
+    def _expect_revert(self, call, *args):
+        # Returns the transaction, or None when it reverted with a slippage guard
+        try:
+            return call(*args)
+        except VirtualMachineError as exc:
+            assert exc.revert_msg in EXPECTED_REVERTS, exc.revert_msg
+            return None
+
+    def rule_deposit(self, depositor, share):
+        user = self.users[depositor]
+        amount = int(self.token.balanceOf(user) * share)
+        if amount == 0 or self.exited:
+            return
+        self.token.approve(self.vault, amount, {"from": user})
+        self.vault.deposit(amount, {"from": user})
+        self.deposited += amount
+
+    def rule_harvest(self):
+        chain.sleep(1)
+        self._allow(self.vault.totalAssets())
+        tx = self._expect_revert(self.strategy.harvest, {"from": self.gov})
+        if tx is not None:
+            self.unreported = 0
+        self.exit_harvested |= self.exited and tx is not None
+
+    def rule_tend(self):
+        self._allow(self.strategy.balanceOfWant())
+        self._expect_revert(self.strategy.tend, {"from": self.gov})
+
+    def rule_withdraw(self, depositor, share, maxLoss):
+        user = self.users[depositor]
+        shares = int(self.vault.balanceOf(user) * share)
+        if shares == 0:
+            return
+        before = self.token.balanceOf(user)
+        value = shares * self.vault.pricePerShare() // 10 ** self.vault.decimals()
+        allowance = self._allow(value)
+        try:
+            self.vault.withdraw(shares, user, maxLoss, {"from": user})
+        except VirtualMachineError as exc:
+            self._disallow(allowance)
+            if exc.revert_msg in EXPECTED_REVERTS:
+                return
+            # Otherwise only the vault's maxLoss check may refuse it: the same withdraw
+            # accepting any loss goes through and loses more than maxLoss allows
+            received = self.vault.withdraw.call(shares, user, MAX_BPS, {"from": user})
+            loss = max(value - received, 0)
+            assert loss + ROUNDING > maxLoss * (received + loss) // MAX_BPS, (
+                exc.revert_msg,
+                loss,
+            )
+            return
+        self.withdrawn += self.token.balanceOf(user) - before
+
+    def rule_accrue_rewards(self, blocks):
+        fastForward.mine(blocks)
+
+    def rule_collect_fees(self, enabled):
+        self.strategy.setCollectFeesEnabled(enabled, {"from": self.gov})
+
+    def rule_emergency_exit(self):
+        if self.exited:
+            return
+        self.strategy.setEmergencyExit({"from": self.gov})
+        self.exited = True
+
+    def rule_migrate(self):
+        if self.migrated or self.exited:
+            return
+        self._allow(self.strategy.estimatedTotalAssets())
+        self.vault.migrateStrategy(self.strategy, self.new_strategy, {"from": self.gov})
+        assert self.strategy.estimatedTotalAssets() == 0
+        assert self.strategy.balanceOfLPInMasterChef() == 0
+        self.strategy = self.new_strategy
+        self.migrated = True
+        self.unreported = 0
+
+    def invariant_assets_conserved(self):
+        # No step loses more than its own slippage and rounding, whatever was reported
+        # as loss
+        balance = self.vault.totalAssets() + self.withdrawn - self.deposited
+        assert balance >= self.balance - self.allowance
+        self.balance, self.allowance = balance, 0
+
+    def invariant_total_assets_components(self):
+        # Against the token, pool and MasterChef balances rather than the strategy's own
+        # views
+        staked = self.masterChef.userInfo(self.pid, self.strategy)[0]
+        lp = self.lpToken.balanceOf(self.strategy) + staked
+        pooled = self.lpToken.amountLPtoLD(lp) if lp else 0
+        assert (
+            self.strategy.estimatedTotalAssets()
+            == self.token.balanceOf(self.strategy) + pooled
+        )
+
+    def invariant_debt_backed(self):
+        assert (
+            self.vault.strategies(self.strategy)["totalDebt"]
+            <= self.strategy.estimatedTotalAssets() + self.unreported
+        )
+
+    def invariant_no_stranded_lp(self):
+        # Once exited and harvested, nothing stays in the MasterChef or the pool
+        if self.exit_harvested:
+            assert self.strategy.balanceOfLPInMasterChef() == 0
+            assert self.strategy.balanceOfLpTokens() == 0
+
+
+def test_stateful(
+    state_machine,
+    token,
+    vault,
+    strategy,
+    Strategy,
+    strategist,
+    gov,
+    user,
+    user2,
+    user3,
+    user_amounts,
+    deploy_args,
+):
+    new_strategy = deployStrategy(Strategy, strategist, gov, vault, **deploy_args)
+    settings = {
+        "max_examples": int(os.getenv("FUZZ_EXAMPLES", 50)),
+        "stateful_step_count": int(os.getenv("FUZZ_STEPS", 20)),
+    }
+    state_machine(
+        StrategyStateMachine,
+        token,
+        vault,
+        strategy,
+        new_strategy,
+        [user, user2, user3],
+        gov,
+        settings=settings,
+    )
@@ -0,0 +1,135 @@
+import pytest
+
+import gasProfile
+import util
+from conftest import deployStrategy
+
+# Gas benchmarks: each test records one transaction against tests/gas_snapshot.json
+# and fails when it uses more than --gas-tolerance over the recorded value.
+
+
+@pytest.fixture
+def invested(chain, token, vault, strategy, user, amount, gov):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    yield amount
+
+
+def test_gas_first_harvest(
+    chain, token, vault, strategy, user, amount, gov, gas_snapshot
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+
+    tx = strategy.harvest({"from": gov})
+    gas_snapshot.check("first_harvest", tx.gas_used)
+
+
+def test_gas_harvest_sell_rewards(
+    chain, strategy, gov, invested, reward, reward_whale, gas_snapshot
+):
+    util.airdrop_rewards(strategy, reward, reward_whale)
+    chain.mine(1)
+
+    tx = strategy.harvest({"from": gov})
+    assert strategy.balanceOfReward() == 0
+    gas_snapshot.check("harvest_sell_rewards", tx.gas_used)
+
+
+def test_gas_harvest_collect_fees(
+    chain, strategy, gov, invested, reward, reward_whale, gas_snapshot
+):
+    strategy.setCollectFeesEnabled(True, {"from": gov})
+    util.airdrop_rewards(strategy, reward, reward_whale)
+    chain.sleep(3600)
+    chain.mine(1)
+
+    tx = strategy.harvest({"from": gov})
+    gas_snapshot.check("harvest_collect_fees", tx.gas_used)
+
+
+def test_gas_tend(chain, strategy, gov, invested, reward, reward_whale, gas_snapshot):
+    util.airdrop_rewards(strategy, reward, reward_whale)
+    chain.mine(1)
+
+    tx = strategy.tend({"from": gov})
+    gas_snapshot.check("tend", tx.gas_used)
+
+
+def test_gas_partial_withdraw(vault, user, invested, gas_snapshot):
+    maxLoss = 20  # 0.2% BPS
+    tx = vault.withdraw(vault.balanceOf(user) // 2, user, maxLoss, {"from": user})
+    gas_snapshot.check("partial_withdraw", tx.gas_used)
+
+
+def test_gas_full_withdraw(vault, user, invested, gas_snapshot):
+    maxLoss = 20  # 0.2% BPS
+    tx = vault.withdraw(vault.balanceOf(user), user, maxLoss, {"from": user})
+    gas_snapshot.check("full_withdraw", tx.gas_used)
+
+
+def test_gas_emergency_exit(chain, strategy, gov, invested, gas_snapshot):
+    strategy.setEmergencyExit({"from": gov})
+    chain.sleep(1)
+
+    tx = strategy.harvest({"from": gov})
+    gas_snapshot.check("emergency_exit_harvest", tx.gas_used)
+
+
+def test_gas_migration(
+    vault, strategy, Strategy, strategist, gov, deploy_args, invested, gas_snapshot
+):
+    new_strategy = deployStrategy(Strategy, strategist, gov, vault, **deploy_args)
+
+    tx = vault.migrateStrategy(strategy, new_strategy, {"from": gov})
+    assert strategy.estimatedTotalAssets() == 0
+    gas_snapshot.check("migration", tx.gas_used)
+
+
+def test_gas_profile_harvest(chain, strategy, gov, invested, reward, reward_whale):
+    util.airdrop_rewards(strategy, reward, reward_whale)
+    chain.mine(1)
+    tx = strategy.harvest({"from": gov})
+
+    result = gasProfile.profile(tx)
+    functions = result["functions"]
+    # harvest is defined in BaseStrategy, match on the function name only
+    inclusive = lambda name: sum(
+        gas["inclusive"] for fn, gas in functions.items() if fn.endswith(f".{name}")
+    )
+    spent = lambda name: sum(
+        gas["self"] for fn, gas in functions.items() if fn.endswith(f".{name}")
+    )
+
+    # What the steps do not account for is the intrinsic gas less the refunds, capped at
+    # a fifth
+    calldata = sum(4 if byte == 0 else 16 for byte in bytes.fromhex(tx.input[2:]))
+    assert (
+        21_000 + calldata - tx.gas_used // 5 <= result["intrinsic"] <= 21_000 + calldata
+    )
+
+    for name in ("harvest", "_addLiquidity", "_claimRewards", "_sellAllRewards"):
+        assert spent(name) > 0, name
+    masterChef = strategy.masterChef()
+    chef = result["targets"][masterChef]["name"] or masterChef
+    assert functions[f"{chef}.deposit"]["self"] > 0
+    assert result["targets"][masterChef]["gas"] > 0
+
+    # A caller includes its callees, and both attributions cover the same steps
+    assert all(gas["inclusive"] >= gas["self"] for gas in functions.values())
+    children = (
+        "_claimRewards",
+        "_sellAllRewards",
+        "_addLiquidity",
+        "_depositLpIntoMasterChef",
+    )
+    assert inclusive("harvest") >= sum(inclusive(name) for name in children)
+    chefCallers = inclusive("_claimRewards") + inclusive("_depositLpIntoMasterChef")
+    assert chefCallers >= functions[f"{chef}.deposit"]["inclusive"]
+    assert sum(target["gas"] for target in result["targets"].values()) == sum(
+        fn["self"] for fn in functions.values()
+    )
+    assert strategy.address in result["targets"]
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from harvestInterval import Emissions, optimise
+from mockProtocol import MASTERCHEF_POOL_ID
+from strategyState import masterChefPoolId
+
+
+def test_emissions_read(chain, token, vault, strategy, user, amount, gov, backend):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    assert masterChefPoolId(strategy) == (
+        MASTERCHEF_POOL_ID if backend == "mock" else 1
+    )
+    emissions = Emissions.read(strategy, vault)
+    assert emissions.decimals == token.decimals()
+    assert (
+        emissions.strategyTvl
+        == strategy.estimatedTotalAssets() / 10 ** token.decimals()
+    )
+    assert emissions.rewardsPerHour > 0
+    assert emissions.poolTvl >= 0
+
+
+def test_optimal_interval():
+    emissions = Emissions(
+        block=0, rewardsPerHour=1_000, poolTvl=50_000_000, strategyTvl=0, decimals=6
+    )
+    baseFees = np.full(100, 20e9)
+    result = optimise(
+        [1_000_000, 10_000_000], emissions, 0.5, 700_000, baseFees, 1_500, priorityFee=0
+    )
+
+    # Bigger positions pay the same gas for more rewards, so they harvest more often
+    assert result["interval"][1] < result["interval"][0]
+    assert np.all(result["minProfit"] > 700_000 * 20e-9 * 1_500)
+    # Near the optimum harvests are worth up to about twice the mean base fee
+    assert result["maxAcceptableBaseFee"][1] == pytest.approx(2 * 20e9, rel=0.1)
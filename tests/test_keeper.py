@@ -0,0 +1,44 @@
+import asyncio
+
+from conftest import deployStrategy
+from keeper import Keeper
+
+
+def test_keeper_harvests_triggered_strategies(
+    chain, token, vault, strategy, Strategy, strategist, gov, user, amount, deploy_args
+):
+    # Three active strategies on the vault, two of them forced to trigger
+    vault.updateStrategyDebtRatio(strategy, 5_000, {"from": gov})
+    strategies = [strategy]
+    for _ in range(2):
+        new_strategy = deployStrategy(Strategy, strategist, gov, vault, **deploy_args)
+        vault.addStrategy(new_strategy, 2_500, 0, 2 ** 256 - 1, 0, {"from": gov})
+        strategies.append(new_strategy)
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+
+    for s in strategies:
+        s.setMaxAcceptableBaseFee(2 ** 256 - 1, {"from": gov})
+    strategies[0].setForceHarvestTriggerOnce(True, {"from": gov})
+    strategies[2].setForceHarvestTriggerOnce(True, {"from": gov})
+    chain.mine(1)
+
+    keeper = Keeper(gov, strategies, batchSize=2, maxPending=1)
+    triggers = asyncio.run(keeper.triggers(chain.height))
+    assert [triggers[s.address][0] for s in strategies] == [True, False, True]
+
+    results = asyncio.run(keeper.run_once())
+    assert [(address, method) for address, method, _ in results] == [
+        (strategies[0].address, "harvest"),
+        (strategies[2].address, "harvest"),
+    ]
+    assert all(tx.status == 1 for _, _, tx in results)
+    assert vault.strategies(strategies[0])["totalDebt"] > 0
+    assert vault.strategies(strategies[1])["totalDebt"] == 0
+    assert vault.strategies(strategies[2])["totalDebt"] > 0
+
+    # The forced trigger resets on harvest
+    assert not any(
+        asyncio.run(keeper.triggers(chain.height))[s.address][0] for s in strategies
+    )
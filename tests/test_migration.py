@@ -10,6 +10,7 @@ def test_funds_migration(
     amount,
     Strategy,
     strategist,
+    deploy_args,
     gov,
     user,
     RELATIVE_APPROX,
@@ -31,7 +32,7 @@ def test_funds_migration(
     print(f'balanceOfLPTokens before: {balanceOfLPTokens / 10 ** token.decimals()}')
 
     # Deploy new strategy
-    new_strategy = deployStrategy(Strategy, strategist, gov, vault)
+    new_strategy = deployStrategy(Strategy, strategist, gov, vault, **deploy_args)
     # Migrate to a new strategy
 
     # Harvest new strategy to re-invest everything
@@ -61,6 +62,7 @@ def test_funds_migration_abandonRewards(
     amount,
     Strategy,
     strategist,
+    deploy_args,
     gov,
     user,
     RELATIVE_APPROX,
@@ -82,7 +84,7 @@ def test_funds_migration_abandonRewards(
     print(f'balanceOfLPTokens before: {balanceOfLPTokens / 10 ** token.decimals()}')
 
     # Deploy new strategy
-    new_strategy = deployStrategy(Strategy, strategist, gov, vault)
+    new_strategy = deployStrategy(Strategy, strategist, gov, vault, **deploy_args)
     # Migrate to a new strategy
 
     # Harvest new strategy to re-invest everything
@@ -112,6 +114,7 @@ def test_migration(
     amount,
     Strategy,
     strategist,
+    deploy_args,
     gov,
     user,
     RELATIVE_APPROX,
@@ -129,7 +132,7 @@ def test_migration(
     assert pytest.approx(stratInitialAssets, rel=RELATIVE_APPROX) == amount
 
     # Deploy new strategy
-    new_strategy = deployStrategy(Strategy, strategist, gov, vault)
+    new_strategy = deployStrategy(Strategy, strategist, gov, vault, **deploy_args)
     new_strategy.setKeeper(gov)
 
     assert (strategy.address != new_strategy.address)
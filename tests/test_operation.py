@@ -2,6 +2,7 @@ import brownie
 import pytest
 
 import util
+from strategyState import StrategyState
 
 def test_operation(
     chain, token, vault, strategy, user, amount, RELATIVE_APPROX, gov
@@ -445,3 +446,24 @@ def test_triggers(
 
     strategy.harvestTrigger(0)
     strategy.tendTrigger(0)
+
+def test_harvest_state_diff(
+    chain, token, vault, strategy, user, amount, RELATIVE_APPROX, gov
+):
+    # Deposit to the vault
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+
+    before = StrategyState.read(strategy, vault, token)
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    after = StrategyState.read(strategy, vault, token)
+    delta = after - before
+
+    assert delta.block > 0
+    assert delta.totalDebt == amount
+    assert delta.balanceOfWant == 0
+    assert delta.balanceOfLpTokens == 0
+    assert delta.balanceOfLPInMasterChef > 0
+    assert pytest.approx(delta.estimatedTotalAssets, rel=RELATIVE_APPROX) == amount
+    assert after.estimatedTotalAssets == after.balanceOfPooled + after.balanceOfWant
@@ -0,0 +1,52 @@
+import pytest
+from brownie import interface
+
+import fastForward
+from strategyState import masterChefPoolId
+
+BLOCKS = 5_000
+
+
+def test_fast_forward(chain):
+    height, timestamp = chain.height, chain[-1].timestamp
+    fastForward.mine(BLOCKS, seconds=BLOCKS * 12)
+    assert chain.height == height + BLOCKS
+    assert chain[-1].timestamp - timestamp == pytest.approx(BLOCKS * 12, rel=1e-2)
+    assert chain.time() == pytest.approx(chain[-1].timestamp, abs=5)
+
+
+def test_masterchef_rewards_accrue(
+    chain, token, vault, strategy, user, amount, gov, reward
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+    assert strategy.pendingRewards() == 0
+
+    masterChef = interface.IMasterChef(strategy.masterChef())
+    lpToken = interface.ILpPool(strategy.lpToken())
+    staked = strategy.balanceOfLPInMasterChef()
+    pool = masterChef.poolInfo(masterChefPoolId(strategy))
+    share = staked / lpToken.balanceOf(masterChef)
+    perBlock = masterChef.stargatePerBlock() * pool[1] / masterChef.totalAllocPoint()
+
+    fastForward.mine(BLOCKS)
+    pending = strategy.pendingRewards()
+    assert pending == pytest.approx(perBlock * share * BLOCKS, rel=1e-3)
+
+    # _claimRewards picks them up and _sellAllRewards sells them
+    chain.sleep(3600 * 6)
+    tx = strategy.harvest({"from": gov})
+    assert tx.events["Harvested"]["profit"] > 0
+    assert strategy.pendingRewards() == 0
+    assert reward.balanceOf(strategy) <= strategy.rewardsDust()
+
+
+def test_undo_keeps_fast_forwarded_blocks(chain, token, vault, user):
+    allowance = token.allowance(user, vault)
+    height = fastForward.mine(100)
+    token.approve(vault.address, allowance + 1, {"from": user})
+    chain.undo()
+    assert chain.height == height
+    assert token.allowance(user, vault) == allowance
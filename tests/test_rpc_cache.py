@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+
+import requests
+
+from rpcCache import TOUCH_AFTER, CachingProxy, RpcCache, _Server, serve
+
+FORK_BLOCK = "0xf4240"
+
+
+class StubUpstream:
+    # Answers every request with a result derived from its method and params, and counts
+    # them
+    def __init__(self):
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                batch = body if isinstance(body, list) else [body]
+                stub.requests.extend(request["method"] for request in batch)
+                results = [
+                    {
+                        "jsonrpc": "2.0",
+                        "id": request["id"],
+                        "result": "0x1"
+                        if request["method"] == "eth_chainId"
+                        else f"{request['method']}:{json.dumps(request['params'])}",
+                    }
+                    for request in batch
+                ]
+                data = json.dumps(
+                    results if isinstance(body, list) else results[0]
+                ).encode()
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = _Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+
+def call(url, method, params, id=1):
+    return requests.post(
+        url, json={"jsonrpc": "2.0", "id": id, "method": method, "params": params}
+    ).json()
+
+
+def test_pinned_requests_cached(tmp_path):
+    upstream = StubUpstream()
+    proxy = CachingProxy(upstream.url, RpcCache(tmp_path / "cache.sqlite"))
+    server = serve(proxy, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    slot = ["0x38EA452219524Bb87e18dE1C24D3bB59510BD783", "0x0", FORK_BLOCK]
+
+    first = call(url, "eth_getStorageAt", slot)
+    assert call(url, "eth_getStorageAt", slot, id=2) == {**first, "id": 2}
+    call(url, "eth_getStorageAt", [*slot[:2], "latest"])
+    call(url, "eth_getStorageAt", [*slot[:2], "latest"])
+    assert upstream.requests == [
+        "eth_chainId",
+        "eth_getStorageAt",
+        "eth_getStorageAt",
+        "eth_getStorageAt",
+    ]
+
+    # A batch only forwards its misses
+    batch = [
+        {"jsonrpc": "2.0", "id": 1, "method": "eth_getStorageAt", "params": slot},
+        {
+            "jsonrpc": "2.0",
+            "id": 2,
+            "method": "eth_getCode",
+            "params": [slot[0], FORK_BLOCK],
+        },
+    ]
+    responses = requests.post(url, json=batch).json()
+    assert [response["id"] for response in responses] == [1, 2]
+    assert upstream.requests[-1] == "eth_getCode" and len(upstream.requests) == 5
+    assert requests.get(url).json()["hits"] == 2
+
+    # Another proxy on the same file, like a second xdist worker, starts warm
+    warm = CachingProxy(upstream.url, RpcCache(tmp_path / "cache.sqlite"))
+    warm.handle(
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "eth_getCode",
+            "params": [slot[0], FORK_BLOCK],
+        }
+    )
+    assert warm.stats()["misses"] == 0
+    server.shutdown()
+    upstream.server.shutdown()
+
+
+def test_lru_eviction(tmp_path, monkeypatch):
+    cache = RpcCache(tmp_path / "cache.sqlite", maxBytes=100)
+    for i in range(10):
+        cache.put(f"key{i}", "x" * 18)  # 20 bytes of JSON each
+    # A fresh entry's use is not rewritten, an older one's is
+    used = (
+        lambda key: cache._db()
+        .execute("SELECT used FROM entries WHERE key = ?", (key,))
+        .fetchone()[0]
+    )
+    written = used("key0")
+    cache.get("key0")
+    assert used("key0") == written
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + TOUCH_AFTER + 1)
+    cache.get("key0")
+    assert used("key0") > written
+    assert cache.evict() == 5
+    assert cache.size() <= 100
+    assert cache.get("key0") is not None
+    assert cache.get("key1") is None and cache.get("key9") is not None
+
+
+def test_missing_upstream_responses(tmp_path):
+    upstream = StubUpstream()
+    proxy = CachingProxy(upstream.url, RpcCache(tmp_path / "cache.sqlite"))
+    # The upstream drops one response of the batch and answers the other under the wrong
+    # id
+    proxy._forward = lambda batch: [{"jsonrpc": "2.0", "id": 7, "result": "0x2"}]
+    batch = [
+        {
+            "jsonrpc": "2.0",
+            "id": 1,
+            "method": "eth_getCode",
+            "params": ["0x0", FORK_BLOCK],
+        },
+        {
+            "jsonrpc": "2.0",
+            "id": 2,
+            "method": "eth_getCode",
+            "params": ["0x1", FORK_BLOCK],
+        },
+    ]
+    responses = proxy.handle(batch)
+    assert [response["id"] for response in responses] == [1, 2]
+    assert all(response["error"]["code"] == -32603 for response in responses)
+    assert proxy.cache.size() == 0
+    upstream.server.shutdown()
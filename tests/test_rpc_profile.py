@@ -0,0 +1,30 @@
+import funding
+from rpcProfile import RpcProfiler
+
+
+def test_requests_attributed(chain, token, vault, strategy, user):
+    profiler = RpcProfiler()
+    with profiler.scoped("test", "reads"):
+        strategy.estimatedTotalAssets()
+        vault.totalAssets()
+    with profiler.scoped("test", "tx"):
+        token.approve(vault, 1, {"from": user})
+    # Undoing the approval leaves the snapshot fn_isolation reverts to alone
+    with profiler.scoped("test", "chain"):
+        chain.undo()
+    with profiler.scoped("test", "batch"):
+        funding.batch([("eth_chainId", []), ("eth_chainId", [])])
+    profiler.uninstall()
+
+    requests = {
+        (phase, method): count
+        for (_, phase, method), (count, _) in profiler.stats.items()
+    }
+    assert requests[("reads", "eth_call")] == 2
+    assert requests[("chain", "evm_snapshot")] >= 1
+    assert requests[("chain", "evm_revert")] == 1
+    assert requests[("batch", "eth_chainId")] == 2
+    assert any(
+        phase == "tx" and method.startswith("eth_send") for phase, method in requests
+    )
+    assert profiler.totals("phase")[0][1][0] > 0
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from sellSimulator import QuoteCurve, sweep
+
+AMOUNTS = np.geomspace(1, 100_000, 128)
+
+
+def curve(depth):
+    # Constant product pool priced at 0.5 want per reward, `depth` rewards deep
+    return QuoteCurve(
+        np.concatenate([[0], AMOUNTS]),
+        np.concatenate([[0], 0.5 * AMOUNTS / (1 + AMOUNTS / depth)]),
+    )
+
+
+def test_gas_favours_rare_harvests():
+    results = sweep(
+        curve(1e12), [1], [1, 24, 168], [float("inf")], 10, 24 * 30, 5.0, 5.0, workers=2
+    )
+    assert results[0].interval == 168
+    assert results[0].wantPerReward == pytest.approx(0.5, rel=1e-6)
+
+
+def test_price_impact_favours_frequent_harvests():
+    results = sweep(
+        curve(1_000),
+        [1, 1_000],
+        [1, 24, 168],
+        [float("inf"), 10],
+        10,
+        24 * 30,
+        0.0,
+        0.0,
+        workers=2,
+    )
+    assert (results[0].interval, results[0].threshold) == (1, 1)
+    assert results[0].net > results[-1].net
@@ -0,0 +1,40 @@
+import pandas as pd
+import pytest
+
+from bakeState import Setup
+from slippageCurve import deposit, recommend, sizes, withdraw
+
+
+@pytest.fixture
+def deployment(token, reward, reward_whale, vault, strategy, user_amounts):
+    yield Setup(token, reward, reward_whale, vault, strategy, user_amounts, {})
+
+
+def test_deposit_slippage_matches_guard(deployment, strategy):
+    result = deposit(deployment, 10_000 * 10 ** deployment.token.decimals())
+    assert result["invested"] > 0
+    assert result["pooledDelta"] == strategy.balanceOfPooled()
+    assert result["slippageBps"] < 10_000
+    # The sweep opens the guards
+    assert strategy.maxSlippageIn() == 10_000
+
+
+def test_withdraw_slippage(deployment):
+    unit = 10 ** deployment.token.decimals()
+    result = withdraw(deployment, 1_000 * unit, 10_000 * unit)
+    assert result["invested"] > 0
+    assert abs(result["slippageBps"]) < 100
+    assert result["gas"] > 0
+
+
+def test_recommend():
+    assert list(sizes(100, 100_000, 1)) == [100, 1_000, 10_000, 100_000]
+    table = pd.DataFrame(
+        {
+            "side": ["deposit", "deposit", "withdraw", "withdraw"],
+            "amount": [1_000, 1_000_000, 1_000, 1_000_000],
+            "slippageBps": [0.2, 7.5, -0.1, 40.0],
+        }
+    )
+    assert recommend(table, 10_000) == (2, 1)
+    assert recommend(table, 10_000_000) == (9, 41)
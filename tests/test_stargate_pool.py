@@ -0,0 +1,41 @@
+import pytest
+
+from stargatePool import StargatePool
+
+
+def test_pool_model_matches_strategy(chain, token, vault, strategy, user, amount, gov):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    pool = StargatePool.read(strategy)
+    assert pool.balanceOfPooled() == strategy.balanceOfPooled()
+    assert pool.estimatedTotalAssets() == strategy.estimatedTotalAssets()
+    for want in (1, amount // 3, amount):
+        assert pool.wantToLPToken(want) == strategy.wantToLPToken(want)
+
+
+@pytest.mark.parametrize("share", [10, 50, 100])
+def test_pool_model_predicts_withdraw(
+    chain, token, vault, strategy, user, amount, gov, share
+):
+    token.approve(vault.address, amount, {"from": user})
+    vault.deposit(amount, {"from": user})
+    chain.sleep(1)
+    strategy.harvest({"from": gov})
+
+    # The vault asks the strategy for what its idle balance does not cover
+    shares = vault.balanceOf(user) * share // 100
+    idle = token.balanceOf(vault)
+    amountNeeded = shares * vault.pricePerShare() // 10 ** vault.decimals() - idle
+    pool = StargatePool.read(strategy)
+    liquidated, loss, slippedOut = pool.liquidatePosition([amountNeeded])
+    assert not slippedOut[0]
+
+    before = token.balanceOf(user)
+    vault.withdraw(shares, user, 10_000, {"from": user})
+    assert (
+        pytest.approx(idle + int(liquidated[0]), abs=10)
+        == token.balanceOf(user) - before
+    )
@@ -0,0 +1,23 @@
+from bakeState import Setup
+from withdrawStorm import depositSizes, depositors, fund, replay, storm
+
+DEPOSITORS = 100
+
+
+def test_withdraw_storm(token, reward, reward_whale, vault, strategy, user_amounts):
+    deployment = Setup(token, reward, reward_whale, vault, strategy, user_amounts, {})
+    addresses = depositors(DEPOSITORS)
+    amounts = depositSizes(DEPOSITORS, 1_000) * 10 ** token.decimals()
+    fund(deployment, addresses, amounts)
+    assert vault.totalSupply() > 0
+    assert vault.strategies(strategy)["totalDebt"] == sum(amounts)
+
+    waves = storm(addresses, share=0.5, waves=3)
+    table = replay(deployment, waves, maxLoss=10_000)
+    assert len(table) == DEPOSITORS // 2
+    assert set(table["revert"].dropna()) <= {"Slipped Out!"}
+    done = table[~table["reverted"]]
+    assert (done["gas"] > 0).all()
+    assert (done["lossBps"] < 10).all()
+    # What was not withdrawn is still staked
+    assert strategy.balanceOfLPInMasterChef() > 0
@@ -1,14 +1,17 @@
 from brownie import Contract
 
-def stateOfStrat(msg, strategy, token):
-    print(f'\n===={msg}====')
-    wantDec = 10 ** token.decimals()
-    print(f'Balance of {token.symbol()}: {strategy.balanceOfWant() / wantDec}')
-    print(f'Balance of Bpt: {strategy.balanceOfLpTokens() / wantDec}')
-    print(f'Estimated Total Assets: {strategy.estimatedTotalAssets() / wantDec}')
+import funding
+from strategyState import StrategyState
+
+def stateOfStrat(msg, strategy, token, vault=None):
+    # One multicall for every value, returns the snapshot so callers can diff it
+    state = StrategyState.read(strategy, vault or Contract(strategy.vault()), token)
+    state.report(msg)
+    return state
 
 # Balancer uses blocks count to give rewards so the Chain.sleep() method of time travel does not work
-# Chain.mine() is too slow so the best solution is to airdrop rewards
+# Chain.mine() is too slow so the best solution is to airdrop rewards, or to let them accrue in the
+# MasterChef with fastForward.mine, which mines thousands of blocks in one request
+# The balance is written to storage, reward_whale is only used on nodes that cannot set storage
 def airdrop_rewards(strategy, reward, reward_whale):
-    reward.approve(strategy, 2 ** 256 - 1, {'from': reward_whale})
-    reward.transfer(strategy, 1000  * 1e18 , {'from': reward_whale})
\ No newline at end of file
+    funding.add_balances(reward, {strategy: 1000 * 1e18}, whale=reward_whale)
\ No newline at end of file